@@ -4,6 +4,8 @@ from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
 
+from Storage import sheet_cache
+
 # Tải .env
 BASE_DIR = Path(__file__).parent
 ENV_PATH = BASE_DIR / '.env'
@@ -365,11 +367,10 @@ class Config:
             if work_log_path.exists():
                 try:
                     # Đọc tất cả sheets từ file work log
-                    excel_file = pd.ExcelFile(work_log_path)
                     sheets_data = {}
 
-                    for sheet_name in excel_file.sheet_names:
-                        df = pd.read_excel(work_log_path, sheet_name=sheet_name)
+                    for sheet_name in sheet_cache.sheet_names(work_log_path):
+                        df = sheet_cache.read_sheet(work_log_path, sheet_name=sheet_name)
                         df['Month'] = month  # Thêm cột tháng
                         df['Year'] = current_year  # Thêm cột năm
                         sheets_data[sheet_name] = df
@@ -420,11 +421,10 @@ class Config:
             if sap_path.exists():
                 try:
                     # Đọc tất cả sheets từ file SAP
-                    excel_file = pd.ExcelFile(sap_path)
                     sheets_data = {}
 
-                    for sheet_name in excel_file.sheet_names:
-                        df = pd.read_excel(sap_path, sheet_name=sheet_name)
+                    for sheet_name in sheet_cache.sheet_names(sap_path):
+                        df = sheet_cache.read_sheet(sap_path, sheet_name=sheet_name)
                         df['Month'] = month  # Thêm cột tháng
                         df['Year'] = current_year  # Thêm cột năm
                         sheets_data[sheet_name] = df
@@ -565,7 +565,7 @@ class Config:
                 # Kiểm tra file SAP
                 if month_data['sap_data'].exists():
                     try:
-                        df = pd.read_excel(month_data['sap_data'])
+                        df = sheet_cache.read_sheet(month_data['sap_data'])
                         if not df.empty:
                             total_orders += len(df)
                             if 'Revenue' in df.columns:
@@ -579,7 +579,7 @@ class Config:
                 # Kiểm tra file work log
                 if month_data['work_log'].exists():
                     try:
-                        df = pd.read_excel(month_data['work_log'])
+                        df = sheet_cache.read_sheet(month_data['work_log'])
                         if not df.empty:
                             # Kiểm tra cột IsFraud
                             if 'IsFraud' in df.columns:
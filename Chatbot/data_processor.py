@@ -8,10 +8,15 @@ from datetime import datetime
 from typing import Dict, List, Optional, Union, Any
 import traceback
 
+from Storage import sheet_cache
+from Storage.warehouse import get_warehouse
+
 
 class DataProcessor:
     """Xử lý dữ liệu – tính 8 chỉ số và cung cấp chi tiết giao dịch cho AI."""
 
+    USE_WAREHOUSE = True  # Đọc từ SQLite warehouse (Storage.warehouse), lỗi thì đọc xlsx như cũ
+
     def __init__(self, employee_name: str):
         self.employee_name = employee_name
         # Dữ liệu tháng hiện tại (DataFrame)
@@ -24,6 +29,8 @@ class DataProcessor:
         self.kpi_year_df: pd.DataFrame = pd.DataFrame()
         self.browser_year_df: pd.DataFrame = pd.DataFrame()
         self.fraud_year_df: pd.DataFrame = pd.DataFrame()
+        # Rollup work log theo tháng (warehouse) - None khi đọc xlsx
+        self.work_rollup: Optional[pd.DataFrame] = None
         # Metrics
         self.metrics = None
         self.monthly_metrics = {}
@@ -37,10 +44,11 @@ class DataProcessor:
         """Tải dữ liệu tháng hiện tại và cả năm, thiết lập DataFrames chi tiết."""
         try:
             from config import Config
-            self._load_year_data()
-            paths = Config.get_employee_data_path(self.employee_name)
-            self._load_work_log_current(paths['work_log'])
-            self._load_sap_data_current(paths['sap_data'])
+            if not self._load_from_warehouse(Config.BASE_DATA_PATH):
+                self._load_year_data()
+                paths = Config.get_employee_data_path(self.employee_name)
+                self._load_work_log_current(paths['work_log'])
+                self._load_sap_data_current(paths['sap_data'])
             self.calculate_metrics()
             self._calculate_period_metrics()
             return True
@@ -49,6 +57,38 @@ class DataProcessor:
             traceback.print_exc()
             return False
 
+    def _load_from_warehouse(self, base_path) -> bool:
+        """Cả năm + tháng hiện tại = query có index (warehouse tự ingest lại file xlsx đã đổi)."""
+        if not self.USE_WAREHOUSE:
+            return False
+        try:
+            now = datetime.now()
+            warehouse = get_warehouse(base_path)
+            stats = warehouse.sync([self.employee_name])
+
+            def read(kind, sheet, month=None):
+                df = warehouse.read(self.employee_name, kind, sheet, now.year, month)
+                if df.empty and not len(df.columns):
+                    return df
+                # Giữ đúng cột như khi đọc xlsx: năm có thêm Month, tháng hiện tại không có
+                return df.drop(columns=['Year'] if month is None else ['Year', 'Month'])
+
+            print(f"📅 Đang tải dữ liệu cả năm {now.year} từ warehouse ({stats['ingested']} file cập nhật)...")
+            self.reality_year_df = read('sap_data', 'Reality')
+            self.kpi_year_df = read('sap_data', 'KPI')
+            # Giờ làm / số fraud của tháng, năm lấy từ rollup; không đọc Browser_Sessions cả năm
+            self.work_rollup = warehouse.monthly_rollup(self.employee_name, now.year)
+            self.fraud_year_df = read('work_log', 'Fraud_Events')
+
+            self.reality_df = read('sap_data', 'Reality', now.month)
+            self.kpi_df = read('sap_data', 'KPI', now.month)
+            self.browser_df = read('work_log', 'Browser_Sessions', now.month)
+            self.fraud_df = read('work_log', 'Fraud_Events', now.month)
+            return True
+        except Exception as e:
+            print(f"⚠️ Warehouse lỗi, đọc trực tiếp xlsx: {e}")
+            return False
+
     def _load_year_data(self):
         """Gộp tất cả các tháng trong năm, lưu vào DataFrame chung."""
         from config import Config
@@ -68,9 +108,8 @@ class DataProcessor:
             wl_path = base / f"work_logs_{self.employee_name}_{month_str}.xlsx"
             if wl_path.exists():
                 try:
-                    excel = pd.ExcelFile(wl_path)
-                    for sheet in excel.sheet_names:
-                        df = pd.read_excel(wl_path, sheet_name=sheet)
+                    for sheet in sheet_cache.sheet_names(wl_path):
+                        df = sheet_cache.read_sheet(wl_path, sheet_name=sheet)
                         df['Month'] = month
                         if sheet == 'Browser_Sessions':
                             all_browser.append(df)
@@ -83,9 +122,8 @@ class DataProcessor:
             sap_path = base / "sap_data.xlsx"
             if sap_path.exists():
                 try:
-                    excel = pd.ExcelFile(sap_path)
-                    for sheet in excel.sheet_names:
-                        df = pd.read_excel(sap_path, sheet_name=sheet)
+                    for sheet in sheet_cache.sheet_names(sap_path):
+                        df = sheet_cache.read_sheet(sap_path, sheet_name=sheet)
                         df['Month'] = month
                         if sheet == 'Reality':
                             all_reality.append(df)
@@ -107,9 +145,8 @@ class DataProcessor:
         self.fraud_df = pd.DataFrame()
         if not path.exists():
             return
-        excel = pd.ExcelFile(path)
-        for sheet in excel.sheet_names:
-            df = pd.read_excel(path, sheet_name=sheet)
+        for sheet in sheet_cache.sheet_names(path):
+            df = sheet_cache.read_sheet(path, sheet_name=sheet)
             if sheet == 'Browser_Sessions':
                 self.browser_df = df
             elif sheet == 'Fraud_Events':
@@ -122,9 +159,8 @@ class DataProcessor:
         self.kpi_df = pd.DataFrame()
         if not path.exists():
             return
-        excel = pd.ExcelFile(path)
-        for sheet in excel.sheet_names:
-            df = pd.read_excel(path, sheet_name=sheet)
+        for sheet in sheet_cache.sheet_names(path):
+            df = sheet_cache.read_sheet(path, sheet_name=sheet)
             if sheet == 'Reality':
                 self.reality_df = df
             elif sheet == 'KPI':
@@ -137,9 +173,11 @@ class DataProcessor:
                           reality_df: pd.DataFrame,
                           kpi_df: pd.DataFrame,
                           browser_df: pd.DataFrame,
-                          fraud_df: pd.DataFrame) -> Dict[str, float]:
+                          fraud_df: pd.DataFrame,
+                          work_summary: Optional[Dict[str, float]] = None) -> Dict[str, float]:
         """
         Đầu vào: DataFrame của các sheet tương ứng.
+        work_summary: giờ phiên / số ngày / số fraud từ rollup (thay cho browser_df, fraud_df).
         Đầu ra: dict chứa 8 chỉ số (đã làm tròn) + thông tin phụ.
         """
         metrics = self._empty_metrics()
@@ -257,22 +295,25 @@ class DataProcessor:
         # --------------------------------------------------------------
         # B. TÍNH TỪ WORK LOG
         # --------------------------------------------------------------
-        if not browser_df.empty and 'Session_Start' in browser_df.columns and 'Total_Seconds' in browser_df.columns:
-            session_starts = pd.to_datetime(browser_df['Session_Start'])
-            first_day = session_starts.min()
-            last_day = session_starts.max()
-            session_days = (last_day - first_day).days + 1
-            total_hours = browser_df['Total_Seconds'].sum() / 3600
-            metrics['total_session_hours'] = total_hours
-            metrics['session_days'] = session_days
+        if work_summary is not None:
+            metrics.update(work_summary)
         else:
-            metrics['total_session_hours'] = 0
-            metrics['session_days'] = 1
+            if not browser_df.empty and 'Session_Start' in browser_df.columns and 'Total_Seconds' in browser_df.columns:
+                session_starts = pd.to_datetime(browser_df['Session_Start'])
+                first_day = session_starts.min()
+                last_day = session_starts.max()
+                session_days = (last_day - first_day).days + 1
+                total_hours = browser_df['Total_Seconds'].sum() / 3600
+                metrics['total_session_hours'] = total_hours
+                metrics['session_days'] = session_days
+            else:
+                metrics['total_session_hours'] = 0
+                metrics['session_days'] = 1
 
-        if not fraud_df.empty:
-            metrics['fraud_events_count'] = len(fraud_df)
-        else:
-            metrics['fraud_events_count'] = 0
+            if not fraud_df.empty:
+                metrics['fraud_events_count'] = len(fraud_df)
+            else:
+                metrics['fraud_events_count'] = 0
 
         # --------------------------------------------------------------
         # C. TÍNH 8 CHỈ SỐ HOÀN CHỈNH
@@ -343,13 +384,32 @@ class DataProcessor:
     # ------------------------------------------------------------------
     # 3. TÍNH CHO THÁNG HIỆN TẠI, TỪNG THÁNG, CẢ NĂM
     # ------------------------------------------------------------------
+    def _work_summary(self, month: Optional[int] = None) -> Optional[Dict[str, float]]:
+        """Phần work log của 8 chỉ số lấy từ rollup tháng (None = năm); None khi không có rollup."""
+        if self.work_rollup is None:
+            return None
+        rollup = self.work_rollup if month is None else self.work_rollup[self.work_rollup['month'] == month]
+        summary = {
+            'total_session_hours': 0,
+            'session_days': 1,
+            'fraud_events_count': int(rollup['fraud_events'].sum()) if not rollup.empty else 0,
+        }
+        if not rollup.empty and rollup['browser_sessions'].sum() > 0:
+            first_day = pd.to_datetime(rollup['first_session_start']).min()
+            last_day = pd.to_datetime(rollup['last_session_start']).max()
+            summary['total_session_hours'] = rollup['session_seconds'].sum() / 3600
+            if pd.notna(first_day) and pd.notna(last_day):
+                summary['session_days'] = (last_day - first_day).days + 1
+        return summary
+
     def calculate_metrics(self):
         """Tính metrics cho tháng hiện tại."""
         self.metrics = self._compute_8_metrics(
             self.reality_df,
             self.kpi_df,
             self.browser_df,
-            self.fraud_df
+            self.fraud_df,
+            self._work_summary(datetime.now().month)
         )
 
     def _calculate_period_metrics(self):
@@ -366,7 +426,8 @@ class DataProcessor:
 
             if reality_m.empty:
                 continue
-            self.monthly_metrics[month] = self._compute_8_metrics(reality_m, kpi_m, browser_m, fraud_m)
+            self.monthly_metrics[month] = self._compute_8_metrics(reality_m, kpi_m, browser_m, fraud_m,
+                                                                  self._work_summary(month))
 
         # --- Cả năm ---
         if not self.reality_year_df.empty:
@@ -374,7 +435,8 @@ class DataProcessor:
                 self.reality_year_df,
                 self.kpi_year_df,
                 self.browser_year_df,
-                self.fraud_year_df
+                self.fraud_year_df,
+                self._work_summary()
             )
 
     # ------------------------------------------------------------------
@@ -552,7 +614,8 @@ class DataProcessor:
                 'reality': self.reality_year_df,
                 'kpi': self.kpi_year_df,
                 'browser': self.browser_year_df,
-                'fraud': self.fraud_year_df
+                'fraud': self.fraud_year_df,
+                'work_rollup': self.work_rollup
             },
             'monthly_metrics': self.monthly_metrics,
             'yearly_metrics': self.yearly_metrics
@@ -12,6 +12,8 @@ from PyQt6.QtWidgets import *
 from PyQt6.QtCore import *
 from PyQt6.QtGui import *
 
+from Storage import sheet_cache
+
 # Import from same directory
 try:
     from gemini_analyzer import GeminiAnalyzer
@@ -205,7 +207,7 @@ class EmployeeEmailDialog(QDialog):
             excel_path = "C:/Users/legal/PycharmProjects/PythonProject/MG/employee_ids.xlsx"
 
             # Đọc file Excel
-            df = pd.read_excel(excel_path)
+            df = sheet_cache.read_sheet(excel_path)
 
             # Tìm quản lý có ID bắt đầu bằng "MG" (Manager)
             manager_row = df[df['ID'].str.upper().str.startswith('MG')]
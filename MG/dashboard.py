@@ -22,6 +22,8 @@ from PyQt6.QtWidgets import *
 from PyQt6.QtCore import *
 from PyQt6.QtGui import *
 
+from Storage import sheet_cache
+
 # Thử import config
 try:
     from Chatbot.config import Config
@@ -158,11 +160,11 @@ class DataAnalyzer:
                 return None
 
             # Đọc sheet Orders
-            orders_df = pd.read_excel(file_path, sheet_name='Orders')
+            orders_df = sheet_cache.read_sheet(file_path, sheet_name='Orders')
             print(f"   Đọc được {len(orders_df)} dòng từ sheet Orders")
 
             # Đọc sheet Daily_Performance
-            daily_df = pd.read_excel(file_path, sheet_name='Daily_Performance')
+            daily_df = sheet_cache.read_sheet(file_path, sheet_name='Daily_Performance')
             print(f"   Đọc được {len(daily_df)} dòng từ sheet Daily_Performance")
 
             return {
@@ -191,12 +193,11 @@ class DataAnalyzer:
             }
 
             # Thử đọc từng sheet
-            excel_file = pd.ExcelFile(file_path)
-            sheet_names = excel_file.sheet_names
+            sheet_names = sheet_cache.sheet_names(file_path)
 
             for sheet in sheet_names:
                 try:
-                    df = pd.read_excel(file_path, sheet_name=sheet)
+                    df = sheet_cache.read_sheet(file_path, sheet_name=sheet)
                     key = sheet.lower().replace(' ', '_')
                     data_dict[key] = df
                     print(f"   Đọc được {len(df)} dòng từ sheet {sheet}")
@@ -6,6 +6,9 @@ import numpy as np
 import warnings
 import traceback
 
+from Storage import sheet_cache
+from Storage.warehouse import get_warehouse
+
 warnings.filterwarnings('ignore')
 
 try:
@@ -27,6 +30,8 @@ except ImportError as e:
 class DataProcessor:
     """Process multi-employee data for AI analysis and Dashboard"""
 
+    USE_WAREHOUSE = True  # Đọc từ SQLite warehouse (Storage.warehouse), lỗi thì đọc xlsx như cũ
+
     def __init__(self, employee_name=None):
         self.employee_name = employee_name
         self.base_path = Path(Config.BASE_DATA_PATH)
@@ -457,7 +462,7 @@ class DataProcessor:
                 return self.get_sample_employee_data()
 
             # Đọc file Excel
-            df = pd.read_excel(excel_path)
+            df = sheet_cache.read_sheet(excel_path)
             print(f"✅ Đọc file Excel thành công: {len(df)} dòng, {len(df.columns)} cột")
             print(f"   Các cột: {list(df.columns)}")
 
@@ -620,8 +625,8 @@ class DataProcessor:
             from MG.data_processor import DataProcessor
             emp_processor = DataProcessor(employee_id)
 
-            # Load dữ liệu theo period
-            success = emp_processor.load_period_data(year, month)
+            # Load dữ liệu theo period (work log chỉ cần rollup)
+            success = emp_processor.load_period_data(year, month, include_work_log=False)
 
             if not success:
                 print(f"⚠️ Không thể load dữ liệu cho {employee_id}")
@@ -642,6 +647,47 @@ class DataProcessor:
             traceback.print_exc()
             return None
 
+    @staticmethod
+    def _work_log_totals(work_log, fraud_df):
+        """Tổng fraud / critical / warning / giờ làm của kỳ đã load: từ rollup warehouse nếu có, không thì từ sheet"""
+        rollup = work_log.get('rollup')
+        if rollup is not None:
+            daily, breakdown = rollup['daily'], rollup['fraud']
+            severity = breakdown['severity'].astype(str)
+            return {
+                'total_fraud': int(daily['fraud_events'].sum()),
+                'critical_fraud': int(breakdown.loc[severity.str.contains('Critical|Nghiêm trọng', case=False),
+                                                    'events'].sum()),
+                'warning_fraud': int(breakdown.loc[severity.str.contains('Warning|Cảnh báo', case=False),
+                                                   'events'].sum()),
+                'working_hours': daily['session_seconds'].sum() / 3600,
+            }
+
+        sheets = work_log.get('sheets', {})
+        totals = {
+            'total_fraud': len(fraud_df) if not fraud_df.empty else 0,
+            'critical_fraud': 0,
+            'warning_fraud': 0,
+            'working_hours': 0,
+        }
+        if not fraud_df.empty and 'Severity' in fraud_df.columns:
+            totals['critical_fraud'] = len(
+                fraud_df[fraud_df['Severity'].str.contains('Critical|Nghiêm trọng', case=False, na=False)])
+            totals['warning_fraud'] = len(
+                fraud_df[fraud_df['Severity'].str.contains('Warning|Cảnh báo', case=False, na=False)])
+
+        browser_df = sheets.get('Browser_Sessions', pd.DataFrame())
+        if browser_df.empty:
+            browser_df = sheets.get('Browser_Time', pd.DataFrame())
+        if not browser_df.empty:
+            if 'Total_Seconds' in browser_df.columns:
+                totals['working_hours'] = browser_df['Total_Seconds'].sum() / 3600
+            elif 'Duration_Seconds' in browser_df.columns:
+                totals['working_hours'] = browser_df['Duration_Seconds'].sum() / 3600
+            elif 'Hours' in browser_df.columns:
+                totals['working_hours'] = browser_df['Hours'].sum()
+        return totals
+
     def calculate_single_employee_metrics(self, emp_data, employee_id, year, month):
         """Tính toán metrics cho một nhân viên - tối ưu hóa từ _calculate_employee_metrics"""
         try:
@@ -666,7 +712,8 @@ class DataProcessor:
             total_orders = len(orders_df) if not orders_df.empty else 0
             total_revenue = orders_df['Revenue'].sum() if not orders_df.empty and 'Revenue' in orders_df.columns else 0
             total_profit = orders_df['Profit'].sum() if not orders_df.empty and 'Profit' in orders_df.columns else 0
-            total_fraud = len(fraud_df) if not fraud_df.empty else 0
+            work_totals = self._work_log_totals(emp_data.get('work_log', {}), fraud_df)
+            total_fraud = work_totals['total_fraud']
 
             # Tính completion rate
             completion_rate = 0
@@ -687,30 +734,14 @@ class DataProcessor:
             fraud_rate = (total_fraud / total_orders * 100) if total_orders > 0 else 0
 
             # Tính working hours
-            working_hours = 0
-            browser_df = work_log_sheets.get('Browser_Sessions', pd.DataFrame())
-            if browser_df.empty:
-                browser_df = work_log_sheets.get('Browser_Time', pd.DataFrame())
-
-            if not browser_df.empty:
-                if 'Total_Seconds' in browser_df.columns:
-                    working_hours = browser_df['Total_Seconds'].sum() / 3600
-                elif 'Duration_Seconds' in browser_df.columns:
-                    working_hours = browser_df['Duration_Seconds'].sum() / 3600
-                elif 'Hours' in browser_df.columns:
-                    working_hours = browser_df['Hours'].sum()
+            working_hours = work_totals['working_hours']
 
             # Tính orders per hour
             orders_per_hour = total_orders / working_hours if working_hours > 0 else 0
 
             # Phân loại fraud theo severity
-            critical_fraud = 0
-            warning_fraud = 0
-            if not fraud_df.empty and 'Severity' in fraud_df.columns:
-                critical_fraud = len(
-                    fraud_df[fraud_df['Severity'].str.contains('Critical|Nghiêm trọng', case=False, na=False)])
-                warning_fraud = len(
-                    fraud_df[fraud_df['Severity'].str.contains('Warning|Cảnh báo', case=False, na=False)])
+            critical_fraud = work_totals['critical_fraud']
+            warning_fraud = work_totals['warning_fraud']
 
             # Tính overall score (0-100)
             target_revenue_per_month = 10000000  # 10M VND target
@@ -823,11 +854,11 @@ class DataProcessor:
                 # Tạo DataProcessor riêng cho từng nhân viên
                 emp_processor = DataProcessor(emp['name'])
 
-                # Load dữ liệu theo year/month
+                # Load dữ liệu theo year/month (work log chỉ cần rollup)
                 if month:
-                    success = emp_processor.load_year_data(year, month)
+                    success = emp_processor.load_year_data(year, month, include_work_log=False)
                 else:
-                    success = emp_processor.load_year_data(year)
+                    success = emp_processor.load_year_data(year, include_work_log=False)
 
                 if not success:
                     print(f"   ⚠️ Failed to load data for {emp['name']}")
@@ -881,7 +912,8 @@ class DataProcessor:
             total_orders = len(orders_df) if not orders_df.empty else 0
             total_revenue = orders_df['Revenue'].sum() if not orders_df.empty and 'Revenue' in orders_df.columns else 0
             total_profit = orders_df['Profit'].sum() if not orders_df.empty and 'Profit' in orders_df.columns else 0
-            total_fraud = len(fraud_df) if not fraud_df.empty else 0
+            work_totals = self._work_log_totals(emp_data.get('work_log', {}), fraud_df)
+            total_fraud = work_totals['total_fraud']
 
             # Tính completion rate
             completion_rate = 0
@@ -902,30 +934,14 @@ class DataProcessor:
             fraud_rate = (total_fraud / total_orders * 100) if total_orders > 0 else 0
 
             # Tính working hours
-            working_hours = 0
-            browser_df = work_log_sheets.get('Browser_Sessions', pd.DataFrame())
-            if browser_df.empty:
-                browser_df = work_log_sheets.get('Browser_Time', pd.DataFrame())
-
-            if not browser_df.empty:
-                if 'Total_Seconds' in browser_df.columns:
-                    working_hours = browser_df['Total_Seconds'].sum() / 3600
-                elif 'Duration_Seconds' in browser_df.columns:
-                    working_hours = browser_df['Duration_Seconds'].sum() / 3600
-                elif 'Hours' in browser_df.columns:
-                    working_hours = browser_df['Hours'].sum()
+            working_hours = work_totals['working_hours']
 
             # Tính orders per hour
             orders_per_hour = total_orders / working_hours if working_hours > 0 else 0
 
             # Phân loại fraud theo severity
-            critical_fraud = 0
-            warning_fraud = 0
-            if not fraud_df.empty and 'Severity' in fraud_df.columns:
-                critical_fraud = len(
-                    fraud_df[fraud_df['Severity'].str.contains('Critical|Nghiêm trọng', case=False, na=False)])
-                warning_fraud = len(
-                    fraud_df[fraud_df['Severity'].str.contains('Warning|Cảnh báo', case=False, na=False)])
+            critical_fraud = work_totals['critical_fraud']
+            warning_fraud = work_totals['warning_fraud']
 
             # Tính overall score (0-100)
             # Formula: 40% completion + 30% revenue performance + 20% efficiency + 10% compliance
@@ -1063,8 +1079,8 @@ class DataProcessor:
 
         return sorted_data
 
-    def load_period_data(self, year=None, month=None):
-        """Load data for specific period"""
+    def load_period_data(self, year=None, month=None, include_work_log=True):
+        """Load data for specific period (include_work_log=False: work log chỉ lấy rollup, không đọc sheet)"""
         try:
             print(f"🎯 Loading data for: year={year}, month={month}")
 
@@ -1077,7 +1093,7 @@ class DataProcessor:
                 all_data = []
                 for y in years:
                     # Call load_year_data with year and month
-                    success = self.load_year_data(y, month)
+                    success = self.load_year_data(y, month, include_work_log)
                     if success and self.year_data:
                         all_data.append(self.year_data)
 
@@ -1089,14 +1105,14 @@ class DataProcessor:
                     return False
             else:
                 # Specific year
-                return self.load_year_data(year, month)
+                return self.load_year_data(year, month, include_work_log)
 
         except Exception as e:
             print(f"❌ Error loading period data: {e}")
             traceback.print_exc()
             return False
 
-    def load_year_data(self, year=None, month=None):
+    def load_year_data(self, year=None, month=None, include_work_log=True):
         """Load data for specific year and optionally filter by month"""
         try:
             # If no year provided, use current year
@@ -1112,89 +1128,9 @@ class DataProcessor:
                 'summary': {}
             }
 
-            collector = {'work_log': {}, 'sap_data': {}}
-
-            # Load data for all months in year
-            for m in range(1, 13):
-                # If month filter exists, only get that month
-                if month is not None and m != int(month):
-                    continue
-
-                month_str = f"{year_int}_{m:02d}"
-                month_path = self.base_path / self.employee_name / month_str
-
-                if month_path.exists():
-                    # Load work log - Đọc tất cả sheet liên quan
-                    work_log_path = month_path / f"work_logs_{self.employee_name}_{month_str}.xlsx"
-                    if work_log_path.exists():
-                        try:
-                            # Đọc Excel file để lấy danh sách sheet
-                            excel_file = pd.ExcelFile(work_log_path)
-                            sheet_names = excel_file.sheet_names
-
-                            # Đọc từng sheet có tên mong muốn
-                            sheets_to_read = ['Fraud_Events', 'Browser_Sessions', 'Browser_Time',
-                                              'Browser Session', 'Browser Time', 'Session']
-
-                            for sheet_name in sheet_names:
-                                # Tìm sheet phù hợp (không phân biệt hoa thường)
-                                normalized_sheet = sheet_name.lower().replace(' ', '_')
-
-                                if any(target_sheet in normalized_sheet for target_sheet in
-                                       ['fraud_events', 'browser_sessions', 'browser_time', 'session']):
-
-                                    try:
-                                        df = pd.read_excel(work_log_path, sheet_name=sheet_name)
-                                        df['Month'] = m
-                                        df['Year'] = year_int
-
-                                        # Lưu với tên chuẩn hóa
-                                        key_name = 'Fraud_Events' if 'fraud' in normalized_sheet else \
-                                            'Browser_Sessions' if 'session' in normalized_sheet else \
-                                                'Browser_Time'
-
-                                        if key_name not in collector['work_log']:
-                                            collector['work_log'][key_name] = []
-                                        collector['work_log'][key_name].append(df)
-
-                                        print(
-                                            f"   ✅ Read work log sheet '{sheet_name}' month {m}: {len(df)} rows (saved as {key_name})")
-
-                                    except Exception as e:
-                                        print(f"   ⚠️ Error reading sheet {sheet_name} month {m}: {e}")
-                        except Exception as e:
-                            print(f"⚠️ Error reading work log month {m}: {e}")
-
-                    # Load SAP data (giữ nguyên)
-                    sap_path = month_path / "sap_data.xlsx"
-                    if sap_path.exists():
-                        try:
-                            # Read Orders sheet
-                            df_orders = pd.read_excel(sap_path, sheet_name='Orders')
-                            df_orders['Month'] = m
-                            df_orders['Year'] = year_int
-
-                            if 'Orders' not in collector['sap_data']:
-                                collector['sap_data']['Orders'] = []
-                            collector['sap_data']['Orders'].append(df_orders)
-
-                            # Read Daily_Performance sheet if exists
-                            try:
-                                df_daily = pd.read_excel(sap_path, sheet_name='Daily_Performance')
-                                df_daily['Month'] = m
-                                df_daily['Year'] = year_int
-
-                                if 'Daily_Performance' not in collector['sap_data']:
-                                    collector['sap_data']['Daily_Performance'] = []
-                                collector['sap_data']['Daily_Performance'].append(df_daily)
-                            except:
-                                pass
-
-                            print(f"   ✅ Read SAP month {m}: {len(df_orders)} orders")
-                        except Exception as e:
-                            print(f"⚠️ Error reading SAP data month {m}: {e}")
-                else:
-                    print(f"⚠️ Folder not found: {month_path}")
+            collector = self._collect_from_warehouse(year_int, month, include_work_log)
+            if collector is None:
+                collector = self._collect_from_excel(year_int, month)
 
             # Merge data from all months
             for category in ['work_log', 'sap_data']:
@@ -1205,27 +1141,14 @@ class DataProcessor:
                             f"   ✅ Merged {category}.{sheet_name}: {len(year_data[category]['sheets'][sheet_name])} rows")
                     else:
                         year_data[category]['sheets'][sheet_name] = pd.DataFrame()
+            if collector.get('work_log_rollup') is not None:
+                year_data['work_log']['rollup'] = collector['work_log_rollup']
 
-            # Calculate summary
-            orders_df = year_data['sap_data']['sheets'].get('Orders', pd.DataFrame())
-            fraud_df = year_data['work_log']['sheets'].get('Fraud_Events', pd.DataFrame())
-
-            total_orders = len(orders_df) if not orders_df.empty else 0
-            total_revenue = orders_df['Revenue'].sum() if not orders_df.empty and 'Revenue' in orders_df.columns else 0
-            total_profit = orders_df['Profit'].sum() if not orders_df.empty and 'Profit' in orders_df.columns else 0
-            total_fraud = len(fraud_df) if not fraud_df.empty else 0
-
-            year_data['summary'] = {
-                'year': year_int,
-                'employee_name': self.employee_name,
-                'total_orders': total_orders,
-                'total_revenue': total_revenue,
-                'total_profit': total_profit,
-                'total_fraud': total_fraud
-            }
+            year_data['summary'] = self._build_summary(year_data, year_int)
 
             self.year_data = year_data
-            print(f"✅ Loaded data for year {year_int}: {total_orders} orders, {total_revenue:,.0f} revenue")
+            print(f"✅ Loaded data for year {year_int}: {year_data['summary']['total_orders']} orders, "
+                  f"{year_data['summary']['total_revenue']:,.0f} revenue")
 
             return True
 
@@ -1235,6 +1158,131 @@ class DataProcessor:
             traceback.print_exc()
             return False
 
+    @staticmethod
+    def _work_log_key(sheet_name):
+        """Tên sheet work log -> tên chuẩn (Fraud_Events / Browser_Sessions / Browser_Time), None nếu bỏ qua"""
+        normalized_sheet = sheet_name.lower().replace(' ', '_')
+        if not any(target_sheet in normalized_sheet for target_sheet in
+                   ['fraud_events', 'browser_sessions', 'browser_time', 'session']):
+            return None
+        return 'Fraud_Events' if 'fraud' in normalized_sheet else \
+            'Browser_Sessions' if 'session' in normalized_sheet else \
+                'Browser_Time'
+
+    def _collect_from_warehouse(self, year_int, month=None, include_work_log=True):
+        """Sheet theo tháng từ SQLite warehouse (1 query có index / sheet), None nếu không dùng được
+
+        Work log luôn kèm rollup theo ngày (view tháng / năm); sheet thô chỉ đọc khi include_work_log
+        """
+        if not self.USE_WAREHOUSE:
+            return None
+        try:
+            warehouse = get_warehouse(self.base_path)
+            stats = warehouse.sync([self.employee_name])
+            print(f"📦 Warehouse: {stats['ingested']} file cập nhật, {stats['unchanged']} không đổi")
+
+            collector = {'work_log': {}, 'sap_data': {}}
+            collector['work_log_rollup'] = {
+                'daily': warehouse.daily_rollup(self.employee_name, year_int, month),
+                'fraud': warehouse.fraud_breakdown(self.employee_name, year_int, month,
+                                                   by=('month', 'module', 'severity')),
+            }
+            for sheet_name in warehouse.sheet_names(self.employee_name, 'work_log', year_int, month):
+                key_name = self._work_log_key(sheet_name)
+                if key_name is None or not include_work_log:
+                    continue
+                df = warehouse.read(self.employee_name, 'work_log', sheet_name, year_int, month)
+                collector['work_log'].setdefault(key_name, []).append(df)
+                print(f"   ✅ Read work log sheet '{sheet_name}': {len(df)} rows (saved as {key_name})")
+
+            sap_sheets = warehouse.sheet_names(self.employee_name, 'sap_data', year_int, month)
+            for sheet_name in ['Orders', 'Daily_Performance']:
+                if sheet_name in sap_sheets:
+                    df = warehouse.read(self.employee_name, 'sap_data', sheet_name, year_int, month)
+                    collector['sap_data'][sheet_name] = [df]
+                    print(f"   ✅ Read SAP {sheet_name}: {len(df)} rows")
+            return collector
+        except Exception as e:
+            print(f"⚠️ Warehouse unavailable, reading xlsx: {e}")
+            return None
+
+    def _collect_from_excel(self, year_int, month=None):
+        """Đọc từng file xlsx của các tháng trong năm"""
+        collector = {'work_log': {}, 'sap_data': {}}
+
+        # Load data for all months in year
+        for m in range(1, 13):
+            # If month filter exists, only get that month
+            if month is not None and m != int(month):
+                continue
+
+            month_str = f"{year_int}_{m:02d}"
+            month_path = self.base_path / self.employee_name / month_str
+
+            if month_path.exists():
+                # Load work log - Đọc tất cả sheet liên quan
+                work_log_path = month_path / f"work_logs_{self.employee_name}_{month_str}.xlsx"
+                if work_log_path.exists():
+                    try:
+                        # Đọc Excel file để lấy danh sách sheet
+                        sheet_names = sheet_cache.sheet_names(work_log_path)
+
+                        # Đọc từng sheet có tên mong muốn (không phân biệt hoa thường)
+                        for sheet_name in sheet_names:
+                            key_name = self._work_log_key(sheet_name)
+
+                            if key_name is not None:
+
+                                try:
+                                    df = sheet_cache.read_sheet(work_log_path, sheet_name=sheet_name)
+                                    df['Month'] = m
+                                    df['Year'] = year_int
+
+                                    if key_name not in collector['work_log']:
+                                        collector['work_log'][key_name] = []
+                                    collector['work_log'][key_name].append(df)
+
+                                    print(
+                                        f"   ✅ Read work log sheet '{sheet_name}' month {m}: {len(df)} rows (saved as {key_name})")
+
+                                except Exception as e:
+                                    print(f"   ⚠️ Error reading sheet {sheet_name} month {m}: {e}")
+                    except Exception as e:
+                        print(f"⚠️ Error reading work log month {m}: {e}")
+
+                # Load SAP data (giữ nguyên)
+                sap_path = month_path / "sap_data.xlsx"
+                if sap_path.exists():
+                    try:
+                        # Read Orders sheet
+                        df_orders = sheet_cache.read_sheet(sap_path, sheet_name='Orders')
+                        df_orders['Month'] = m
+                        df_orders['Year'] = year_int
+
+                        if 'Orders' not in collector['sap_data']:
+                            collector['sap_data']['Orders'] = []
+                        collector['sap_data']['Orders'].append(df_orders)
+
+                        # Read Daily_Performance sheet if exists
+                        try:
+                            df_daily = sheet_cache.read_sheet(sap_path, sheet_name='Daily_Performance')
+                            df_daily['Month'] = m
+                            df_daily['Year'] = year_int
+
+                            if 'Daily_Performance' not in collector['sap_data']:
+                                collector['sap_data']['Daily_Performance'] = []
+                            collector['sap_data']['Daily_Performance'].append(df_daily)
+                        except:
+                            pass
+
+                        print(f"   ✅ Read SAP month {m}: {len(df_orders)} orders")
+                    except Exception as e:
+                        print(f"⚠️ Error reading SAP data month {m}: {e}")
+            else:
+                print(f"⚠️ Folder not found: {month_path}")
+
+        return collector
+
     def _merge_multiyear_data(self, data_list):
         """Merge data from multiple years"""
         if not data_list:
@@ -1258,17 +1306,31 @@ class DataProcessor:
                             ignore_index=True
                         )
 
+        # Rollup chỉ dùng được khi năm nào cũng đọc từ warehouse
+        rollups = [data['work_log'].get('rollup') for data in data_list]
+        if all(rollup is not None for rollup in rollups):
+            merged_data['work_log']['rollup'] = {
+                part: pd.concat([rollup[part] for rollup in rollups], ignore_index=True)
+                for part in ('daily', 'fraud')
+            }
+
         # Calculate aggregated summary
-        orders_df = merged_data['sap_data']['sheets'].get('Orders', pd.DataFrame())
-        fraud_df = merged_data['work_log']['sheets'].get('Fraud_Events', pd.DataFrame())
+        merged_data['summary'] = self._build_summary(merged_data, 'Multi-year')
+
+        return merged_data
+
+    def _build_summary(self, data, year):
+        """Summary của year_data (fraud từ rollup nếu có)"""
+        orders_df = data['sap_data']['sheets'].get('Orders', pd.DataFrame())
+        fraud_df = data['work_log']['sheets'].get('Fraud_Events', pd.DataFrame())
 
         total_orders = len(orders_df) if not orders_df.empty else 0
         total_revenue = orders_df['Revenue'].sum() if not orders_df.empty and 'Revenue' in orders_df.columns else 0
         total_profit = orders_df['Profit'].sum() if not orders_df.empty and 'Profit' in orders_df.columns else 0
-        total_fraud = len(fraud_df) if not fraud_df.empty else 0
+        total_fraud = self._work_log_totals(data['work_log'], fraud_df)['total_fraud']
 
-        merged_data['summary'] = {
-            'year': 'Multi-year',
+        return {
+            'year': year,
             'employee_name': self.employee_name,
             'total_orders': total_orders,
             'total_revenue': total_revenue,
@@ -1276,8 +1338,6 @@ class DataProcessor:
             'total_fraud': total_fraud
         }
 
-        return merged_data
-
     def load_aggregate_data(self, year=None, month=None):
         """Load and aggregate data from all employees in system"""
         try:
@@ -1302,8 +1362,8 @@ class DataProcessor:
                     continue
 
                 temp_processor = DataProcessor(emp['name'])
-                # Call load_period_data with year and month
-                success = temp_processor.load_period_data(year, month)
+                # Call load_period_data with year and month (work log chỉ cần rollup)
+                success = temp_processor.load_period_data(year, month, include_work_log=False)
 
                 if not success:
                     continue
@@ -1347,8 +1407,14 @@ class DataProcessor:
                                 monthly_data['revenue'][m - 1] += m_df['Revenue'].sum()
                             if 'Profit' in m_df.columns:
                                 monthly_data['profit'][m - 1] += m_df['Profit'].sum()
+            rollup = emp_year_data.get('work_log', {}).get('rollup')
             wl_sheets = emp_year_data.get('work_log', {}).get('sheets', {})
-            if 'Fraud_Events' in wl_sheets:
+            if rollup is not None:
+                daily = rollup['daily']
+                for m, flagged in daily.groupby('month')['fraud_flagged'].sum().items():
+                    if 1 <= m <= 12:
+                        monthly_data['fraud'][m - 1] += int(flagged)
+            elif 'Fraud_Events' in wl_sheets:
                 df_f = wl_sheets['Fraud_Events']
                 if not df_f.empty and 'Month' in df_f.columns:
                     for m in range(1, 13):
@@ -1387,7 +1453,7 @@ class DataProcessor:
         if not Path(file_path).exists():
             return self._get_default_work_log()
         try:
-            df = pd.read_excel(file_path, sheet_name='Fraud_Events')
+            df = sheet_cache.read_sheet(file_path, sheet_name='Fraud_Events')
             return {'summary': {'fraud_count': len(df[df.get('IsFraud') == 1]), 'total_work_hours': 160},
                     'file_found': True}
         except:
@@ -1397,7 +1463,7 @@ class DataProcessor:
         if not Path(file_path).exists():
             return self._get_default_sap_data()
         try:
-            df = pd.read_excel(file_path, sheet_name='Orders')
+            df = sheet_cache.read_sheet(file_path, sheet_name='Orders')
             return {'summary': {'total_revenue': df['Revenue'].sum() if 'Revenue' in df.columns else 0,
                                 'total_orders': len(df)}, 'file_found': True}
         except:
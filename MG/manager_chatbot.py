@@ -14,6 +14,7 @@ import traceback
 import pandas as pd
 
 from MG.email_templates import EmailTemplates
+from Storage import sheet_cache
 
 # Add path to import from Chatbot directory
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -114,7 +115,7 @@ class ManagerChatbotGUI(QMainWindow):
             excel_path = root_path / "employee_ids.xlsx"
 
             if os.path.exists(excel_path):
-                df = pd.read_excel(excel_path)
+                df = sheet_cache.read_sheet(excel_path)
 
                 # Chuẩn hóa tên cột
                 df.columns = [str(col).strip().lower() for col in df.columns]
@@ -0,0 +1,271 @@
+"""
+Backfill AnomalyScore
+Chấm lại toàn bộ session lịch sử (sheet Mouse_Details trong work_logs_*.xlsx) sau khi model đổi
+
+- Mỗi file chấm bằng BehaviorModel.score_batch (theo chunk, không ghi buffer / không retrain)
+  với model riêng của user trong ModelRegistry (chưa có thì model chung)
+- Song song theo file bằng ProcessPoolExecutor, mỗi worker giữ registry riêng (load model 1 lần)
+- Ghi kết quả:
+    table   (mặc định) mouse_scores_<user>_<yyyy_mm>.csv cạnh file work_logs, file gốc không đổi
+    inplace cập nhật cột AnomalyScore trong sheet Mouse_Details (openpyxl, giữ các sheet khác),
+            khớp dòng theo khoá (Timestamp, Event_Type, Session_ID) chứ không theo vị trí;
+            chạy khi app không ghi log (journal còn event chưa compact thì compact trước)
+- Event còn trong journal (.journal.jsonl, chưa compact) cũng được chấm: table đọc xlsx + journal
+
+Chạy:
+    python -m ML_models.backfill_scores --workers 4
+    python -m ML_models.backfill_scores --users EM001 EM002 --months 2026_01 --write inplace
+"""
+
+import io
+import os
+import glob
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ML_models.model_registry import ModelRegistry, MODELS_DIR, PROJECT_ROOT
+from ML_models.xgboost_anomaly import BehaviorModel
+from Mouse.Main_mouse import MouseAnalysisSystem
+from Storage import sheet_cache, work_log_schema
+from Storage.event_journal import EventJournal, DEDUP_KEYS
+
+SAVED_FILE_DIR = os.path.join(PROJECT_ROOT, "Saved_file")
+SHEET_NAME = "Mouse_Details"
+SCORE_COLUMN = "AnomalyScore"
+
+_WORKER_REGISTRY: Optional[ModelRegistry] = None
+
+
+# =========================
+# FILE DISCOVERY
+# =========================
+def find_work_logs(base_dir: str, users: Optional[List[str]] = None,
+                   months: Optional[List[str]] = None) -> List[str]:
+    """Saved_file/<user>/<yyyy_mm>/work_logs_<user>_<yyyy_mm>.xlsx - file lớn trước để chia tải đều"""
+    files = []
+    for user in users or sorted(os.listdir(base_dir)):
+        for month in months or ["*_*"]:
+            files.extend(glob.glob(os.path.join(base_dir, user, month, f"work_logs_{user}_*.xlsx")))
+    return sorted(files, key=os.path.getsize, reverse=True)
+
+
+def score_table_path(path: str) -> str:
+    name = os.path.basename(path).replace("work_logs_", "mouse_scores_", 1)
+    return os.path.join(os.path.dirname(path), os.path.splitext(name)[0] + ".csv")
+
+
+# =========================
+# WORKER
+# =========================
+def _init_worker(models_dir: str, global_model_path: str):
+    global _WORKER_REGISTRY
+    with contextlib.redirect_stdout(io.StringIO()):
+        _WORKER_REGISTRY = ModelRegistry(base_dir=models_dir, global_model_path=global_model_path)
+
+
+def _model_tag(model: BehaviorModel, user_id: str) -> str:
+    if model.is_trained():
+        return f"{user_id}:{os.path.basename(model.booster_path or '')}"
+    fallback = model.fallback_model
+    return f"global:{os.path.basename(fallback.booster_path or '')}" if fallback is not None else "none"
+
+
+def _key_value(value) -> str:
+    """Giá trị cột khoá dạng chuỗi, giống nhau dù pandas hay openpyxl đọc (datetime / str / số)"""
+    if value is None or (isinstance(value, float) and value != value):
+        return ""
+    if hasattr(value, "strftime"):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return str(value).strip()
+
+
+def _write_inplace(path: str, df: pd.DataFrame, scores: np.ndarray) -> int:
+    """
+    Ghi cột AnomalyScore vào sheet Mouse_Details, các sheet khác giữ nguyên.
+    Dòng worksheet khớp với df theo DEDUP_KEYS (dòng trống / lọc / lệch header không làm ghi nhầm dòng).
+    Trả về số dòng đã ghi.
+    """
+    from openpyxl import load_workbook
+
+    keys = [k for k in DEDUP_KEYS if k in df.columns]
+    if "Session_ID" not in keys or "Timestamp" not in keys:
+        raise ValueError(f"{SHEET_NAME} has no Session_ID / Timestamp columns to match rows")
+    score_by_key = {
+        key: round(value, 3)
+        for key, value in zip(zip(*(df[k].map(_key_value) for k in keys)), scores.tolist())
+        if all(key)  # Dòng trống không có khoá
+    }
+
+    wb = load_workbook(path)
+    ws = wb[SHEET_NAME]
+    header = [cell.value for cell in ws[1]]
+    if any(k not in header for k in keys):
+        raise ValueError(f"{SHEET_NAME} header has no {keys} columns")
+    key_cols = [header.index(k) for k in keys]
+    col = header.index(SCORE_COLUMN) + 1 if SCORE_COLUMN in header else len(header) + 1
+    ws.cell(row=1, column=col, value=SCORE_COLUMN)
+
+    written = 0
+    for row in ws.iter_rows(min_row=2):
+        key = tuple(_key_value(row[i].value) if i < len(row) else "" for i in key_cols)
+        value = score_by_key.get(key) if all(key) else None
+        if value is not None:
+            ws.cell(row=row[0].row, column=col, value=value)
+            written += 1
+
+    # Ghi file tạm rồi replace - file gốc không bao giờ bị ghi dở
+    temp_fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".xlsx")
+    os.close(temp_fd)
+    try:
+        wb.save(temp_path)
+        shutil.move(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return written
+
+
+def _read_sessions(path: str, write_mode: str) -> pd.DataFrame:
+    """Mouse_Details gồm cả event còn trong journal; inplace compact journal trước để file có đủ dòng"""
+    journal = EventJournal(path, columns=work_log_schema.SHEET_COLUMNS)
+    if not journal.pending().get(SHEET_NAME):
+        return sheet_cache.read_sheet(path, sheet_name=SHEET_NAME)
+    if write_mode == "inplace":
+        journal.compact()
+        return sheet_cache.read_sheet(path, sheet_name=SHEET_NAME)
+    return journal.read_sheet(SHEET_NAME)
+
+
+def score_file(path: str, write_mode: str = "table", chunk_size: Optional[int] = None) -> Dict:
+    """Chấm lại 1 file work_logs (chạy trong worker process)"""
+    user_id = os.path.basename(os.path.dirname(os.path.dirname(path)))
+    result = {"file": path, "user": user_id, "rows": 0, "status": "ok"}
+    start = time.perf_counter()
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            if _WORKER_REGISTRY is None:
+                _init_worker(MODELS_DIR, BehaviorModel.MODEL_PATH)
+            model = _WORKER_REGISTRY.get(user_id)
+
+            df = _read_sessions(path, write_mode)
+            if df.empty:
+                result["status"] = "empty"
+                return result
+
+            scores = model.score_batch(df, chunk_size)
+
+        if scores is None:
+            result["status"] = "no_model"
+            return result
+
+        old = pd.to_numeric(df.get(SCORE_COLUMN), errors="coerce") if SCORE_COLUMN in df else None
+        threshold = MouseAnalysisSystem.ANOMALY_THRESHOLD
+        result.update({
+            "rows": len(scores),
+            "model": _model_tag(model, user_id),
+            "mean_score": float(scores.mean()),
+            "flagged_new": int((scores > threshold).sum()),
+            "flagged_old": int((old > threshold).sum()) if old is not None else None,
+            "changed": int((np.abs(old.fillna(-1).to_numpy() - scores) > 0.001).sum()) if old is not None else None,
+        })
+
+        if write_mode == "inplace":
+            result["written"] = _write_inplace(path, df, scores)
+            result["output"] = path
+        else:
+            table = pd.DataFrame({
+                "Timestamp": df.get("Timestamp"),
+                "Session_ID": df.get("Session_ID"),
+                "AnomalyScore_Old": old,
+                "AnomalyScore": np.round(scores, 3),
+                "Model": result["model"],
+                "ScoredAt": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            })
+            out_path = score_table_path(path)
+            table.to_csv(out_path, index=False, encoding="utf-8-sig")
+            result["output"] = out_path
+
+    except ValueError as e:  # Không có sheet Mouse_Details
+        result["status"] = f"skipped: {e}"
+    except Exception as e:
+        result["status"] = f"error: {e}"
+    finally:
+        result["seconds"] = round(time.perf_counter() - start, 3)
+
+    return result
+
+
+# =========================
+# DRIVER
+# =========================
+def backfill(files: List[str], write_mode: str = "table", workers: Optional[int] = None,
+             models_dir: str = MODELS_DIR, global_model_path: Optional[str] = None,
+             chunk_size: Optional[int] = None) -> List[Dict]:
+    global_model_path = global_model_path or BehaviorModel.MODEL_PATH
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(files) <= 1:
+        _init_worker(models_dir, global_model_path)
+        return [score_file(path, write_mode, chunk_size) for path in files]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=min(workers, len(files)), initializer=_init_worker,
+                             initargs=(models_dir, global_model_path)) as pool:
+        futures = [pool.submit(score_file, path, write_mode, chunk_size) for path in files]
+        for future in as_completed(futures):
+            results.append(future.result())
+    return results
+
+
+def print_summary(results: List[Dict], elapsed: float):
+    ok = [r for r in results if r["status"] == "ok"]
+    rows = sum(r["rows"] for r in ok)
+    print("=" * 72)
+    print(f"🔁 BACKFILL AnomalyScore - {len(ok)}/{len(results)} files, {rows} rows in {elapsed:.2f}s "
+          f"({rows / elapsed if elapsed > 0 else 0:.0f} rows/s)")
+    print("-" * 72)
+    for r in sorted(results, key=lambda r: r["file"]):
+        name = os.path.basename(r["file"])
+        if r["status"] != "ok":
+            print(f"⚠️ {name:<36} {r['status']}")
+            continue
+        print(f"✅ {name:<36} {r['rows']:>7} rows  mean {r['mean_score']:.3f}  "
+              f"flagged {r['flagged_old']} -> {r['flagged_new']}  changed {r['changed']}  [{r['model']}]"
+              + (f"  wrote {r['written']}" if "written" in r else ""))
+    print("=" * 72)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score historical Mouse_Details sessions with the current models")
+    parser.add_argument("--base-dir", default=SAVED_FILE_DIR)
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--global-model", default=BehaviorModel.MODEL_PATH, help="Model chung cho user chưa có model riêng")
+    parser.add_argument("--users", nargs="*", help="Mặc định: tất cả user trong base-dir")
+    parser.add_argument("--months", nargs="*", help="yyyy_mm, mặc định: tất cả")
+    parser.add_argument("--write", choices=["table", "inplace"], default="table")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    files = find_work_logs(args.base_dir, args.users, args.months)
+    if not files:
+        raise SystemExit(f"❌ No work_logs files found in {args.base_dir}")
+    print(f"📂 {len(files)} work_logs files, writing {args.write}")
+
+    start = time.perf_counter()
+    results = backfill(files, args.write, args.workers, args.models_dir, args.global_model, args.chunk_size)
+    print_summary(results, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark BehaviorModel.predict
+So sánh latency / allocation mỗi lần gọi giữa:
+- legacy: dict -> DataFrame 1 dòng -> reindex -> XGBClassifier.predict_proba
+          + buffer DataFrame 1 dòng (cách làm cũ)
+- fast:   BehaviorModel.predict (vector float32 cấp phát sẵn + booster.inplace_predict,
+          buffer lưu row thuần)
+- compiled: BehaviorModel load lại từ disk -> chấm bằng CompiledModel (NumPy, không xgboost)
+
+Chạy:
+    python -m ML_models.benchmark_predict --calls 2000
+"""
+
+import io
+import os
+import sys
+import time
+import argparse
+import tempfile
+import contextlib
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from ML_models.xgboost_anomaly import BehaviorModel
+
+
+def legacy_predict(model: BehaviorModel, metrics: dict) -> float:
+    """Đường predict cũ (trước fast path) - chỉ dùng để so sánh"""
+    df = pd.DataFrame([model._metrics_to_input_map(metrics)])
+    missing_cols = set(model.selected_features) - set(df.columns)
+    for col in missing_cols:
+        df[col] = 0
+    df = df[model.selected_features]
+    prob = model.xgb_model.predict_proba(df)[0][1]
+    model.new_data_buffer.append(pd.DataFrame([model._metrics_to_input_map(metrics)]))
+    return float(prob)
+
+
+def random_metrics(rng, n):
+    """Metrics giả lập theo format RealTimeProcessor"""
+    keys = list(BehaviorModel.METRIC_KEYS.values())
+    return [dict(zip(keys, rng.uniform(20, 2000, len(keys)).tolist())) for _ in range(n)]
+
+
+def build_model(rng, work_dir) -> BehaviorModel:
+    model = BehaviorModel(model_path=os.path.join(work_dir, "bench_model.pkl"))
+    df = pd.DataFrame(rng.uniform(20, 2000, (400, len(BehaviorModel.ALL_FEATURES))),
+                      columns=BehaviorModel.ALL_FEATURES)
+    if not model.train(df):
+        raise SystemExit("❌ Cannot train benchmark model")
+    model.RETRAIN_THRESHOLD = sys.maxsize  # chỉ đo predict, không retrain
+    return model
+
+
+def time_calls(fn, model, samples):
+    model.new_data_buffer = []
+    latencies = np.empty(len(samples))
+    for i, metrics in enumerate(samples):
+        start = time.perf_counter()
+        fn(model, metrics)
+        latencies[i] = time.perf_counter() - start
+    return latencies * 1e6
+
+
+def alloc_per_call(fn, model, samples):
+    model.new_data_buffer = []
+    tracemalloc.start()
+    peaks = []
+    for metrics in samples:
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        fn(model, metrics)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return float(np.mean(peaks)) / 1024, current / 1024 / len(samples)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark BehaviorModel.predict latency")
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.seed)
+
+    # Artifact train tạm chỉ sống trong lúc đo, không để lại thư mục trong /tmp
+    with tempfile.TemporaryDirectory(prefix="bench_predict_") as work_dir, \
+            contextlib.redirect_stdout(io.StringIO()):
+        model = build_model(rng, work_dir)
+        loaded = BehaviorModel(model_path=model.model_path)  # Model đã lưu -> chấm bằng bản biên dịch
+        loaded.RETRAIN_THRESHOLD = sys.maxsize
+        samples = random_metrics(rng, args.calls)
+
+        paths = {
+            "legacy": (legacy_predict, model),
+            "fast": (lambda m, metrics: m.predict(metrics), model),
+            "compiled": (lambda m, metrics: m.predict(metrics), loaded),
+        }
+
+        # Kiểm tra các đường cho cùng kết quả
+        diff = max(abs(legacy_predict(model, m) - model.predict(m)) for m in samples[:200])
+        compiled_diff = max(abs(model.predict(m) - loaded.predict(m)) for m in samples[:200])
+
+        results = {}
+        for name, (fn, target) in paths.items():
+            time_calls(fn, target, samples[:100])  # warmup
+            lat = time_calls(fn, target, samples)
+            peak_kb, retained_kb = alloc_per_call(fn, target, samples[:200])
+            results[name] = (lat, peak_kb, retained_kb)
+        engine = loaded.get_model_info()['scoring_engine']
+
+    print("=" * 72)
+    print(f"🧪 BehaviorModel.predict - {args.calls} calls, {len(model.selected_features)} features")
+    print(f"✅ Max |legacy - fast| score difference: {diff:.2e}")
+    print(f"✅ Max |fast - compiled| score difference: {compiled_diff:.2e} "
+          f"(engine: {engine})")
+    print("-" * 72)
+    for name, (lat, peak_kb, retained_kb) in results.items():
+        print(f"{name:<8} mean {lat.mean():>8.1f} µs  p50 {np.percentile(lat, 50):>8.1f}  "
+              f"p95 {np.percentile(lat, 95):>8.1f}  | peak {peak_kb:>6.1f} KB  retained {retained_kb:>5.2f} KB/call")
+    speedup = results["legacy"][0].mean() / results["fast"][0].mean()
+    print("-" * 72)
+    print(f"⚡ Speedup: {speedup:.1f}x")
+    print("=" * 72)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""
+Compiled Anomaly Model
+Biên dịch booster XGBoost (binary:logistic) thành mảng NumPy để chấm điểm không cần xgboost / sklearn
+
+- compile_booster(booster): đọc save_raw("json") -> mảng phẳng cho toàn bộ cây
+    feature (int32), threshold (float32), left (int32, chỉ số toàn cục - con phải luôn là left + 1),
+    default_left (bool), value (float32, leaf value), roots (int32), base_margin (float32)
+- CompiledModel.predict_margin(X): duyệt tất cả cây cùng lúc, vectorized theo batch
+    (mỗi vòng đi xuống 1 tầng cho mọi (row, cây), số vòng = độ sâu lớn nhất;
+    node lá trỏ về chính nó với threshold = NaN: so sánh luôn False, kể cả x = ±inf, nên đứng yên)
+- Cộng leaf value theo đúng thứ tự cây bằng float32 như XGBoost -> margin khớp bit với
+  booster.predict(output_margin=True)
+- Xác suất = sigmoid của XGBoost (1 / (expf(-m) + 1)) với expf chép lại thuật toán bảng của glibc
+  (np.exp làm tròn khác libm 1-2 ulp) -> predict_proba khớp bit với xgboost build trên glibc (Linux);
+  trên nền tảng khác (Windows / MSVC CRT, macOS) expf của libm có thể lệch 1 ulp -> parity trong 1 ulp
+- Lưu / đọc dạng npz, API inplace_predict giống xgb.Booster để BehaviorModel dùng thay trực tiếp
+
+Chạy (biên dịch model đã lưu + kiểm tra parity):
+    python -m ML_models.compiled_model --model path/to/user_behavior_xgb_lasso.pkl
+"""
+
+import os
+import json
+import tempfile
+from decimal import Decimal, localcontext
+
+import numpy as np
+
+SUPPORTED_OBJECTIVES = ("binary:logistic",)
+CHUNK_ROWS = 16384  # Giới hạn RAM cho ma trận node (rows x trees)
+SIGMOID_CLAMP = np.float32(88.7)  # xgboost/src/common/math.h: Sigmoid
+
+
+# =========================
+# EXPF (glibc sysdeps/ieee754/flt-32/e_expf.c, EXP2F_TABLE_BITS = 5)
+# =========================
+_EXP_N = 32
+_EXP_SHIFT = float.fromhex("0x1.8p+52")
+_EXP_INV_LN2_N = float.fromhex("0x1.71547652b82fep+0") * _EXP_N
+_EXP_POLY = (
+    float.fromhex("0x1.c6af84b912394p-5") / _EXP_N ** 3,
+    float.fromhex("0x1.ebfce50fac4f3p-3") / _EXP_N ** 2,
+    float.fromhex("0x1.62e42ff0c52d6p-1") / _EXP_N,
+)
+
+
+def _exp2_table() -> np.ndarray:
+    """tab[i] = bits(2^(i/N)) - (i << 52) / N, 2^(i/N) làm tròn đúng sang double"""
+    with localcontext() as ctx:
+        ctx.prec = 40
+        values = [float(Decimal(2) ** (Decimal(i) / _EXP_N)) for i in range(_EXP_N)]
+    bits = np.array(values, dtype=np.float64).view(np.uint64)
+    return bits - (np.arange(_EXP_N, dtype=np.uint64) << np.uint64(47))
+
+
+_EXP_TABLE = _exp2_table()
+
+
+def expf(x) -> np.ndarray:
+    """expf float32 giống hệt libm (vectorized, tính trung gian bằng double)"""
+    z = _EXP_INV_LN2_N * np.asarray(x, dtype=np.float32).astype(np.float64)
+    kd = z + _EXP_SHIFT
+    ki = kd.view(np.uint64)
+    r = z - (kd - _EXP_SHIFT)
+    scale = (_EXP_TABLE[ki % np.uint64(_EXP_N)] + (ki << np.uint64(47))).view(np.float64)
+    c0, c1, c2 = _EXP_POLY
+    y = (c0 * r + c1) * (r * r) + (c2 * r + 1.0)
+    return (y * scale).astype(np.float32)
+
+
+class CompiledModel:
+    """Ensemble cây dạng mảng phẳng + evaluator NumPy"""
+
+    def __init__(self, feature, threshold, left, default_left, value, roots,
+                 base_margin, max_depth, num_feature):
+        self.feature = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float32)
+        self.left = np.asarray(left, dtype=np.int32)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        self.value = np.asarray(value, dtype=np.float32)
+        self.roots = np.asarray(roots, dtype=np.int32)
+        self.base_margin = np.float32(base_margin)
+        self.max_depth = int(max_depth)
+        self.num_feature = int(num_feature)
+
+        # Bảng duyệt: lá trỏ về chính nó với threshold NaN -> "NaN <= x" luôn False (cả x = +inf),
+        # không bao giờ sang phải; x NaN ở lá -> _nan_right False
+        self.is_leaf = self.left < 0
+        nodes = np.arange(len(self.left), dtype=np.int32)
+        self._next = np.where(self.is_leaf, nodes, self.left).astype(np.intp)
+        self._feature = np.where(self.is_leaf, 0, self.feature).astype(np.intp)
+        self._threshold = np.where(self.is_leaf, np.float32(np.nan), self.threshold).astype(np.float32)
+        self._nan_right = ~(self.default_left | self.is_leaf)
+
+    @property
+    def num_trees(self) -> int:
+        return len(self.roots)
+
+    # =========================
+    # EVALUATION
+    # =========================
+    def predict_margin(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        out = np.empty(len(X), dtype=np.float32)
+        for start in range(0, len(X), CHUNK_ROWS):
+            out[start:start + CHUNK_ROWS] = self._margin_chunk(X[start:start + CHUNK_ROWS])
+        return out
+
+    def _margin_chunk(self, X: np.ndarray) -> np.ndarray:
+        X = np.ascontiguousarray(X)
+        flat = X.ravel()
+        row_offset = (np.arange(len(X), dtype=np.intp) * X.shape[1])[:, None]
+        has_nan = bool(np.isnan(flat).any())
+
+        # np.take trên bảng 1 chiều nhanh hơn fancy indexing
+        node = np.repeat(self.roots.astype(np.intp)[None, :], len(X), axis=0)
+        for _ in range(self.max_depth):
+            x = np.take(flat, np.take(self._feature, node) + row_offset)
+            go_right = np.take(self._threshold, node) <= x  # NaN so sánh luôn False -> xử lý riêng
+            if has_nan:
+                missing = np.isnan(x)
+                go_right[missing] = self._nan_right[node[missing]]
+            node = np.take(self._next, node)
+            node += go_right
+
+        # Cộng tuần tự theo thứ tự cây bằng float32 như XGBoost (cumsum không dùng pairwise summation)
+        leaves = np.take(self.value, node)
+        leaves[:, 0] += self.base_margin
+        return np.cumsum(leaves, axis=1, dtype=np.float32)[:, -1]
+
+    def predict_proba(self, X) -> np.ndarray:
+        """Xác suất lớp 1 (float32) - cùng công thức sigmoid với XGBoost"""
+        margin = self.predict_margin(X)
+        return np.float32(1.0) / (expf(np.minimum(-margin, SIGMOID_CLAMP)) + np.float32(1.0))
+
+    def inplace_predict(self, X) -> np.ndarray:
+        """Cùng chữ ký với xgb.Booster.inplace_predict (binary:logistic)"""
+        return self.predict_proba(X)
+
+    # =========================
+    # SAVE / LOAD
+    # =========================
+    def save(self, path: str):
+        """Ghi npz qua file tạm rồi os.replace"""
+        temp_fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix=".npz")
+        os.close(temp_fd)
+        try:
+            np.savez(
+                temp_path,
+                feature=self.feature,
+                threshold=self.threshold,
+                left=self.left,
+                default_left=self.default_left,
+                value=self.value,
+                roots=self.roots,
+                meta=np.array([self.base_margin], dtype=np.float32),
+                shape=np.array([self.max_depth, self.num_feature], dtype=np.int64),
+            )
+            os.replace(temp_path, path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @classmethod
+    def load(cls, path: str) -> "CompiledModel":
+        with np.load(path) as data:
+            max_depth, num_feature = data["shape"].tolist()
+            return cls(data["feature"], data["threshold"], data["left"], data["default_left"],
+                       data["value"], data["roots"], data["meta"][0], max_depth, num_feature)
+
+
+# =========================
+# COMPILE
+# =========================
+def _parse_float(text) -> float:
+    """base_score trong JSON dạng "5E-1" hoặc "[5E-1]" (xgboost >= 3)"""
+    return float(str(text).strip("[]").split(",")[0])
+
+
+def _renumber(tree):
+    """Đánh số lại node theo BFS sao cho con phải = con trái + 1; trả về (thứ tự node cũ, độ sâu)"""
+    left, right = tree["left_children"], tree["right_children"]
+    order, new_id, depth = [0], {0: 0}, 0
+    frontier = [0]
+    while frontier:
+        children = []
+        for n in frontier:
+            if left[n] >= 0:
+                new_id[left[n]], new_id[right[n]] = len(order), len(order) + 1
+                order.extend((left[n], right[n]))
+                children.extend((left[n], right[n]))
+        if children:
+            depth += 1
+        frontier = children
+    return order, new_id, depth
+
+
+def compile_booster(booster) -> CompiledModel:
+    """xgb.Booster -> CompiledModel (chỉ hỗ trợ gbtree, binary:logistic, split số)"""
+    model = json.loads(bytes(booster.save_raw("json")))
+    learner = model["learner"]
+
+    objective = learner["objective"]["name"]
+    if objective not in SUPPORTED_OBJECTIVES:
+        raise ValueError(f"Unsupported objective: {objective}")
+    gbm = learner["gradient_booster"]
+    if gbm.get("name") != "gbtree":
+        raise ValueError(f"Unsupported booster: {gbm.get('name')}")
+
+    feature, threshold, left, default_left, roots = [], [], [], [], []
+    max_depth = 0
+    for tree in gbm["model"]["trees"]:
+        if tree.get("categories_nodes"):
+            raise ValueError("Categorical splits are not supported")
+        offset = len(left)
+        roots.append(offset)
+        order, new_id, depth = _renumber(tree)
+        max_depth = max(max_depth, depth)
+        for n in order:
+            child = tree["left_children"][n]
+            feature.append(tree["split_indices"][n])
+            threshold.append(tree["split_conditions"][n])  # Ở node lá đây là leaf value
+            left.append(new_id[child] + offset if child >= 0 else -1)
+            default_left.append(tree["default_left"][n])
+
+    threshold = np.asarray(threshold, dtype=np.float32)
+    is_leaf = np.asarray(left) < 0
+    value = np.where(is_leaf, threshold, np.float32(0)).astype(np.float32)
+
+    # binary:logistic: base_score lưu ở dạng xác suất -> margin = -logf(1/p - 1)
+    # np.log float32 (SIMD) không làm tròn đúng -> tính log ở double rồi làm tròn về float32 như logf
+    base_score = np.float32(_parse_float(learner["learner_model_param"]["base_score"]))
+    ratio = np.float32(1.0) / base_score - np.float32(1.0)
+    base_margin = np.float32(-np.log(np.float64(ratio)))
+
+    return CompiledModel(feature, threshold, left, default_left, value, roots,
+                         base_margin, max_depth, int(learner["learner_model_param"]["num_feature"]))
+
+
+def check_parity(booster, compiled: CompiledModel, X) -> dict:
+    """So margin và xác suất với xgboost trên X (margin khớp bit; xác suất khớp bit trên glibc, <= 1 ulp nơi khác)"""
+    import xgboost as xgb
+
+    X = np.asarray(X, dtype=np.float32)
+    dmatrix = xgb.DMatrix(X, feature_names=booster.feature_names)
+    margin_ref = booster.predict(dmatrix, output_margin=True).astype(np.float32)
+    proba_ref = booster.predict(dmatrix).astype(np.float32)
+    margin = compiled.predict_margin(X)
+    proba = compiled.predict_proba(X)
+    return {
+        "rows": len(X),
+        "margin_bit_exact": bool(np.array_equal(margin.view(np.int32), margin_ref.view(np.int32))),
+        "proba_bit_exact": bool(np.array_equal(proba.view(np.int32), proba_ref.view(np.int32))),
+        "margin_max_abs_diff": float(np.abs(margin - margin_ref).max()) if len(X) else 0.0,
+        "proba_max_abs_diff": float(np.abs(proba - proba_ref).max()) if len(X) else 0.0,
+        "proba_max_ulp": int(np.abs(proba.view(np.int32) - proba_ref.view(np.int32)).max()) if len(X) else 0,
+    }
+
+
+def main(argv=None):
+    import io
+    import argparse
+    import contextlib
+
+    from ML_models.xgboost_anomaly import BehaviorModel
+
+    parser = argparse.ArgumentParser(description="Compile a saved BehaviorModel for xgboost-free scoring")
+    parser.add_argument("--model", default=BehaviorModel.MODEL_PATH, help="model_path của BehaviorModel")
+    parser.add_argument("--rows", type=int, default=10000, help="Số row ngẫu nhiên kiểm tra parity")
+    args = parser.parse_args(argv)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        model = BehaviorModel(model_path=args.model)
+    if not model.is_trained():
+        raise SystemExit(f"❌ No trained model at {args.model}")
+
+    booster = model.booster
+    compiled = compile_booster(booster)
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 3000, (args.rows, len(model.selected_features))).astype(np.float32)
+    X[rng.random(X.shape) < 0.01] = np.nan
+    result = check_parity(booster, compiled, X)
+
+    model.export_compiled(compiled)
+    print(f"✅ Compiled {compiled.num_trees} trees (max depth {compiled.max_depth}) -> {model.compiled_path}")
+    print(f"📊 Parity on {result['rows']} rows: margin bit-exact {result['margin_bit_exact']}, "
+          f"proba bit-exact {result['proba_bit_exact']} (max {result['proba_max_ulp']} ulp)")
+
+
+if __name__ == "__main__":
+    main()
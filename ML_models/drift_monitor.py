@@ -0,0 +1,149 @@
+"""
+Drift Monitor
+Theo dõi phân phối feature theo từng session so với lúc chọn feature (Lasso)
+
+- Reference: bin theo quantile (DEFAULT_BINS) của data lúc chọn feature + tỉ lệ mỗi bin
+- Mỗi session mới: cộng 1 vào bin tương ứng của từng feature, counts cũ nhân hệ số decay
+  (cửa sổ hiệu dụng ~ WINDOW session) -> O(features x log bins) mỗi session, không giữ row
+- PSI  = sum((a - e) * ln(a / e)) trên tỉ lệ bin (smoothing EPSILON), trừ độ lệch do mẫu hữu hạn
+  ~ (bins - 1) * (1 / n_quan_sát + 1 / n_reference) để không báo drift giả khi mới ít session
+- KS   = max |CDF quan sát - CDF reference| trên biên bin
+- drifted(): có feature PSI > threshold sau ít nhất MIN_SAMPLES session
+
+Lưu dạng dict JSON trong metadata của BehaviorModel.
+"""
+
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+class DriftMonitor:
+    """PSI / KS streaming theo từng feature"""
+
+    DEFAULT_BINS = 10
+    WINDOW = 500  # Số session hiệu dụng của phân phối quan sát
+    MIN_SAMPLES = 200  # Chưa đủ số session thì không kết luận drift
+    PSI_THRESHOLD = 0.25  # PSI > 0.25: phân phối đã đổi đáng kể
+    EPSILON = 1e-4
+
+    def __init__(self, features: Sequence[str], edges: List[np.ndarray], expected: List[np.ndarray],
+                 reference_rows: int, window: Optional[int] = None, created_at: Optional[str] = None):
+        self.features = list(features)
+        self.reference_rows = int(reference_rows)
+        self.edges = [np.asarray(e, dtype=float) for e in edges]  # Biên trong (không gồm min/max)
+        self.expected = [np.asarray(e, dtype=float) for e in expected]
+        self.window = window or self.WINDOW
+        self.decay = 1.0 - 1.0 / self.window
+        self.counts = [np.zeros(len(e)) for e in self.expected]
+        self.weight = 0.0  # Tổng trọng số (đã decay) của session quan sát
+        self.weight_sq = 0.0  # Tổng bình phương trọng số -> số mẫu hiệu dụng
+        self.seen = 0  # Tổng số session từ lúc tạo reference
+        self.created_at = created_at or time.strftime("%Y-%m-%d %H:%M:%S")
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, features: Optional[Sequence[str]] = None,
+                   bins: Optional[int] = None, window: Optional[int] = None) -> "DriftMonitor":
+        """Reference từ data train (thường là history lúc chọn feature)"""
+        features = list(features if features is not None else df.columns)
+        bins = bins or cls.DEFAULT_BINS
+        quantiles = np.linspace(0, 1, bins + 1)[1:-1]
+        edges, expected = [], []
+        for col in features:
+            values = pd.to_numeric(df[col], errors='coerce').fillna(0).to_numpy(float)
+            inner = np.unique(np.quantile(values, quantiles)) if len(values) else np.array([])
+            counts = np.bincount(np.searchsorted(inner, values, side='right'), minlength=len(inner) + 1)
+            edges.append(inner)
+            expected.append(counts / max(counts.sum(), 1))
+        return cls(features, edges, expected, len(df), window)
+
+    # =========================
+    # UPDATE
+    # =========================
+    def update(self, row: Dict[str, float]):
+        """Thêm 1 session (dict feature -> giá trị, thiếu = 0)"""
+        self.weight = self.weight * self.decay + 1.0
+        self.weight_sq = self.weight_sq * self.decay ** 2 + 1.0
+        self.seen += 1
+        for i, col in enumerate(self.features):
+            counts = self.counts[i]
+            counts *= self.decay
+            counts[np.searchsorted(self.edges[i], float(row.get(col, 0) or 0), side='right')] += 1.0
+
+    # =========================
+    # STATISTICS
+    # =========================
+    @property
+    def effective_samples(self) -> float:
+        return self.weight ** 2 / self.weight_sq if self.weight_sq > 0 else 0.0
+
+    def psi(self) -> Dict[str, float]:
+        """PSI từng feature (đã trừ độ lệch mẫu hữu hạn, >= 0)"""
+        if self.weight <= 0:
+            return {col: 0.0 for col in self.features}
+        noise = 1.0 / self.effective_samples + 1.0 / max(self.reference_rows, 1)
+        result = {}
+        for col, expected, counts in zip(self.features, self.expected, self.counts):
+            actual = np.clip(counts / self.weight, self.EPSILON, None)
+            expected = np.clip(expected, self.EPSILON, None)
+            raw = np.sum((actual - expected) * np.log(actual / expected))
+            result[col] = float(max(raw - (len(expected) - 1) * noise, 0.0))
+        return result
+
+    def ks(self) -> Dict[str, float]:
+        if self.weight <= 0:
+            return {col: 0.0 for col in self.features}
+        return {
+            col: float(np.abs(np.cumsum(counts / self.weight) - np.cumsum(expected)).max())
+            for col, expected, counts in zip(self.features, self.expected, self.counts)
+        }
+
+    def drifted(self, threshold: Optional[float] = None) -> bool:
+        if self.seen < self.MIN_SAMPLES:
+            return False
+        threshold = self.PSI_THRESHOLD if threshold is None else threshold
+        return max(self.psi().values(), default=0.0) > threshold
+
+    def info(self, threshold: Optional[float] = None) -> Dict:
+        psi = self.psi()
+        worst = max(psi, key=psi.get) if psi else None
+        return {
+            "reference_created_at": self.created_at,
+            "sessions_since_reference": self.seen,
+            "effective_samples": round(self.effective_samples, 1),
+            "psi_max": round(psi[worst], 4) if worst else 0.0,
+            "psi_max_feature": worst,
+            "ks_max": round(max(self.ks().values(), default=0.0), 4),
+            "drifted": self.drifted(threshold),
+        }
+
+    # =========================
+    # SERIALIZE
+    # =========================
+    def to_dict(self) -> Dict:
+        return {
+            "features": self.features,
+            "reference_rows": self.reference_rows,
+            "edges": [e.tolist() for e in self.edges],
+            "expected": [e.tolist() for e in self.expected],
+            "counts": [c.tolist() for c in self.counts],
+            "weight": self.weight,
+            "weight_sq": self.weight_sq,
+            "seen": self.seen,
+            "window": self.window,
+            "created_at": self.created_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> Optional["DriftMonitor"]:
+        if not data:
+            return None
+        monitor = cls(data["features"], data["edges"], data["expected"], data["reference_rows"],
+                      data.get("window"), data.get("created_at"))
+        monitor.counts = [np.asarray(c, dtype=float) for c in data.get("counts", monitor.counts)]
+        monitor.weight = float(data.get("weight", 0.0))
+        monitor.weight_sq = float(data.get("weight_sq", 0.0))
+        monitor.seen = int(data.get("seen", 0))
+        return monitor
@@ -0,0 +1,125 @@
+"""
+Đánh giá incremental update so với full retrain
+Dữ liệu lấy từ SyntheticTraceGenerator (người = bình thường, bot = bất thường):
+
+1. Train ban đầu trên INITIAL phiên người
+2. Lần lượt đưa STEPS batch phiên người mới vào 2 model:
+   - full:        INCREMENTAL_RETRAIN = False (train lại từ đầu trên toàn bộ history)
+   - incremental: boosting tiếp từ booster cũ (xgb_model= warm start)
+3. Sau mỗi bước so AUC / accuracy trên tập test cố định:
+   người vs anomaly scale (loại model được train để bắt) và người vs bot
+
+Chạy:
+    python -m ML_models.evaluate_incremental --steps 5 --batch 50
+"""
+
+import io
+import os
+import time
+import argparse
+import tempfile
+import contextlib
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import roc_auc_score, accuracy_score
+
+from ML_models.xgboost_anomaly import BehaviorModel
+from Mouse.Module.real_time_processor import RealTimeProcessor
+from Mouse.Module.synthetic_traces import SyntheticTraceGenerator
+
+
+def feature_frame(batch, processor: RealTimeProcessor) -> pd.DataFrame:
+    """Metrics RealTimeProcessor -> DataFrame theo ALL_FEATURES"""
+    rows = []
+    for i in range(len(batch)):
+        events = batch.to_events(i)
+        if len(events) < 5:
+            continue
+        metrics = processor.calculate_all_metrics(events)
+        rows.append({col: metrics.get(BehaviorModel.METRIC_KEYS[col], 0) for col in BehaviorModel.ALL_FEATURES})
+    return pd.DataFrame(rows, columns=BehaviorModel.ALL_FEATURES)
+
+
+def score(model: BehaviorModel, X: pd.DataFrame) -> np.ndarray:
+    return model.xgb_model.predict_proba(X[model.selected_features])[:, 1]
+
+
+def evaluate(model: BehaviorModel, test_sets: dict) -> dict:
+    """AUC người vs từng loại bất thường + accuracy@0.5 người vs anomaly scale"""
+    human = score(model, test_sets["human"])
+    anomaly = score(model, test_sets["anomaly"])
+    bot = score(model, test_sets["bot"])
+    y = np.concatenate([np.zeros(len(human)), np.ones(len(anomaly))])
+    y_bot = np.concatenate([np.zeros(len(human)), np.ones(len(bot))])
+    return {
+        "auc_anomaly": roc_auc_score(y, np.concatenate([human, anomaly])),
+        "acc_anomaly": accuracy_score(y, np.concatenate([human, anomaly]) > 0.5),
+        "auc_bot": roc_auc_score(y_bot, np.concatenate([human, bot])),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare incremental XGBoost updates with full retrain")
+    parser.add_argument("--initial", type=int, default=150, help="Số phiên người train ban đầu")
+    parser.add_argument("--steps", type=int, default=5, help="Số lần update")
+    parser.add_argument("--batch", type=int, default=50, help="Số phiên người mới mỗi lần update")
+    parser.add_argument("--test", type=int, default=300, help="Số phiên test (nửa người, nửa bot)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    np.random.seed(args.seed)  # _generate_anomaly dùng np.random
+    generator = SyntheticTraceGenerator(seed=args.seed)
+    processor = RealTimeProcessor()
+
+    print("🧪 Generating synthetic sessions...")
+    X_initial = feature_frame(generator.generate_human(args.initial), processor)
+    updates = [feature_frame(generator.generate_human(args.batch), processor) for _ in range(args.steps)]
+
+    X_human = feature_frame(SyntheticTraceGenerator(seed=args.seed + 1).generate_human(args.test // 2), processor)
+    X_bot = feature_frame(SyntheticTraceGenerator(seed=args.seed + 2).generate_bot(args.test // 2), processor)
+    test_sets = {
+        "human": X_human,
+        "anomaly": X_human * np.random.uniform(1.5, 3.0, X_human.shape),  # anomaly kiểu _generate_anomaly
+        "bot": X_bot,
+    }
+
+    # Model tạm của 2 chế độ: xoá cùng thư mục khi đánh giá xong
+    with tempfile.TemporaryDirectory(prefix="eval_incremental_") as work_dir:
+        models = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            for name, incremental in (("full", False), ("incremental", True)):
+                model = BehaviorModel(model_path=os.path.join(work_dir, f"{name}.pkl"))
+                model.BACKGROUND_RETRAIN = False
+                model.INCREMENTAL_RETRAIN = incremental
+                model.DRIFT_THRESHOLD = float("inf")  # chỉ so 2 chế độ, không để drift ép full retrain
+                model.train(X_initial)
+                models[name] = model
+
+        print("=" * 84)
+        print(f"{'step':<6}{'mode':<13}{'AUC anom':>10}{'acc anom':>10}{'AUC bot':>10}"
+              f"{'train s':>10}{'trees':>8}{'history':>9}")
+        print("-" * 84)
+        for step, X_new in enumerate(updates, 1):
+            for name, model in models.items():
+                rows = X_new[model.feature_columns].astype(float).values.tolist()
+                start = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    ok = model._retrain_job(rows, model.history.copy())
+                elapsed = time.perf_counter() - start
+                metrics = evaluate(model, test_sets)
+                n_trees = model.xgb_model.get_booster().num_boosted_rounds()
+                print(f"{step:<6}{model.last_retrain_mode or '-':<13}{metrics['auc_anomaly']:>10.4f}"
+                      f"{metrics['acc_anomaly']:>10.4f}{metrics['auc_bot']:>10.4f}{elapsed:>10.3f}{n_trees:>8}{model.history.seen:>9}" + ("" if ok else "  ❌ failed"))
+        print("-" * 84)
+
+        final = {name: evaluate(model, test_sets) for name, model in models.items()}
+        for key in ("auc_anomaly", "auc_bot"):
+            gap = final["full"][key] - final["incremental"][key]
+            print(f"📊 Final {key:<12} full {final['full'][key]:.4f}  |  incremental {final['incremental'][key]:.4f}  "
+                  f"|  gap {gap:+.4f}")
+        print("=" * 84)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,344 @@
+"""
+Đánh giá BehaviorModel offline (chất lượng + chi phí train / chấm điểm)
+
+Dữ liệu:
+- Bình thường: history Mouse_Details trong Saved_file/<user>/<yyyy_mm>/work_logs_*.xlsx
+  (không có file nào thì sinh phiên người bằng SyntheticTraceGenerator)
+- Bất thường có nhãn (chèn vào tập test mỗi fold):
+    scale  row bình thường nhân hệ số 1.5-3 (giống _generate_anomaly)
+    bot    phiên bot từ SyntheticTraceGenerator
+
+Cross-validation K fold trên row bình thường, mỗi fold so các biến thể:
+- full         BehaviorModel.train (Lasso + XGBoost) trên toàn bộ fold train
+- incremental  train trên INITIAL_FRACTION đầu, phần còn lại đưa vào từng batch RETRAIN_THRESHOLD
+               (boosting tiếp từ booster cũ)
+- compiled     model full lưu ra disk rồi load lại -> chấm bằng CompiledModel (không xgboost)
+- robust       chỉ RobustScorer (Welford + Mahalanobis, không giám sát) cập nhật từng session
+- blend        model full + RobustScorer, SCORING_ENGINE = "blend"
+
+Mỗi biến thể: AUC (tổng + theo loại bất thường), precision / recall tại ANOMALY_THRESHOLD,
+thời gian train, peak memory Python (tracemalloc), latency chấm 1 row và throughput chấm batch.
+Kết quả in bảng + ghi JSON report để theo dõi qua các lần thay đổi.
+
+Chạy:
+    python -m ML_models.evaluate_model --folds 5
+    python -m ML_models.evaluate_model --source synthetic --sessions 600 --output report.json
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import roc_auc_score, precision_score, recall_score
+
+from ML_models.xgboost_anomaly import BehaviorModel
+from ML_models.compiled_model import CompiledModel
+from ML_models.evaluate_incremental import feature_frame
+from ML_models.backfill_scores import find_work_logs, SAVED_FILE_DIR, SHEET_NAME
+from Mouse.Main_mouse import MouseAnalysisSystem
+from Mouse.Module.real_time_processor import RealTimeProcessor
+from Mouse.Module.synthetic_traces import SyntheticTraceGenerator
+from Storage import sheet_cache
+
+REPORTS_DIR = os.path.join(SAVED_FILE_DIR, "reports")
+VARIANTS = ("full", "incremental", "compiled", "robust", "blend")
+INITIAL_FRACTION = 0.5  # Phần fold train dùng train ban đầu cho biến thể incremental
+LATENCY_ROWS = 500  # Số row đo latency chấm 1 row
+
+
+# =========================
+# DATA
+# =========================
+def load_history(base_dir: str, users: Optional[List[str]] = None,
+                 months: Optional[List[str]] = None) -> pd.DataFrame:
+    """Gộp sheet Mouse_Details của các file work_logs, giữ ALL_FEATURES dạng số"""
+    frames = []
+    for path in find_work_logs(base_dir, users, months) if os.path.isdir(base_dir) else []:
+        try:
+            df = sheet_cache.read_sheet(path, sheet_name=SHEET_NAME)
+        except ValueError:  # Không có sheet Mouse_Details
+            continue
+        if not df.empty:
+            frames.append(df.reindex(columns=BehaviorModel.ALL_FEATURES))
+    if not frames:
+        return pd.DataFrame(columns=BehaviorModel.ALL_FEATURES)
+
+    df = pd.concat(frames, ignore_index=True).apply(pd.to_numeric, errors='coerce').fillna(0)
+    return df[df['TotalDistance'] > 10].reset_index(drop=True)  # Bỏ phiên idle như _prepare_dataframe
+
+
+def load_data(args) -> Dict:
+    """Row bình thường + row bot có nhãn"""
+    processor = RealTimeProcessor()
+    normal = load_history(args.base_dir, args.users, args.months) if args.source != "synthetic" else None
+    source = "excel"
+    if normal is None or len(normal) < args.folds * BehaviorModel.MIN_TRAIN_SAMPLES * 2:
+        if args.source == "excel":
+            raise SystemExit(f"❌ Not enough Mouse_Details history in {args.base_dir}")
+        source = "synthetic"
+        normal = feature_frame(SyntheticTraceGenerator(seed=args.seed).generate_human(args.sessions), processor)
+
+    bots = feature_frame(SyntheticTraceGenerator(seed=args.seed + 1).generate_bot(args.bots), processor)
+    return {"source": source, "normal": normal.reset_index(drop=True), "bot": bots}
+
+
+def make_folds(n: int, k: int, rng) -> List[np.ndarray]:
+    return np.array_split(rng.permutation(n), k)
+
+
+# =========================
+# MEASURE
+# =========================
+def measure(fn):
+    """Chạy fn, trả về (kết quả, giây, peak MB Python)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = fn()
+    finally:
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, elapsed, peak / 1024 / 1024
+
+
+def quality(scores: np.ndarray, labels: np.ndarray, kinds: np.ndarray, threshold: float) -> Dict:
+    flagged = scores > threshold
+    result = {
+        "auc": float(roc_auc_score(labels, scores)),
+        "precision_at_threshold": float(precision_score(labels, flagged, zero_division=0)),
+        "recall_at_threshold": float(recall_score(labels, flagged, zero_division=0)),
+        "flagged_rate_normal": float(flagged[labels == 0].mean()),
+    }
+    for kind in ("scale", "bot"):
+        mask = (kinds == "normal") | (kinds == kind)
+        if (kinds == kind).any():
+            result[f"auc_{kind}"] = float(roc_auc_score(labels[mask], scores[mask]))
+    return result
+
+
+def latency(model: BehaviorModel, X: pd.DataFrame, batch_fn) -> Dict:
+    """Latency score() 1 row (µs) + throughput chấm batch (rows/s)"""
+    reverse = {col: BehaviorModel.METRIC_KEYS.get(col, col) for col in X.columns}
+    samples = [{reverse[col]: value for col, value in row.items()}
+               for row in X.head(LATENCY_ROWS).to_dict("records")]
+    for metrics in samples[:20]:  # warmup (load lazy)
+        model.score(metrics)
+
+    timings = np.empty(len(samples))
+    for i, metrics in enumerate(samples):
+        start = time.perf_counter()
+        model.score(metrics)
+        timings[i] = time.perf_counter() - start
+    timings *= 1e6
+
+    batch_fn(X)  # warmup
+    start = time.perf_counter()
+    batch_fn(X)
+    batch_seconds = time.perf_counter() - start
+    return {
+        "single_row_us_mean": float(timings.mean()),
+        "single_row_us_p95": float(np.percentile(timings, 95)),
+        "batch_rows": len(X),
+        "batch_rows_per_s": float(len(X) / batch_seconds) if batch_seconds > 0 else None,
+    }
+
+
+# =========================
+# VARIANTS
+# =========================
+def new_model(work_dir: str, name: str, incremental: bool) -> BehaviorModel:
+    model = BehaviorModel(model_path=os.path.join(work_dir, f"{name}.pkl"))
+    model.BACKGROUND_RETRAIN = False
+    model.INCREMENTAL_RETRAIN = incremental
+    model.DRIFT_THRESHOLD = float("inf")  # So 2 chế độ train, không để drift ép full retrain
+    model.RETRAIN_THRESHOLD = sys.maxsize  # score() trong lúc đo không kích hoạt retrain
+    return model
+
+
+def train_robust(model: BehaviorModel, X_train: pd.DataFrame) -> bool:
+    model.robust_scorer.update_many(X_train[model.feature_columns].to_numpy(float))
+    return model.robust_scorer.is_ready()
+
+
+def train_incremental(model: BehaviorModel, X_train: pd.DataFrame) -> bool:
+    split = max(int(len(X_train) * INITIAL_FRACTION), BehaviorModel.MIN_TRAIN_SAMPLES)
+    if not model.train(X_train.iloc[:split]):
+        return False
+    rows = X_train.iloc[split:][model.feature_columns].astype(float).values.tolist()
+    for start in range(0, len(rows), BehaviorModel.RETRAIN_THRESHOLD):
+        if not model._retrain_job(rows[start:start + BehaviorModel.RETRAIN_THRESHOLD], model.history.copy()):
+            return False
+    return True
+
+
+def run_fold(fold: int, X_train: pd.DataFrame, X_test: pd.DataFrame, labels: np.ndarray,
+             kinds: np.ndarray, work_dir: str, variants, threshold: float) -> Dict:
+    results = {}
+    full_model = None
+
+    for name in variants:
+        np.random.seed(fold)  # _generate_anomaly dùng np.random
+        with contextlib.redirect_stdout(io.StringIO()):
+            if name == "compiled":
+                if full_model is None:
+                    full_model = new_model(work_dir, f"full_{fold}", False)
+                    full_model.train(X_train)
+                # Model full đã lưu (kèm bản biên dịch) -> load lại như process tracking
+                model, load_seconds, peak_mb = measure(
+                    lambda: BehaviorModel(model_path=full_model.model_path))
+                model.RETRAIN_THRESHOLD = sys.maxsize
+                if not model.compiled_path:
+                    results[name] = {"status": "no compiled artifact"}
+                    continue
+                compiled = CompiledModel.load(model.compiled_path)
+                ok, train_seconds = True, load_seconds
+                batch_fn = lambda X: compiled.predict_proba(X[model.selected_features].to_numpy(np.float32))
+            else:
+                model = new_model(work_dir, f"{name}_{fold}", name == "incremental")
+                model.SCORING_ENGINE = {"robust": "robust", "blend": "blend"}.get(name, "xgb")
+                train_fn = {
+                    "incremental": lambda: train_incremental(model, X_train),
+                    "robust": lambda: train_robust(model, X_train),
+                }.get(name, lambda: model.train(X_train))
+                ok, train_seconds, peak_mb = measure(train_fn)
+                if name == "full":
+                    full_model = model
+                batch_fn = model.score_batch
+
+            if not ok or (name != "robust" and not model.is_trained()):
+                results[name] = {"status": "training failed"}
+                continue
+
+            scores = np.asarray(batch_fn(X_test), dtype=float)
+            results[name] = {
+                "status": "ok",
+                "train_seconds": train_seconds,
+                "peak_memory_mb": peak_mb,
+                "retrain_steps": model.retrain_count if name == "incremental" else 0,
+                **quality(scores, labels, kinds, threshold),
+                **latency(model, X_test, batch_fn),
+            }
+            results[name]["scoring_engine"] = model.get_model_info()["scoring_engine"]
+            results[name]["anomaly_engine"] = model.SCORING_ENGINE
+            if name == "compiled":
+                reference = full_model.score_batch(X_test)
+                results[name]["parity_bit_exact"] = bool(np.array_equal(
+                    np.asarray(batch_fn(X_test), dtype=np.float32), reference))
+    return results
+
+
+def summarize(folds: List[Dict]) -> Dict:
+    """Mean / std các metric số qua các fold"""
+    summary = {}
+    for name in VARIANTS:
+        runs = [fold[name] for fold in folds if fold.get(name, {}).get("status") == "ok"]
+        if not runs:
+            continue
+        keys = [k for k, v in runs[0].items() if isinstance(v, (int, float)) and not isinstance(v, bool)]
+        summary[name] = {"folds_ok": len(runs)}
+        for key in keys:
+            values = np.array([run[key] for run in runs if run.get(key) is not None], dtype=float)
+            summary[name][key] = {"mean": float(values.mean()), "std": float(values.std())}
+    return summary
+
+
+def print_report(report: Dict):
+    summary = report["summary"]
+    print("=" * 108)
+    print(f"🧪 BehaviorModel evaluation - {report['data']['source']} data, {report['data']['normal_rows']} normal rows, "
+          f"{report['config']['folds']} folds, threshold {report['config']['threshold']}")
+    print("-" * 108)
+    print(f"{'variant':<13}{'AUC':>8}{'AUC scale':>11}{'AUC bot':>9}{'prec@thr':>10}{'recall':>8}"
+          f"{'train s':>9}{'peak MB':>9}{'1 row µs':>10}{'batch rows/s':>14}{'engine':>10}")
+    print("-" * 108)
+    for name, s in summary.items():
+        def m(key, fmt):
+            return format(s[key]["mean"], fmt) if key in s else "-"
+        run = next((f[name] for f in report["folds"] if f.get(name, {}).get("status") == "ok"), {})
+        engine = run.get("scoring_engine") if run.get("anomaly_engine") == "xgb" else run.get("anomaly_engine")
+        print(f"{name:<13}{m('auc', '.4f'):>8}{m('auc_scale', '.4f'):>11}{m('auc_bot', '.4f'):>9}"
+              f"{m('precision_at_threshold', '.4f'):>10}{m('recall_at_threshold', '.4f'):>8}"
+              f"{m('train_seconds', '.3f'):>9}{m('peak_memory_mb', '.1f'):>9}{m('single_row_us_mean', '.1f'):>10}"
+              f"{m('batch_rows_per_s', ',.0f'):>14}{engine or '-':>10}")
+    print("-" * 108)
+    print("ℹ️ compiled: train s = thời gian load model đã lưu; peak MB chỉ tính cấp phát Python/NumPy")
+    print("=" * 108)
+
+
+# =========================
+# MAIN
+# =========================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cross-validated evaluation and benchmark of BehaviorModel variants")
+    parser.add_argument("--source", choices=["auto", "excel", "synthetic"], default="auto",
+                        help="auto: history Excel, không đủ thì synthetic")
+    parser.add_argument("--base-dir", default=SAVED_FILE_DIR)
+    parser.add_argument("--users", nargs="*")
+    parser.add_argument("--months", nargs="*", help="yyyy_mm")
+    parser.add_argument("--sessions", type=int, default=600, help="Số phiên người khi dùng synthetic")
+    parser.add_argument("--bots", type=int, default=150, help="Số phiên bot chèn vào tập test")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--variants", nargs="*", choices=VARIANTS, default=list(VARIANTS))
+    parser.add_argument("--threshold", type=float, default=MouseAnalysisSystem.ANOMALY_THRESHOLD)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", default=None, help="File JSON report (mặc định Saved_file/reports/)")
+    args = parser.parse_args(argv)
+
+    print("📂 Loading data...")
+    data = load_data(args)
+    normal, bots = data["normal"], data["bot"]
+    rng = np.random.default_rng(args.seed)
+    normal_folds = make_folds(len(normal), args.folds, rng)
+    bot_folds = make_folds(len(bots), args.folds, rng)
+    print(f"✅ {len(normal)} normal rows ({data['source']}), {len(bots)} bot rows")
+
+    folds = []
+    for fold in range(args.folds):
+        test_idx = normal_folds[fold]
+        X_train = normal.drop(index=test_idx)
+        X_normal = normal.iloc[test_idx]
+        X_scale = X_normal * rng.uniform(1.5, 3.0, X_normal.shape)
+        X_bot = bots.iloc[bot_folds[fold]]
+        X_test = pd.concat([X_normal, X_scale, X_bot], ignore_index=True)
+        kinds = np.array(["normal"] * len(X_normal) + ["scale"] * len(X_scale) + ["bot"] * len(X_bot))
+        labels = (kinds != "normal").astype(int)
+
+        print(f"🔁 Fold {fold + 1}/{args.folds}: train {len(X_train)}, test {len(X_test)}")
+        # Model của fold chỉ cần trong lúc đo - chỉ report (--output) được giữ lại sau khi chạy
+        with tempfile.TemporaryDirectory(prefix="eval_model_") as work_dir:
+            folds.append(run_fold(fold, X_train, X_test, labels, kinds, work_dir, args.variants, args.threshold))
+
+    report = {
+        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "data": {"source": data["source"], "normal_rows": len(normal), "bot_rows": len(bots)},
+        "model": {
+            "feature_version": BehaviorModel.FEATURE_VERSION,
+            "retrain_threshold": BehaviorModel.RETRAIN_THRESHOLD,
+            "incremental_rounds": BehaviorModel.INCREMENTAL_ROUNDS,
+        },
+        "summary": summarize(folds),
+        "folds": folds,
+    }
+    print_report(report)
+
+    output = args.output or os.path.join(REPORTS_DIR, f"model_eval_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"💾 Report saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Training History Store
+Giữ history train của BehaviorModel có giới hạn, thay cho history_df tăng vô hạn
+
+- Reservoir (Algorithm R): mẫu đều trên TOÀN BỘ data từng thấy, kích thước cố định
+- Recent window: N row mới nhất không được chọn vào reservoir (deque)
+- to_frame() = reservoir + recent: data gần đây giữ đủ, data cũ chỉ còn mẫu với xác suất
+  cap/seen -> trọng số giảm dần theo thời gian, không trùng row
+
+Lưu riêng khỏi file model dạng npz cột float32 (nén) nên load model không phải
+deserialize cả tập train.
+"""
+
+import os
+import tempfile
+from collections import deque
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+class HistoryStore:
+    """History train có giới hạn: reservoir sample + cửa sổ gần đây"""
+
+    RESERVOIR_SIZE = 2000
+    RECENT_SIZE = 500
+
+    def __init__(self, columns: Sequence[str], reservoir_size: Optional[int] = None,
+                 recent_size: Optional[int] = None, seed: Optional[int] = None):
+        self.columns = list(columns)
+        self.reservoir_size = reservoir_size or self.RESERVOIR_SIZE
+        self.recent_size = recent_size or self.RECENT_SIZE
+        self.reservoir: List[List[float]] = []
+        self.recent = deque(maxlen=self.recent_size)
+        self.seen = 0  # Tổng số row từng add (cho Algorithm R)
+        self.dirty = False  # Có thay đổi chưa lưu
+        self._rng = np.random.default_rng(seed)
+
+    def __len__(self) -> int:
+        return len(self.reservoir) + len(self.recent)
+
+    # =========================
+    # UPDATE
+    # =========================
+    def add(self, df: pd.DataFrame):
+        """Thêm row mới (cột thiếu = 0)"""
+        if df is None or df.empty:
+            return
+        rows = df.reindex(columns=self.columns, fill_value=0).astype(float).values.tolist()
+
+        for row in rows:
+            if len(self.reservoir) < self.reservoir_size:
+                self.reservoir.append(row)
+            else:
+                j = int(self._rng.integers(0, self.seen + 1))
+                if j < self.reservoir_size:
+                    self.reservoir[j] = row
+                else:
+                    self.recent.append(row)
+            self.seen += 1
+        self.dirty = True
+
+    def copy(self) -> "HistoryStore":
+        """Bản sao độc lập - retrain nền thêm data vào bản sao rồi swap"""
+        other = HistoryStore(self.columns, self.reservoir_size, self.recent_size)
+        other.reservoir = [list(row) for row in self.reservoir]
+        other.recent.extend(self.recent)
+        other.seen = self.seen
+        other.dirty = self.dirty
+        other._rng = np.random.default_rng(self._rng.integers(0, 2 ** 63))
+        return other
+
+    # =========================
+    # READ
+    # =========================
+    def to_frame(self) -> Optional[pd.DataFrame]:
+        """Data train: reservoir + recent window (None nếu rỗng)"""
+        if not len(self):
+            return None
+        return pd.DataFrame(self.reservoir + list(self.recent), columns=self.columns)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, **kwargs) -> "HistoryStore":
+        store = cls(df.columns if df is not None else [], **kwargs)
+        store.add(df)
+        return store
+
+    # =========================
+    # SAVE / LOAD
+    # =========================
+    def save(self, path: str) -> bool:
+        """Ghi npz (float32, nén) qua file tạm rồi os.replace"""
+        try:
+            directory = os.path.dirname(path) or '.'
+            temp_fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".npz")
+            os.close(temp_fd)
+
+            width = len(self.columns)
+            np.savez_compressed(
+                temp_path,
+                columns=np.array(self.columns, dtype=str),
+                reservoir=np.asarray(self.reservoir, dtype=np.float32).reshape(-1, width),
+                recent=np.asarray(list(self.recent), dtype=np.float32).reshape(-1, width),
+                meta=np.array([self.seen, self.reservoir_size, self.recent_size], dtype=np.int64),
+            )
+            os.replace(temp_path, path)
+            self.dirty = False
+            return True
+
+        except Exception as e:
+            print(f"❌ Error saving history: {e}")
+            if 'temp_path' in locals() and os.path.exists(temp_path):
+                os.remove(temp_path)
+            return False
+
+    @classmethod
+    def load(cls, path: str, reservoir_size: Optional[int] = None,
+             recent_size: Optional[int] = None) -> Optional["HistoryStore"]:
+        """Đọc npz; cap mới nhỏ hơn cap lúc lưu thì cắt bớt"""
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with np.load(path) as data:
+                columns = data["columns"].tolist()
+                reservoir = data["reservoir"].astype(float).tolist()
+                recent = data["recent"].astype(float).tolist()
+                seen, saved_reservoir, saved_recent = data["meta"].tolist()
+
+            store = cls(columns, reservoir_size or saved_reservoir, recent_size or saved_recent)
+            store.reservoir = reservoir[:store.reservoir_size]
+            store.recent.extend(recent)
+            store.seen = max(seen, len(store.reservoir))
+            return store
+
+        except Exception as e:
+            print(f"⚠️ Failed to load history {path}: {e}")
+            return None
+
+    def info(self) -> dict:
+        return {
+            "reservoir": len(self.reservoir),
+            "recent": len(self.recent),
+            "seen": self.seen,
+            "reservoir_size": self.reservoir_size,
+            "recent_size": self.recent_size,
+        }
@@ -0,0 +1,154 @@
+"""
+Model Registry
+BehaviorModel riêng cho từng user thay cho 1 file model dùng chung
+
+Layout:
+    Saved_file/models/<user_id>/user_behavior_xgb_lasso.json        # metadata
+    Saved_file/models/<user_id>/user_behavior_xgb_lasso.<stamp>.ubj # booster
+    Saved_file/models/<user_id>/user_behavior_xgb_lasso.<stamp>.trees.npz # booster biên dịch (chấm điểm)
+    Saved_file/models/<user_id>/user_behavior_xgb_lasso_history.npz # history
+
+- LRU trong RAM (OrderedDict) giới hạn số model, model bị đẩy ra được lưu buffer trước
+- Lazy: get() chỉ đọc metadata JSON, bản biên dịch (hoặc booster) load ở lần predict đầu
+- Cold start: user chưa có model riêng được chấm bằng model chung (BehaviorModel.MODEL_PATH)
+  và vẫn tích luỹ data để tự train model riêng
+- Ghi file từng user atomic (BehaviorModel ghi file tạm rồi os.replace, metadata ghi sau cùng)
+- Thư mục user = user_id nếu chỉ gồm [\w.-], còn lại thay ký tự lạ bằng "_" + 8 ký tự sha1 của id
+  (vd. "a/b" và "a_b" không dùng chung thư mục)
+- Load model (đọc artifact, metadata) chạy ngoài lock: cold load của 1 user không chặn get() của user khác
+"""
+
+import os
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from ML_models.xgboost_anomaly import BehaviorModel
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODELS_DIR = os.path.join(PROJECT_ROOT, "Saved_file", "models")
+MODEL_FILE_NAME = "user_behavior_xgb_lasso.pkl"  # Tên gốc, artifact thật là .json / .ubj / .trees.npz / .npz
+
+
+class ModelRegistry:
+    """Quản lý BehaviorModel theo user_id với LRU cache"""
+
+    MAX_CACHED_MODELS = 64
+
+    def __init__(self, base_dir: str = MODELS_DIR, max_models: Optional[int] = None,
+                 global_model_path: Optional[str] = None):
+        self.base_dir = base_dir
+        self.max_models = max_models or self.MAX_CACHED_MODELS
+        self.global_model_path = global_model_path or BehaviorModel.MODEL_PATH
+        self._models: "OrderedDict[str, BehaviorModel]" = OrderedDict()
+        self._global_model = None
+        self._lock = threading.RLock()
+
+        # Thống kê cache
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # =========================
+    # PATHS
+    # =========================
+    @staticmethod
+    def _safe_user_id(user_id: str) -> str:
+        user_id = str(user_id).strip()
+        safe = re.sub(r"[^\w.-]", "_", user_id)
+        if safe != user_id:
+            # Id không giữ nguyên được -> thêm hash để 2 id khác nhau không trùng thư mục
+            safe += "_" + hashlib.sha1(user_id.encode("utf-8")).hexdigest()[:8]
+        return safe or "_unknown"
+
+    def model_path(self, user_id: str) -> str:
+        return os.path.join(self.base_dir, self._safe_user_id(user_id), MODEL_FILE_NAME)
+
+    def has_model(self, user_id: str) -> bool:
+        """User đã có model riêng trên disk chưa (không load)"""
+        meta_path = os.path.splitext(self.model_path(user_id))[0] + ".json"
+        return os.path.exists(meta_path)
+
+    def list_users(self) -> List[str]:
+        if not os.path.isdir(self.base_dir):
+            return []
+        return sorted(name for name in os.listdir(self.base_dir) if self.has_model(name))
+
+    # =========================
+    # ACCESS
+    # =========================
+    def get_global(self) -> BehaviorModel:
+        """Model chung (cold start) - luôn giữ trong RAM, không tính vào LRU"""
+        with self._lock:
+            if self._global_model is not None:
+                return self._global_model
+
+        model = BehaviorModel(model_path=self.global_model_path)  # Load ngoài lock
+        with self._lock:
+            if self._global_model is None:  # Thread khác load xong trước thì dùng bản đó
+                self._global_model = model
+            return self._global_model
+
+    def get(self, user_id: str) -> BehaviorModel:
+        """Model của user (load lazy, chưa có thì tạo mới với fallback = model chung)"""
+        key = self._safe_user_id(user_id)
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return model
+            self.misses += 1
+
+        # Load ngoài lock: đọc artifact / metadata của user này không chặn user khác
+        loaded = BehaviorModel(model_path=self.model_path(user_id))
+        loaded.fallback_model = self.get_global()
+
+        evicted = []
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:  # Thread khác chưa load cùng user trong lúc ta load
+                model = self._models[key] = loaded
+                while len(self._models) > self.max_models:
+                    _, oldest = self._models.popitem(last=False)
+                    self.evictions += 1
+                    evicted.append(oldest)
+            self._models.move_to_end(key)
+
+        for oldest in evicted:  # Lưu buffer (ghi disk) ngoài lock
+            self._release(oldest)
+        return model
+
+    def evict(self, user_id: str):
+        """Bỏ model khỏi RAM (lưu buffer trước)"""
+        with self._lock:
+            model = self._models.pop(self._safe_user_id(user_id), None)
+        if model is not None:
+            self._release(model)
+
+    @staticmethod
+    def _release(model: BehaviorModel):
+        # Retrain nền đang chạy sẽ tự lưu khi xong; còn lại chỉ cần lưu buffer chưa train
+        if not model.is_retraining() and model.new_data_buffer:
+            model._safe_save_model()
+
+    def save_all(self):
+        """Lưu buffer của toàn bộ model đang cache (khi tắt process)"""
+        with self._lock:
+            models = list(self._models.values())
+        for model in models:
+            self._release(model)
+
+    def info(self) -> Dict:
+        with self._lock:
+            return {
+                "cached_models": len(self._models),
+                "max_models": self.max_models,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "global_model_loaded": self._global_model is not None and self._global_model.is_trained(),
+                "cached_users": list(self._models.keys()),
+            }
@@ -0,0 +1,127 @@
+"""
+Robust Scorer
+Chấm điểm bất thường không giám sát theo thống kê riêng từng user (engine thay / kết hợp XGBoost)
+
+- Feature đưa về log: sign(x) * log1p(|x|) (tốc độ, quãng đường lệch phải rất mạnh)
+- Welford mean / covariance cập nhật O(k^2) mỗi session (k = số feature, không phụ thuộc số session)
+- Sau WARMUP_SAMPLES session, giá trị mới bị kẹp trong mean ± CLIP_SIGMA * std trước khi cập nhật
+  -> session bất thường không kéo lệch thống kê (winsorize)
+- Covariance co về đường chéo khi còn ít mẫu: S * n / (n + k) + diag(S) * k / (n + k)
+- Điểm: Mahalanobis d^2 ~ chi2(k) -> p-value đuôi (xấp xỉ Wilson-Hilferty, chỉ dùng math)
+        score = -log10(p) / TAIL_LOG10_SPAN, kẹp [0, 1]  (0.75 ~ p = 1e-3 với span 4)
+- Lưu: count + mean (k) + tam giác trên của M2 (k(k+1)/2) -> 66 số với 10 feature
+
+Không import sklearn / xgboost / scipy.
+"""
+
+import math
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+
+class RobustScorer:
+    """Welford mean / covariance + Mahalanobis cho 1 user"""
+
+    MIN_SAMPLES = 10  # Số session tối thiểu trước khi chấm điểm
+    WARMUP_SAMPLES = 30  # Trước số này cập nhật không kẹp giá trị
+    CLIP_SIGMA = 4.0
+    TAIL_LOG10_SPAN = 4.0  # score = 1 khi p-value <= 1e-4
+    RIDGE = 1e-6
+
+    def __init__(self, features: Sequence[str]):
+        self.features = list(features)
+        k = len(self.features)
+        self.count = 0
+        self.mean = np.zeros(k)
+        self.m2 = np.zeros((k, k))
+        self._inverse = None  # Cache nghịch đảo covariance (tính lại sau mỗi update)
+
+    @staticmethod
+    def transform(X) -> np.ndarray:
+        X = np.nan_to_num(np.asarray(X, dtype=float))
+        return np.sign(X) * np.log1p(np.abs(X))
+
+    def is_ready(self) -> bool:
+        return self.count >= self.MIN_SAMPLES
+
+    # =========================
+    # UPDATE
+    # =========================
+    def update(self, row: Sequence[float]):
+        """Thêm 1 session (row theo thứ tự features)"""
+        x = self.transform(row)
+        if self.count >= self.WARMUP_SAMPLES:
+            std = np.sqrt(np.diag(self.m2) / (self.count - 1))
+            x = np.clip(x, self.mean - self.CLIP_SIGMA * std, self.mean + self.CLIP_SIGMA * std)
+
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += np.outer(delta, x - self.mean)
+        self._inverse = None
+
+    def update_many(self, rows):
+        for row in np.asarray(rows, dtype=float):
+            self.update(row)
+
+    # =========================
+    # SCORE
+    # =========================
+    def covariance(self) -> np.ndarray:
+        k = len(self.features)
+        sample = self.m2 / max(self.count - 1, 1)
+        shrink = k / (self.count + k)
+        return (1 - shrink) * sample + shrink * np.diag(np.diag(sample)) + self.RIDGE * np.eye(k)
+
+    def distance_sq(self, X) -> np.ndarray:
+        """Mahalanobis d^2 cho mảng (n, k) theo thứ tự features"""
+        if self._inverse is None:
+            self._inverse = np.linalg.pinv(self.covariance())
+        diff = self.transform(np.atleast_2d(X)) - self.mean
+        return np.einsum("ij,jk,ik->i", diff, self._inverse, diff)
+
+    def score_many(self, X) -> Optional[np.ndarray]:
+        """Điểm [0, 1] cho nhiều session; None nếu chưa đủ mẫu"""
+        if not self.is_ready():
+            return None
+        k = len(self.features)
+        d2 = self.distance_sq(X)
+        # Wilson-Hilferty: (d2 / k)^(1/3) ~ N(1 - 2/(9k), 2/(9k))
+        z = (np.cbrt(d2 / k) - (1 - 2 / (9 * k))) / math.sqrt(2 / (9 * k))
+        tail = np.array([0.5 * math.erfc(v / math.sqrt(2)) for v in z])
+        scores = -np.log10(np.clip(tail, 1e-300, 1.0)) / self.TAIL_LOG10_SPAN
+        return np.clip(scores, 0.0, 1.0)
+
+    def score(self, row: Sequence[float]) -> Optional[float]:
+        scores = self.score_many([row])
+        return float(scores[0]) if scores is not None else None
+
+    # =========================
+    # SERIALIZE
+    # =========================
+    def to_dict(self) -> Dict:
+        upper = np.triu_indices(len(self.features))
+        return {
+            "features": self.features,
+            "count": self.count,
+            "mean": self.mean.tolist(),
+            "m2": self.m2[upper].tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict]) -> Optional["RobustScorer"]:
+        if not data:
+            return None
+        scorer = cls(data["features"])
+        k = len(scorer.features)
+        upper = np.triu_indices(k)
+        m2 = np.zeros((k, k))
+        m2[upper] = data["m2"]
+        scorer.m2 = m2 + np.triu(m2, 1).T
+        scorer.mean = np.asarray(data["mean"], dtype=float)
+        scorer.count = int(data["count"])
+        return scorer
+
+    def info(self) -> Dict:
+        return {"samples": self.count, "ready": self.is_ready()}
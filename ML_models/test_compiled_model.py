@@ -0,0 +1,85 @@
+"""
+Parity test CompiledModel vs xgb.Booster.inplace_predict trên booster ngẫu nhiên (kể cả NaN / ±inf)
+
+Chạy:
+    python -m pytest -q ML_models/test_compiled_model.py
+"""
+
+import platform
+
+import numpy as np
+import pytest
+
+xgb = pytest.importorskip("xgboost")
+
+from ML_models.compiled_model import CompiledModel, compile_booster
+
+# expf chép từ glibc: khớp bit khi xgboost dùng libm của glibc, nơi khác cho phép lệch 1 ulp
+GLIBC = platform.system() == "Linux" and platform.libc_ver()[0] == "glibc"
+MAX_PROBA_ULP = 0 if GLIBC else 1
+
+
+def _random_booster(seed, num_feature=8, max_depth=4, rounds=20, missing_rate=0.1):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(800, num_feature)).astype(np.float32)
+    X[rng.random(X.shape) < missing_rate] = np.nan
+    y = (np.nansum(X[:, :3], axis=1) + rng.normal(scale=0.5, size=len(X)) > 0).astype(int)
+    params = {"objective": "binary:logistic", "max_depth": max_depth, "eta": 0.3, "seed": seed}
+    return xgb.train(params, xgb.DMatrix(X, label=y), num_boost_round=rounds)
+
+
+def _inputs(seed, num_feature=8, rows=2000):
+    """Row ngẫu nhiên + NaN + ±inf + 0 / giá trị rất lớn"""
+    rng = np.random.default_rng(seed + 1000)
+    X = rng.normal(scale=2.0, size=(rows, num_feature)).astype(np.float32)
+    X[rng.random(X.shape) < 0.05] = np.nan
+    X[rng.random(X.shape) < 0.05] = np.inf
+    X[rng.random(X.shape) < 0.05] = -np.inf
+    special = np.array([
+        [np.inf] * num_feature,
+        [-np.inf] * num_feature,
+        [np.nan] * num_feature,
+        [0.0] * num_feature,
+        [3e38] * num_feature,
+    ], dtype=np.float32)
+    return np.vstack([X, special])
+
+
+def _max_ulp(a, b):
+    return int(np.abs(a.view(np.int32).astype(np.int64) - b.view(np.int32).astype(np.int64)).max())
+
+
+@pytest.mark.parametrize("seed,max_depth,rounds", [(0, 1, 5), (1, 3, 20), (2, 6, 50), (3, 8, 30)])
+def test_margin_bit_exact(seed, max_depth, rounds):
+    booster = _random_booster(seed, max_depth=max_depth, rounds=rounds)
+    compiled = compile_booster(booster)
+    X = _inputs(seed)
+    expected = booster.inplace_predict(X, predict_type="margin").astype(np.float32)
+    np.testing.assert_array_equal(compiled.predict_margin(X).view(np.int32), expected.view(np.int32))
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_proba_parity(seed):
+    booster = _random_booster(seed, max_depth=5, rounds=40)
+    compiled = compile_booster(booster)
+    X = _inputs(seed)
+    expected = booster.inplace_predict(X).astype(np.float32)
+    assert _max_ulp(compiled.inplace_predict(X), expected) <= MAX_PROBA_ULP
+
+
+def test_infinite_inputs_stay_on_leaf():
+    """x = +inf ở node lá không được đi tiếp sang node khác"""
+    booster = _random_booster(7, num_feature=4, max_depth=2, rounds=10, missing_rate=0.0)
+    compiled = compile_booster(booster)
+    X = np.array([[np.inf] * 4, [-np.inf] * 4, [np.inf, np.nan, -np.inf, 1.0]], dtype=np.float32)
+    expected = booster.inplace_predict(X, predict_type="margin").astype(np.float32)
+    np.testing.assert_array_equal(compiled.predict_margin(X), expected)
+
+
+def test_save_load_roundtrip(tmp_path):
+    booster = _random_booster(4)
+    compiled = compile_booster(booster)
+    path = str(tmp_path / "model.npz")
+    compiled.save(path)
+    X = _inputs(4)
+    np.testing.assert_array_equal(CompiledModel.load(path).predict_margin(X), compiled.predict_margin(X))
@@ -5,20 +5,34 @@ Lasso (Feature Selection) + XGBoost (Binary Classification)
 - Learn from historical Excel data
 - Retrain safely when new data appears
 - Stable, production-friendly
+
+Artifact (cùng tên gốc với model_path):
+- <model>.<stamp>.ubj   booster XGBoost dạng native UBJ (tên mới mỗi lần đổi booster)
+- <model>.<stamp>.trees.npz  booster biên dịch sang mảng NumPy (CompiledModel, cùng stamp với booster)
+- <model>.json          metadata: selected features, scaler, feature version, buffer, tên file booster,
+                        drift monitor (phân phối feature so với lúc chọn feature), robust scorer
+                        (ghi sau booster -> đổi metadata là điểm commit, crash giữa chừng vẫn đọc được bản cũ)
+- <model>_history.npz   history train (HistoryStore)
+sklearn / xgboost chỉ import khi cần (train, load booster) - load để chấm điểm chỉ đọc JSON,
+chấm điểm model đã lưu dùng bản biên dịch (không import xgboost).
 """
 
 import os
+import json
 import pickle
 import numpy as np
 import pandas as pd
 import tempfile
 import shutil
-from typing import Dict, Optional
+import threading
+import time
+from typing import Dict, List, Optional
 
-from sklearn.linear_model import LassoCV
-from sklearn.preprocessing import StandardScaler
-from sklearn.feature_selection import SelectFromModel
-import xgboost as xgb
+from Mouse.Module.kinematic_features import KINEMATIC_FEATURES_V1
+from ML_models.history_store import HistoryStore
+from ML_models.compiled_model import CompiledModel, compile_booster
+from ML_models.drift_monitor import DriftMonitor
+from ML_models.robust_scorer import RobustScorer
 
 
 class BehaviorModel:
@@ -32,16 +46,158 @@ class BehaviorModel:
         'XAxisDistance', 'YAxisDistance'
     ]
 
+    # Map tên feature -> key trong metrics của RealTimeProcessor
+    # (feature động học mở rộng dùng trực tiếp tên feature làm key)
+    METRIC_KEYS = {
+        'Velocity': 'velocity_ui',
+        'Acceleration': 'acceleration_ui',
+        'XFlips': 'x_flips_ui',
+        'YFlips': 'y_flips_ui',
+        'TotalDistance': 'distance_ui',
+        'MovementTimeSpan': 'movement_time_span_ui',
+        'XVelocity': 'x_axis_velocity_ui',
+        'YVelocity': 'y_axis_velocity_ui',
+        'XAxisDistance': 'x_axis_distance_ui',
+        'YAxisDistance': 'y_axis_distance_ui'
+    }
+
+    # Schema feature có version - model cũ (không lưu version) mặc định là 1
+    FEATURE_SCHEMAS = {
+        1: ALL_FEATURES,
+        2: ALL_FEATURES + KINEMATIC_FEATURES_V1
+    }
+    FEATURE_VERSION = 1  # Version dùng khi train model mới
+
     MIN_TRAIN_SAMPLES = 20
     RETRAIN_THRESHOLD = 50  # Retrain khi có đủ 50 samples mới
-
-    def __init__(self):
-        self.xgb_model = None
-        self.scaler = StandardScaler()
+    BACKGROUND_RETRAIN = True  # Retrain ở worker thread, không chặn vòng tracking
+
+    # Incremental: boosting tiếp từ booster cũ trên data mới + mẫu replay data cũ
+    INCREMENTAL_RETRAIN = True
+    INCREMENTAL_ROUNDS = 20  # Số cây thêm mỗi lần update
+    REPLAY_SAMPLES = 200  # Số row history trộn vào mỗi lần update
+    MAX_INCREMENTAL_UPDATES = 10  # Quá số lần này thì full retrain (giới hạn số cây)
+    DRIFT_THRESHOLD = DriftMonitor.PSI_THRESHOLD  # PSI lớn nhất coi là drift -> full retrain + chọn lại feature
+
+    # History train có giới hạn (lưu riêng file <model>_history.npz)
+    HISTORY_RESERVOIR_SIZE = 2000  # Mẫu đều trên toàn bộ data từng thấy
+    HISTORY_RECENT_SIZE = 500  # Row gần đây nhất
+    MAX_BUFFER_SAMPLES = RETRAIN_THRESHOLD * 10  # Retrain lỗi liên tục thì bỏ row cũ nhất
+
+    ARTIFACT_FORMAT = 2  # 1 = pickle cả object (cũ), 2 = booster .ubj + metadata .json
+
+    SCORE_CHUNK_ROWS = 100_000  # Số row mỗi lần inplace_predict khi chấm batch
+
+    # Engine chấm điểm:
+    #   "xgb"    XGBoost; chưa train thì dùng model chung, chưa có thì RobustScorer của user
+    #            (chỉ sau RobustScorer.WARMUP_SAMPLES session - cold start)
+    #   "robust" chỉ RobustScorer (Mahalanobis trên thống kê riêng user)
+    #   "blend"  BLEND_WEIGHT * XGBoost + (1 - BLEND_WEIGHT) * robust
+    SCORING_ENGINE = "xgb"
+    BLEND_WEIGHT = 0.5
+
+    def __init__(self, model_path: Optional[str] = None):
+        self.model_path = model_path or self.MODEL_PATH
+        self.base_path = os.path.splitext(self.model_path)[0]
+        self.booster_path = None  # File booster mà metadata đang trỏ tới
+        self.meta_path = self.base_path + ".json"
+        self.history_path = self.base_path + "_history.npz"
+        self._xgb_model = None  # XGBClassifier - chỉ dựng khi train / predict_proba
+        self._booster = None
+        self._booster_file = None  # Booster trên disk chưa load (load lazy ở lần predict đầu)
+        self._booster_saved = False  # Booster hiện tại đã có trên disk chưa
+        self.compiled_path = None  # File CompiledModel mà metadata đang trỏ tới
+        self.xgb_params = {}  # Tham số XGBClassifier (để incremental dùng lại)
+        self.scaler = None  # {"mean": [...], "scale": [...]} của StandardScaler lúc train
         self.selected_features = None
-        self.history_df = None
-        self.new_data_buffer = []  # Buffer lưu data mới chưa retrain
+        # Feature selection (Lasso) cache cùng model, chỉ chạy lại khi drift monitor báo
+        self.drift_monitor = None
+        self.selected_at = None
+        self.retrains_since_selection = 0
+        self._history = None  # HistoryStore - load lazy khi cần retrain
+        self.new_data_buffer = []  # Buffer lưu data mới chưa retrain (list các row float)
+        self.feature_version = self.FEATURE_VERSION
+
+        # Fast path cho predict: (booster, vector float32 cấp phát sẵn, metric keys)
+        # gán nguyên tuple nên swap model từ worker thread là atomic
+        self._scorer = None
+        self._state_lock = threading.RLock()
+        self.fallback_model = None  # Model chung chấm điểm khi model này chưa train (ModelRegistry gán)
+        self.robust_scorer = None  # RobustScorer theo feature_columns - cập nhật mỗi session
+
+        # Trạng thái retrain nền
+        self._retrain_thread = None
+        self.retrain_status = "idle"
+        self.retrain_count = 0
+        self.last_retrain_seconds = None
+        self.last_retrain_at = None
+        self.last_retrain_error = None
+        self.last_retrain_mode = None
+        self.incremental_updates = 0  # Số lần incremental từ lần full retrain gần nhất
+
         self._safe_load_model()
+        if self.robust_scorer is None or self.robust_scorer.features != self.feature_columns:
+            self.robust_scorer = RobustScorer(self.feature_columns)
+
+    @property
+    def feature_columns(self):
+        """Danh sách feature theo schema version của model hiện tại"""
+        return self.FEATURE_SCHEMAS[self.feature_version]
+
+    @property
+    def needs_kinematic_features(self) -> bool:
+        """Schema >= 2 cần feature động học - tính cả model chung khi model này chưa train"""
+        if self.feature_version >= 2:
+            return True
+        fallback = self.fallback_model
+        return not self.is_trained() and fallback is not None and fallback.feature_version >= 2
+
+    def is_trained(self) -> bool:
+        """Có model (trong RAM hoặc trên disk chờ load) - không import xgboost"""
+        return self._booster is not None or self._booster_file is not None
+
+    @property
+    def booster(self):
+        """xgb.Booster - load từ file .ubj ở lần dùng đầu tiên"""
+        with self._state_lock:
+            if self._booster is None and self._booster_file is not None:
+                import xgboost as xgb
+                start = time.perf_counter()
+                self._booster = xgb.Booster(model_file=self._booster_file)
+                self._booster_file = None
+                print(f"✅ Booster loaded in {(time.perf_counter() - start) * 1000:.1f} ms")
+            return self._booster
+
+    @property
+    def xgb_model(self):
+        """XGBClassifier bọc booster hiện tại (dựng lazy - cần cho train incremental / predict_proba)"""
+        with self._state_lock:
+            if self._xgb_model is None and self.booster is not None:
+                import xgboost as xgb
+                xgb_model = xgb.XGBClassifier(**self.xgb_params)
+                xgb_model.load_model(bytearray(self._booster.save_raw("ubj")))
+                self._xgb_model = xgb_model
+            return self._xgb_model
+
+    @property
+    def history(self) -> HistoryStore:
+        """History train có giới hạn - đọc file npz ở lần dùng đầu tiên"""
+        with self._state_lock:
+            if self._history is None:
+                self._history = (HistoryStore.load(self.history_path, self.HISTORY_RESERVOIR_SIZE,
+                                                   self.HISTORY_RECENT_SIZE)
+                                 or self._new_history())
+            return self._history
+
+    @property
+    def history_df(self) -> Optional[pd.DataFrame]:
+        """History dạng DataFrame (reservoir + recent)"""
+        return self.history.to_frame()
+
+    def _new_history(self, df: Optional[pd.DataFrame] = None) -> HistoryStore:
+        store = HistoryStore(self.feature_columns, self.HISTORY_RESERVOIR_SIZE, self.HISTORY_RECENT_SIZE)
+        store.add(df)
+        return store
 
     # =========================
     # TRAINING & RETRAINING
@@ -51,13 +207,15 @@ class BehaviorModel:
         Thêm data mới vào buffer, tự động retrain khi đủ
         """
         try:
-            # Chuyển metrics thành DataFrame row
-            df_row = self._metrics_to_dataframe(metrics)
-            if df_row is None:
-                return False
-
-            # Thêm vào buffer
-            self.new_data_buffer.append(df_row)
+            # Thêm vào buffer dạng row thuần (theo thứ tự feature_columns)
+            with self._state_lock:
+                row = self._metrics_to_row(metrics)
+                self.new_data_buffer.append(row)
+                self.robust_scorer.update(row)
+                if self.drift_monitor is not None:
+                    self.drift_monitor.update(dict(zip(self.feature_columns, row)))
+                if len(self.new_data_buffer) > self.MAX_BUFFER_SAMPLES:
+                    del self.new_data_buffer[:len(self.new_data_buffer) - self.MAX_BUFFER_SAMPLES]
 
             print(f"📥 New data added to buffer ({len(self.new_data_buffer)}/{self.RETRAIN_THRESHOLD})")
 
@@ -73,51 +231,174 @@ class BehaviorModel:
 
     def _retrain_with_buffer(self) -> bool:
         """
-        Retrain model với data trong buffer
+        Retrain model với data trong buffer.
+        Mặc định chạy ở background thread trên snapshot - vòng tracking vẫn chấm điểm
+        bằng model cũ cho tới khi model mới được swap vào.
         """
         if not self.new_data_buffer:
             print("⚠️ No new data to retrain")
             return False
 
+        if self.is_retraining():
+            return True  # Đang retrain - buffer tiếp tục tích luỹ cho lần sau
+
+        # Snapshot: history copy ra bản riêng, buffer copy ra list mới
+        with self._state_lock:
+            buffer_snapshot = list(self.new_data_buffer)
+            history_snapshot = self.history.copy()
+
+        if not self.BACKGROUND_RETRAIN:
+            return self._retrain_job(buffer_snapshot, history_snapshot)
+
+        self._retrain_thread = threading.Thread(
+            target=self._retrain_job,
+            args=(buffer_snapshot, history_snapshot),
+            name="BehaviorModelRetrain",
+            daemon=True
+        )
+        self.retrain_status = "running"
+        self._retrain_thread.start()
+        print(f"🔄 Background retraining started with {len(buffer_snapshot)} new samples")
+        return True
+
+    def _retrain_job(self, buffer_snapshot: List[List[float]], history_snapshot: HistoryStore) -> bool:
+        """Train trên snapshot rồi swap model mới vào (chạy trong worker thread)"""
+        self.retrain_status = "running"
+        start = time.perf_counter()
+
         try:
-            print(f"\n🔄 RETRAINING with {len(self.new_data_buffer)} new samples...")
+            print(f"\n🔄 RETRAINING with {len(buffer_snapshot)} new samples...")
 
             # Chuyển buffer thành DataFrame
-            df_new = pd.DataFrame(self.new_data_buffer)
-
-            # Kiểm tra columns
-            missing_cols = set(self.ALL_FEATURES) - set(df_new.columns)
-            for col in missing_cols:
-                df_new[col] = 0
-
-            df_new = df_new[self.ALL_FEATURES]
+            df_new = pd.DataFrame(buffer_snapshot, columns=self.feature_columns)
 
             # Kết hợp với history data nếu có
-            if self.history_df is not None:
-                df_combined = pd.concat([self.history_df, df_new], ignore_index=True)
-                print(f"📊 Retraining: {len(self.history_df)} old + {len(df_new)} new = {len(df_combined)} total")
+            history_df = history_snapshot.to_frame()
+            if history_df is not None:
+                df_combined = pd.concat([history_df, df_new], ignore_index=True)
+                print(f"📊 Retraining: {len(history_df)} old + {len(df_new)} new = {len(df_combined)} total")
             else:
                 df_combined = df_new
                 print(f"📊 Training with {len(df_new)} new samples")
 
-            # Train model
-            success = self._train_internal(df_combined)
-
-            if success:
-                # Xóa buffer sau khi retrain thành công
-                self.new_data_buffer = []
+            # Train model: ưu tiên boosting tiếp từ booster hiện tại, full retrain khi cần
+            mode = self._choose_retrain_mode(df_new, history_df)
+            state = self._fit_incremental(df_new, history_df) if mode == "incremental" else None
+            if state is None:
+                state = self._fit(df_combined, self._cached_selection(df_new))
+
+            if state is not None:
+                # History giữ có giới hạn: chỉ thêm data mới vào bản snapshot
+                history_snapshot.add(self._prepare_dataframe(df_new))
+                state["history"] = history_snapshot
+
+                # Swap model + bỏ phần buffer đã train (giữ data mới đến trong lúc train)
+                self._apply_state(state, consumed=len(buffer_snapshot))
+                self._safe_save_model()
+                self.retrain_status = "succeeded"
                 print(f"✅ Model retrained successfully! Total samples: {len(df_combined)}")
                 return True
             else:
+                self.retrain_status = "failed"
                 print("❌ Retraining failed, keeping buffer")
                 return False
 
         except Exception as e:
+            self.retrain_status = "failed"
+            self.last_retrain_error = str(e)
             print(f"❌ Retraining error: {e}")
             import traceback
             traceback.print_exc()
             return False
 
+        finally:
+            self.last_retrain_seconds = time.perf_counter() - start
+            self.last_retrain_at = time.strftime("%Y-%m-%d %H:%M:%S")
+            self.retrain_count += 1
+
+    def _choose_retrain_mode(self, df_new: pd.DataFrame, history_snapshot: Optional[pd.DataFrame]) -> str:
+        """
+        incremental: boosting tiếp từ booster hiện tại
+        full: khi chưa có model, đổi schema / feature selection, quá số lần update, hoặc drift
+        (full vẫn dùng lại selected_features cũ trừ khi drift / đổi schema - xem _cached_selection)
+        """
+        if not self.INCREMENTAL_RETRAIN or not self.is_trained() or history_snapshot is None:
+            return "full"
+
+        if not self.selected_features or any(f not in df_new.columns for f in self.selected_features):
+            print("🔁 Feature schema changed -> full retrain")
+            return "full"
+
+        if self.incremental_updates >= self.MAX_INCREMENTAL_UPDATES:
+            print(f"🔁 {self.incremental_updates} incremental updates since last full retrain -> full retrain")
+            return "full"
+
+        if self._drift_detected():
+            info = self.drift_monitor.info(self.DRIFT_THRESHOLD)
+            print(f"🔁 Drift detected (PSI {info['psi_max']:.3f} on {info['psi_max_feature']}) "
+                  f"-> full retrain + feature re-selection")
+            return "full"
+
+        return "incremental"
+
+    def _drift_detected(self) -> bool:
+        with self._state_lock:
+            return self.drift_monitor is not None and self.drift_monitor.drifted(self.DRIFT_THRESHOLD)
+
+    def _cached_selection(self, df_new: pd.DataFrame) -> Optional[List[str]]:
+        """selected_features dùng lại được cho full retrain (None -> chạy lại Lasso).
+        Model cũ chưa có drift monitor chạy Lasso 1 lần để có reference."""
+        if not self.selected_features or any(f not in df_new.columns for f in self.selected_features):
+            return None
+        if self.drift_monitor is None or self._drift_detected():
+            return None
+        return list(self.selected_features)
+
+    def _fit_incremental(self, df_new: pd.DataFrame, history_snapshot: pd.DataFrame) -> Optional[Dict]:
+        """
+        Boosting tiếp INCREMENTAL_ROUNDS cây từ booster hiện tại (xgb_model= warm start)
+        trên data mới + REPLAY_SAMPLES row history. Giữ nguyên selected_features và scaler.
+        """
+        try:
+            import xgboost as xgb
+
+            df_new = self._prepare_dataframe(df_new)
+            if df_new is None or df_new.empty:
+                return None
+
+            replay = history_snapshot.sample(n=min(self.REPLAY_SAMPLES, len(history_snapshot)),
+                                             random_state=self.retrain_count)
+            print(f"⚡ Incremental update: {len(df_new)} new + {len(replay)} replay samples, "
+                  f"+{self.INCREMENTAL_ROUNDS} trees")
+
+            X_normal = pd.concat([df_new, replay], ignore_index=True)[self.feature_columns]
+            X_anomaly = self._generate_anomaly(X_normal)
+            X = pd.concat([X_normal, X_anomaly], ignore_index=True)[self.selected_features]
+            y = np.concatenate([np.zeros(len(X_normal)), np.ones(len(X_anomaly))])
+
+            xgb_model = xgb.XGBClassifier(**{**self.xgb_model.get_params(), "n_estimators": self.INCREMENTAL_ROUNDS})
+            xgb_model.fit(X, y, xgb_model=self.xgb_model.get_booster())
+
+            return {
+                "xgb_model": xgb_model,
+                "selected_features": self.selected_features,
+                "scaler": self.scaler,
+                "mode": "incremental",
+            }
+
+        except Exception as e:
+            print(f"⚠️ Incremental update failed, falling back to full retrain: {e}")
+            return None
+
+    def is_retraining(self) -> bool:
+        return self._retrain_thread is not None and self._retrain_thread.is_alive()
+
+    def wait_for_retrain(self, timeout: Optional[float] = None) -> bool:
+        """Chờ lần retrain đang chạy (nếu có) - dùng khi tắt process"""
+        if self.is_retraining():
+            self._retrain_thread.join(timeout)
+        return not self.is_retraining()
+
     def train(self, df_normal: pd.DataFrame) -> bool:
         """
         Train model từ đầu hoặc retrain
@@ -126,9 +407,30 @@ class BehaviorModel:
 
     def _train_internal(self, df: pd.DataFrame) -> bool:
         """
-        Internal training logic
+        Internal training logic (đồng bộ)
+        """
+        state = self._fit(df)
+        if state is None:
+            return False
+
+        state["history"] = self._new_history(self._prepare_dataframe(df))
+        with self._state_lock:
+            if self.robust_scorer.count == 0:  # User mới: thống kê robust lấy luôn từ data train
+                self.robust_scorer.update_many(state["history"].to_frame().values)
+        self._apply_state(state)
+        self._safe_save_model()
+        print("🎉 Model trained & saved successfully.")
+        return True
+
+    def _fit(self, df: pd.DataFrame, selected_features: Optional[List[str]] = None) -> Optional[Dict]:
+        """
+        Train Lasso + XGBoost và trả về state mới - KHÔNG sửa model hiện tại
+        (an toàn khi chạy ở background thread).
+        selected_features: feature đã chọn trước đó -> bỏ qua Lasso, chỉ train lại XGBoost
         """
         try:
+            import xgboost as xgb
+
             print(f"\n🧠 Training Behavior Model (Lasso + XGBoost)")
             print(f"📊 Data shape: {df.shape}")
 
@@ -137,12 +439,9 @@ class BehaviorModel:
             if df is None or len(df) < self.MIN_TRAIN_SAMPLES:
                 print(
                     f"⚠️ Not enough data to train. Need {self.MIN_TRAIN_SAMPLES}, got {len(df) if df is not None else 0}")
-                return False
+                return None
 
-            # Cập nhật history data
-            self.history_df = df.copy()
-
-            X_normal = df[self.ALL_FEATURES]
+            X_normal = df[self.feature_columns]
             y_normal = np.zeros(len(X_normal))
 
             # --- 2. SYNTHETIC ANOMALY (CONTROLLED) ---
@@ -152,27 +451,25 @@ class BehaviorModel:
             X = pd.concat([X_normal, X_anomaly], ignore_index=True)
             y = np.concatenate([y_normal, y_anomaly])
 
-            # --- 3. SCALING (FOR LASSO ONLY) ---
-            self.scaler = StandardScaler()
-            X_scaled = self.scaler.fit_transform(X)
-
-            # --- 4. LASSO FEATURE SELECTION ---
-            lasso = LassoCV(cv=5, random_state=42).fit(X_scaled, y)
-            selector = SelectFromModel(lasso, prefit=True)
-            mask = selector.get_support()
-
-            self.selected_features = list(np.array(self.ALL_FEATURES)[mask])
-
-            if not self.selected_features:
-                print("❌ Lasso selected no features.")
-                return False
-
-            print(f"✅ Selected features: {self.selected_features}")
+            if selected_features is None:
+                # --- 3-4. SCALING + LASSO FEATURE SELECTION (reference mới cho drift monitor) ---
+                selection = self._select_features(X, y)
+                if selection is None:
+                    return None
+                selected_features, scaler = selection
+                feature_selection = "lasso"
+                drift_monitor = DriftMonitor.from_frame(X_normal, self.feature_columns)
+                print(f"✅ Selected features: {selected_features}")
+            else:
+                scaler = self.scaler
+                feature_selection = "cached"
+                drift_monitor = None  # Giữ monitor hiện tại (reference = lúc chọn feature)
+                print(f"♻️ Reusing cached feature selection: {selected_features}")
 
             # --- 5. TRAIN XGBOOST (NO SCALING) ---
-            X_selected = X[self.selected_features]
+            X_selected = X[selected_features]
 
-            self.xgb_model = xgb.XGBClassifier(
+            xgb_model = xgb.XGBClassifier(
                 n_estimators=150,
                 max_depth=4,
                 learning_rate=0.08,
@@ -182,90 +479,112 @@ class BehaviorModel:
                 random_state=42
             )
 
-            self.xgb_model.fit(X_selected, y)
+            xgb_model.fit(X_selected, y)
 
             # Verify model after training
-            if self.xgb_model is None or not hasattr(self.xgb_model, 'predict_proba'):
+            if xgb_model is None or not hasattr(xgb_model, 'predict_proba'):
                 print("❌ Model training failed - invalid model created")
-                return False
-
-            self._safe_save_model()
-            print("🎉 Model trained & saved successfully.")
-            return True
+                return None
+
+            return {
+                "xgb_model": xgb_model,
+                "selected_features": selected_features,
+                "scaler": scaler,
+                "mode": "full",
+                "feature_selection": feature_selection,
+                "drift_monitor": drift_monitor,
+            }
 
         except Exception as e:
             print(f"❌ Training error: {e}")
             import traceback
             traceback.print_exc()
-            return False
+            return None
+
+    def _select_features(self, X: pd.DataFrame, y: np.ndarray):
+        """LassoCV trên data đã chuẩn hoá -> (selected_features, scaler dict) hoặc None"""
+        from sklearn.linear_model import LassoCV
+        from sklearn.preprocessing import StandardScaler
+        from sklearn.feature_selection import SelectFromModel
+
+        scaler = StandardScaler()
+        X_scaled = scaler.fit_transform(X)
+
+        lasso = LassoCV(cv=5, random_state=42).fit(X_scaled, y)
+        selector = SelectFromModel(lasso, prefit=True)
+        mask = selector.get_support()
+
+        selected_features = [str(f) for f in np.array(self.feature_columns)[mask]]
+        if not selected_features:
+            print("❌ Lasso selected no features.")
+            return None
+        return selected_features, {"mean": scaler.mean_.tolist(), "scale": scaler.scale_.tolist()}
+
+    def _apply_state(self, state: Dict, consumed: int = 0):
+        """Swap model mới vào (atomic với predict) và bỏ `consumed` row đầu của buffer"""
+        with self._state_lock:
+            self._xgb_model = state["xgb_model"]
+            self._booster = self._xgb_model.get_booster()
+            self._booster_file = None
+            self._booster_saved = False
+            self.xgb_params = self._json_params(self._xgb_model.get_params())
+            self.selected_features = [str(f) for f in state["selected_features"]]
+            self._history = state["history"]
+            self.scaler = state["scaler"]
+            self.last_retrain_mode = state.get("mode", "full")
+            self.incremental_updates = self.incremental_updates + 1 if self.last_retrain_mode == "incremental" else 0
+            if state.get("drift_monitor") is not None:
+                self.drift_monitor = state["drift_monitor"]
+            if state.get("feature_selection") == "lasso":
+                self.selected_at = time.strftime("%Y-%m-%d %H:%M:%S")
+                self.retrains_since_selection = 0
+            elif state.get("mode") is not None:
+                self.retrains_since_selection += 1
+            if consumed:
+                del self.new_data_buffer[:consumed]
+            self._prepare_fast_path()
 
     def _metrics_to_dataframe(self, metrics: Dict) -> Optional[pd.DataFrame]:
         """
         Chuyển metrics từ UI sang DataFrame row
         """
         try:
-            input_map = {
-                'Velocity': metrics.get('velocity_ui', 0),
-                'Acceleration': metrics.get('acceleration_ui', 0),
-                'XFlips': metrics.get('x_flips_ui', 0),
-                'YFlips': metrics.get('y_flips_ui', 0),
-                'TotalDistance': metrics.get('distance_ui', 0),
-                'MovementTimeSpan': metrics.get('movement_time_span_ui', 0),
-                'XVelocity': metrics.get('x_axis_velocity_ui', 0),
-                'YVelocity': metrics.get('y_axis_velocity_ui', 0),
-                'XAxisDistance': metrics.get('x_axis_distance_ui', 0),
-                'YAxisDistance': metrics.get('y_axis_distance_ui', 0)
-            }
-
-            return pd.DataFrame([input_map])
+            return pd.DataFrame([self._metrics_to_input_map(metrics)])
 
         except Exception as e:
             print(f"❌ Error converting metrics: {e}")
             return None
 
+    def _metrics_to_row(self, metrics: Dict) -> List[float]:
+        """Map metrics UI sang row float theo thứ tự feature_columns"""
+        return [float(metrics.get(self.METRIC_KEYS.get(col, col), 0)) for col in self.feature_columns]
+
+    def _metrics_to_input_map(self, metrics: Dict) -> Dict:
+        """Map metrics UI sang tên feature theo schema của model"""
+        return {
+            col: metrics.get(self.METRIC_KEYS.get(col, col), 0)
+            for col in self.feature_columns
+        }
+
     # =========================
     # PREDICTION
     # =========================
     def predict(self, metrics: Dict) -> float:
-        # Kiểm tra model có hợp lệ không
-        if (self.xgb_model is None or
-                not hasattr(self.xgb_model, 'predict_proba') or
-                self.selected_features is None or
-                len(self.selected_features) == 0):
-            print("⚠️ Model not ready, returning default score 0.0")
-            return 0.0
-
         try:
-            # Map từ metrics UI sang tên features
-            input_map = {
-                'Velocity': metrics.get('velocity_ui', 0),
-                'Acceleration': metrics.get('acceleration_ui', 0),
-                'XFlips': metrics.get('x_flips_ui', 0),
-                'YFlips': metrics.get('y_flips_ui', 0),
-                'TotalDistance': metrics.get('distance_ui', 0),
-                'MovementTimeSpan': metrics.get('movement_time_span_ui', 0),
-                'XVelocity': metrics.get('x_axis_velocity_ui', 0),
-                'YVelocity': metrics.get('y_axis_velocity_ui', 0),
-                'XAxisDistance': metrics.get('x_axis_distance_ui', 0),
-                'YAxisDistance': metrics.get('y_axis_distance_ui', 0)
-            }
+            prob = self.score(metrics)
 
-            df = pd.DataFrame([input_map])
+            # Chưa engine nào sẵn sàng (cold start): model chung chấm thay (robust của model chung nếu chưa train)
+            if prob is None and self.fallback_model is not None:
+                prob = self.fallback_model.score(metrics)
 
-            # Đảm bảo có đủ cột
-            missing_cols = set(self.selected_features) - set(df.columns)
-            if missing_cols:
-                print(f"[WARNING] Missing columns: {missing_cols}")
-                for col in missing_cols:
-                    df[col] = 0
+            if prob is None:
+                print("⚠️ Model not ready, returning default score 0.0")
+                prob = 0.0
 
-            df = df[self.selected_features]
-            prob = self.xgb_model.predict_proba(df)[0][1]
-
-            # TỰ ĐỘNG THÊM DATA VÀO BUFFER
+            # TỰ ĐỘNG THÊM DATA VÀO BUFFER (cả khi chưa có model - để model riêng học dần)
             self.add_new_data(metrics)
 
-            return float(prob)
+            return prob
 
         except Exception as e:
             print(f"⚠️ Prediction error: {e}")
@@ -273,11 +592,184 @@ class BehaviorModel:
             traceback.print_exc()
             return 0.0
 
+    def score(self, metrics: Dict) -> Optional[float]:
+        """Chấm điểm 1 session theo SCORING_ENGINE, không ghi buffer. None nếu chưa có engine nào sẵn sàng."""
+        engine = self.SCORING_ENGINE
+        xgb_score = self._score_xgb(metrics) if engine != "robust" else None
+        if engine == "xgb" and xgb_score is None:
+            return self._score_cold_start(metrics)
+        robust_score = self._score_robust(metrics) if engine != "xgb" else None
+        if engine == "robust" and robust_score is None:
+            xgb_score = self._score_xgb(metrics)
+        return self._combine(xgb_score, robust_score)
+
+    def _score_cold_start(self, metrics: Dict) -> Optional[float]:
+        """Engine xgb chưa có booster riêng: model chung đã train trước, robust của user chỉ khi qua warmup"""
+        fallback = self.fallback_model
+        if fallback is not None and fallback.is_trained():
+            prob = fallback.score(metrics)
+            if prob is not None:
+                return prob
+        return self._score_robust(metrics) if self._robust_warmed_up() else None
+
+    def _robust_warmed_up(self) -> bool:
+        """Robust chỉ được tự phát alert ở engine xgb sau WARMUP_SAMPLES (MIN_SAMPLES quá ít mẫu)"""
+        with self._state_lock:
+            return self.robust_scorer.count >= self.robust_scorer.WARMUP_SAMPLES
+
+    def _combine(self, xgb_score, robust_score):
+        """Blend khi có cả 2 điểm, còn lại dùng điểm có sẵn (float hoặc mảng)"""
+        if xgb_score is not None and robust_score is not None:
+            return self.BLEND_WEIGHT * xgb_score + (1 - self.BLEND_WEIGHT) * robust_score
+        return xgb_score if xgb_score is not None else robust_score
+
+    def _score_robust(self, metrics: Dict) -> Optional[float]:
+        with self._state_lock:
+            return self.robust_scorer.score(self._metrics_to_row(metrics))
+
+    def _score_xgb(self, metrics: Dict) -> Optional[float]:
+        # Kiểm tra model có hợp lệ không (lần đầu: load booster từ disk)
+        scorer = self._scorer or self._prepare_fast_path()
+        if scorer is None:
+            return None
+
+        # Ghi metrics vào vector cấp phát sẵn theo thứ tự selected_features
+        booster, row, row_keys = scorer
+        for i, key in enumerate(row_keys):
+            row[0, i] = metrics.get(key, 0)
+
+        return float(booster.inplace_predict(row)[0])
+
+    def score_batch(self, data, chunk_size: Optional[int] = None) -> Optional[np.ndarray]:
+        """
+        Chấm điểm nhiều session 1 lần theo SCORING_ENGINE, không ghi buffer / không retrain (dùng cho backfill).
+        data: DataFrame hoặc dict {tên feature: mảng} (thiếu cột = 0),
+              hoặc mảng 2D theo thứ tự selected_features (chỉ XGBoost).
+        Trả về mảng float32; None nếu chưa có model (và không có fallback).
+        """
+        engine = self.SCORING_ENGINE
+        xgb_scores = self._score_batch_xgb(data, chunk_size) if engine != "robust" else None
+        if engine == "xgb" and xgb_scores is None:
+            fallback = self.fallback_model
+            if fallback is not None and fallback.is_trained():
+                return fallback.score_batch(data, chunk_size)
+        robust_scores = (self._score_batch_robust(data)
+                         if engine != "xgb" or (xgb_scores is None and self._robust_warmed_up()) else None)
+        if engine == "robust" and robust_scores is None:
+            xgb_scores = self._score_batch_xgb(data, chunk_size)
+
+        scores = self._combine(xgb_scores, robust_scores)
+        if scores is None:
+            return self.fallback_model.score_batch(data, chunk_size) if self.fallback_model is not None else None
+        return np.asarray(scores, dtype=np.float32)
+
+    def _score_batch_robust(self, data) -> Optional[np.ndarray]:
+        columns = self.feature_columns
+        if isinstance(data, pd.DataFrame):
+            X = data.reindex(columns=columns).apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy(float)
+        elif isinstance(data, dict):
+            n_rows = len(next(iter(data.values()))) if data else 0
+            X = np.column_stack([np.asarray(data[c], dtype=float) if c in data else np.zeros(n_rows)
+                                 for c in columns]) if columns else np.zeros((n_rows, 0))
+        else:
+            return None  # Mảng 2D theo selected_features - không đủ cột cho robust
+        with self._state_lock:
+            return self.robust_scorer.score_many(X)
+
+    def _score_batch_xgb(self, data, chunk_size: Optional[int] = None) -> Optional[np.ndarray]:
+        scorer = self._scorer or self._prepare_fast_path()
+        if scorer is None:
+            return None
+
+        # Batch lớn: booster native (đa luồng) nhanh hơn evaluator NumPy
+        booster = self.booster or scorer[0]
+        features = self.selected_features
+        chunk_size = chunk_size or self.SCORE_CHUNK_ROWS
+
+        if isinstance(data, dict):
+            n_rows = len(next(iter(data.values()))) if data else 0
+        else:
+            n_rows = len(data)
+        scores = np.empty(n_rows, dtype=np.float32)
+
+        for start in range(0, n_rows, chunk_size):
+            end = min(start + chunk_size, n_rows)
+            if isinstance(data, pd.DataFrame):
+                X = (data.iloc[start:end].reindex(columns=features)
+                     .apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy(np.float32))
+            elif isinstance(data, dict):
+                X = np.column_stack([
+                    np.asarray(data[f][start:end], dtype=np.float32) if f in data
+                    else np.zeros(end - start, dtype=np.float32)
+                    for f in features
+                ])
+            else:
+                X = np.asarray(data[start:end], dtype=np.float32)
+            scores[start:end] = booster.inplace_predict(np.nan_to_num(X))
+
+        return scores
+
+    def _prepare_fast_path(self):
+        """
+        Chuẩn bị evaluator + vector input sau khi train, hoặc ở lần predict đầu sau load.
+        Booster đã có trong RAM (vừa train) thì dùng luôn; model load từ disk dùng bản biên dịch
+        nếu có (không import xgboost), không có mới load booster.
+        """
+        with self._state_lock:
+            booster = None
+            if self.selected_features:
+                if self._booster is None and self.compiled_path:
+                    booster = self._load_compiled()
+                booster = booster or self.booster
+            if booster is None:
+                self._scorer = None
+                return None
+
+            self._scorer = (
+                booster,
+                np.zeros((1, len(self.selected_features)), dtype=np.float32),
+                [self.METRIC_KEYS.get(col, col) for col in self.selected_features]
+            )
+            return self._scorer
+
+    def _load_compiled(self) -> Optional[CompiledModel]:
+        try:
+            start = time.perf_counter()
+            compiled = CompiledModel.load(self.compiled_path)
+            if compiled.num_feature != len(self.selected_features):
+                raise ValueError(f"{compiled.num_feature} features, expected {len(self.selected_features)}")
+            print(f"✅ Compiled model loaded in {(time.perf_counter() - start) * 1000:.1f} ms "
+                  f"({compiled.num_trees} trees)")
+            return compiled
+        except Exception as e:
+            print(f"⚠️ Failed to load compiled model {self.compiled_path}: {e}")
+            self.compiled_path = None
+            return None
+
+    @staticmethod
+    def _compile(booster) -> Optional[CompiledModel]:
+        try:
+            return compile_booster(booster)
+        except Exception as e:
+            print(f"⚠️ Cannot compile booster, scoring will use xgboost: {e}")
+            return None
+
+    def export_compiled(self, compiled: Optional[CompiledModel] = None) -> bool:
+        """Biên dịch booster hiện tại (hoặc ghi `compiled` có sẵn) và cập nhật metadata"""
+        if not self.is_trained():
+            print("⚠️ No trained model to compile")
+            return False
+        compiled = compiled or self._compile(self.booster)
+        if compiled is None:
+            return False
+        self._safe_save_model(compiled)
+        return True
+
     # =========================
     # INTERNAL HELPERS
     # =========================
     def _prepare_dataframe(self, df: pd.DataFrame):
-        cols = [c for c in self.ALL_FEATURES if c in df.columns]
+        cols = [c for c in self.feature_columns if c in df.columns]
         if len(cols) < 5:
             print(f"⚠️ Missing columns. Found: {cols}")
             return None
@@ -300,68 +792,213 @@ class BehaviorModel:
     # =========================
     # SAVE / LOAD
     # =========================
-    def _safe_save_model(self):
-        """Lưu model một cách an toàn"""
+    def _safe_save_model(self, compiled: Optional[CompiledModel] = None):
+        """
+        Lưu model: booster native .ubj + bản biên dịch .trees.npz (chỉ khi đổi) + metadata .json,
+        ghi file tạm rồi replace. `compiled`: bản biên dịch có sẵn của booster hiện tại.
+        """
         try:
-            temp_fd, temp_path = tempfile.mkstemp(
-                dir=os.path.dirname(self.MODEL_PATH) if os.path.dirname(self.MODEL_PATH) else '.')
-            os.close(temp_fd)
-
-            with open(temp_path, "wb") as f:
-                pickle.dump({
-                    "xgb_model": self.xgb_model,
+            # Snapshot dưới lock - vòng tracking có thể đang thêm vào buffer
+            with self._state_lock:
+                stamp = int(time.time() * 1000)
+                booster = self._booster if not self._booster_saved else None
+                old_booster_path = self.booster_path
+                booster_path = f"{self.base_path}.{stamp}.ubj" if booster is not None else old_booster_path
+                # Biên dịch khi booster đổi, hoặc model cũ chưa có bản biên dịch mà booster đang trong RAM
+                compile_source = (self._booster if booster is not None or compiled is not None
+                                  or self.compiled_path is None else None)
+                old_compiled_path = self.compiled_path
+                history = self._history
+                meta = {
+                    "format": self.ARTIFACT_FORMAT,
+                    "saved_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                    "booster_file": os.path.basename(booster_path) if booster_path and self.is_trained() else None,
+                    "compiled_file": None,
                     "selected_features": self.selected_features,
-                    "history_df": self.history_df,
                     "scaler": self.scaler,
-                    "new_data_buffer": self.new_data_buffer  # Lưu cả buffer
-                }, f, protocol=pickle.HIGHEST_PROTOCOL)
-
-            shutil.move(temp_path, self.MODEL_PATH)
-            print(f"✅ Model saved to {self.MODEL_PATH}")
+                    "xgb_params": self.xgb_params,
+                    "feature_version": self.feature_version,
+                    "incremental_updates": self.incremental_updates,
+                    "selected_at": self.selected_at,
+                    "retrains_since_selection": self.retrains_since_selection,
+                    "drift_monitor": self.drift_monitor.to_dict() if self.drift_monitor is not None else None,
+                    "robust_scorer": self.robust_scorer.to_dict() if self.robust_scorer is not None else None,
+                    "new_data_buffer": list(self.new_data_buffer)  # Lưu cả buffer
+                }
+
+            if compiled is None and compile_source is not None:
+                compiled = self._compile(compile_source)
+            if compiled is not None:
+                compiled_path = f"{self.base_path}.{stamp}.trees.npz"
+            else:
+                # Booster đổi mà biên dịch lỗi -> bỏ bản biên dịch cũ (không còn khớp)
+                compiled_path = old_compiled_path if booster is None and compile_source is None else None
+            if compiled_path and meta["booster_file"]:
+                meta["compiled_file"] = os.path.basename(compiled_path)
+
+            # Booster + bản biên dịch trước, metadata sau (metadata trỏ tới cả hai)
+            os.makedirs(os.path.dirname(self.meta_path) or '.', exist_ok=True)
+            if booster is not None:
+                self._atomic_write(booster_path, bytes(booster.save_raw("ubj")))
+            if compiled is not None:
+                compiled.save(compiled_path)
+            self._atomic_write(self.meta_path, json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+            print(f"✅ Model saved to {self.meta_path}")
+
+            if booster is not None:
+                with self._state_lock:
+                    self.booster_path = booster_path
+                    self._booster_saved = self._booster is booster
+                if old_booster_path and old_booster_path != booster_path and os.path.exists(old_booster_path):
+                    os.remove(old_booster_path)
+
+            if compiled_path != old_compiled_path:
+                with self._state_lock:
+                    self.compiled_path = compiled_path
+                if old_compiled_path and os.path.exists(old_compiled_path):
+                    os.remove(old_compiled_path)
+
+            if history is not None and history.dirty and history.save(self.history_path):
+                print(f"✅ History saved to {self.history_path} ({len(history)} samples)")
 
         except Exception as e:
             print(f"❌ Error saving model: {e}")
-            if 'temp_path' in locals() and os.path.exists(temp_path):
+
+    @staticmethod
+    def _atomic_write(path: str, data: bytes):
+        temp_fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.')
+        try:
+            with os.fdopen(temp_fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except Exception:
+            if os.path.exists(temp_path):
                 os.remove(temp_path)
+            raise
+
+    @staticmethod
+    def _json_params(params: Dict) -> Dict:
+        """Giữ tham số XGBClassifier ghi được ra JSON (bỏ None / NaN / object)"""
+        return {
+            k: v for k, v in params.items()
+            if isinstance(v, (bool, int, float, str)) and not (isinstance(v, float) and np.isnan(v))
+        }
 
     def _safe_load_model(self):
-        """Load model một cách an toàn"""
-        if not os.path.exists(self.MODEL_PATH):
-            print("ℹ️ No existing model found.")
+        """Load metadata JSON; booster để lazy tới lần predict đầu. File pickle cũ được chuyển đổi."""
+        if not os.path.exists(self.meta_path):
+            if self.model_path != self.meta_path and os.path.exists(self.model_path):
+                self._migrate_legacy_pickle()
+            else:
+                print("ℹ️ No existing model found.")
             return
 
         try:
-            file_size = os.path.getsize(self.MODEL_PATH)
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+
+            self.feature_version = meta.get("feature_version", 1)
+            if self.feature_version not in self.FEATURE_SCHEMAS:
+                print(f"⚠️ Unknown feature schema version {self.feature_version}, resetting...")
+                self._reset_model()
+                return
+
+            self.selected_features = meta.get("selected_features")
+            self.scaler = meta.get("scaler")
+            self.xgb_params = meta.get("xgb_params", {})
+            self.incremental_updates = meta.get("incremental_updates", 0)
+            self.robust_scorer = RobustScorer.from_dict(meta.get("robust_scorer"))
+            self.selected_at = meta.get("selected_at")
+            self.retrains_since_selection = meta.get("retrains_since_selection", 0)
+            self.drift_monitor = DriftMonitor.from_dict(meta.get("drift_monitor"))
+            if self.drift_monitor is not None and self.drift_monitor.features != self.feature_columns:
+                self.drift_monitor = None  # Monitor theo schema cũ - tạo lại ở lần train sau
+            self.new_data_buffer = [list(row) for row in meta.get("new_data_buffer", [])]
+
+            booster_file = meta.get("booster_file")
+            booster_path = os.path.join(os.path.dirname(self.meta_path), booster_file) if booster_file else None
+            compiled_file = meta.get("compiled_file")
+            compiled_path = os.path.join(os.path.dirname(self.meta_path), compiled_file) if compiled_file else None
+
+            # Kiểm tra model đã lưu có hợp lệ không
+            if booster_path and os.path.exists(booster_path) and self.selected_features:
+                self._booster_file = booster_path
+                self.booster_path = booster_path
+                self._booster_saved = True
+                self.compiled_path = compiled_path if compiled_path and os.path.exists(compiled_path) else None
+                print(f"✅ Model metadata loaded ({len(self.selected_features)} features)")
+                print(f"✅ Buffer samples: {len(self.new_data_buffer)}")
+            else:
+                print("⚠️ Model metadata has no usable booster, starting untrained")
+                buffer, robust_scorer = self.new_data_buffer, self.robust_scorer
+                self._reset_model()
+                self.new_data_buffer = buffer
+                self.robust_scorer = robust_scorer  # User cold start: thống kê robust vẫn dùng được
+
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"⚠️ Failed to load model due to corrupt metadata: {e}")
+            self._reset_model()
+        except Exception as e:
+            print(f"⚠️ Unexpected error loading model: {e}")
+            self._reset_model()
+
+    def _migrate_legacy_pickle(self):
+        """File cũ pickle cả object -> ghi lại theo format mới, giữ file cũ dạng .bak"""
+        try:
+            file_size = os.path.getsize(self.model_path)
             if file_size == 0:
                 print("⚠️ Model file is empty, removing...")
-                os.remove(self.MODEL_PATH)
+                os.remove(self.model_path)
                 return
 
-            with open(self.MODEL_PATH, "rb") as f:
+            with open(self.model_path, "rb") as f:
                 data = pickle.load(f)
 
-            self.xgb_model = data.get("xgb_model")
-            self.selected_features = data.get("selected_features")
-            self.history_df = data.get("history_df")
-            self.scaler = data.get("scaler", StandardScaler())
-            self.new_data_buffer = data.get("new_data_buffer", [])  # Load buffer
-
-            # Kiểm tra model đã load có hợp lệ không
-            if (self.xgb_model is not None and
-                    hasattr(self.xgb_model, 'predict_proba') and
-                    self.selected_features is not None and
-                    len(self.selected_features) > 0):
-                print(f"✅ Model loaded successfully ({len(self.selected_features)} features)")
-                print(f"✅ History samples: {len(self.history_df) if self.history_df is not None else 0}")
-                print(f"✅ Buffer samples: {len(self.new_data_buffer)}")
-            else:
+            feature_version = data.get("feature_version", 1)  # Model cũ chưa có version
+            xgb_model = data.get("xgb_model")
+            selected_features = data.get("selected_features")
+            if (feature_version not in self.FEATURE_SCHEMAS or
+                    xgb_model is None or not hasattr(xgb_model, 'get_booster') or not selected_features):
                 print("⚠️ Model file is invalid, resetting...")
                 self._reset_model()
-                os.remove(self.MODEL_PATH)
+                os.remove(self.model_path)
+                return
+
+            self.feature_version = feature_version
+            scaler = data.get("scaler")
+            self.scaler = ({"mean": scaler.mean_.tolist(), "scale": scaler.scale_.tolist()}
+                           if hasattr(scaler, "mean_") else None)
+            self._apply_state({
+                "xgb_model": xgb_model,
+                "selected_features": selected_features,
+                "scaler": self.scaler,
+                "history": self.history,
+                "mode": None,
+            })
+
+            # Load buffer - file cũ lưu mỗi phần tử là DataFrame 1 dòng
+            self.new_data_buffer = [
+                item.reindex(columns=self.feature_columns, fill_value=0).iloc[0].astype(float).tolist()
+                if isinstance(item, pd.DataFrame) else list(item)
+                for item in data.get("new_data_buffer", [])
+            ]
+            self.incremental_updates = data.get("incremental_updates", 0)
+
+            # history_df nằm trong pickle -> chuyển sang HistoryStore
+            legacy_history = data.get("history_df")
+            if legacy_history is not None:
+                self._history = self._new_history(legacy_history.reindex(columns=self.feature_columns, fill_value=0))
+                print(f"🔁 Migrating {len(legacy_history)} history rows out of model file "
+                      f"(kept {len(self._history)})")
+
+            self._safe_save_model()
+            shutil.move(self.model_path, self.model_path + ".bak")
+            print(f"🔁 Legacy model migrated ({len(self.selected_features)} features), "
+                  f"old file kept as {self.model_path}.bak")
 
         except (EOFError, pickle.UnpicklingError, KeyError, AttributeError) as e:
             print(f"⚠️ Failed to load model due to corrupt file: {e}")
-            os.remove(self.MODEL_PATH)
+            os.remove(self.model_path)
             self._reset_model()
         except Exception as e:
             print(f"⚠️ Unexpected error loading model: {e}")
@@ -369,22 +1006,60 @@ class BehaviorModel:
 
     def _reset_model(self):
         """Reset model về trạng thái mới"""
-        self.xgb_model = None
-        self.scaler = StandardScaler()
+        self._xgb_model = None
+        self._booster = None
+        self._booster_file = None
+        self._booster_saved = False
+        self.compiled_path = None
+        self.xgb_params = {}
+        self.scaler = None
         self.selected_features = None
-        self.history_df = None
+        self.drift_monitor = None
+        self.selected_at = None
+        self.retrains_since_selection = 0
         self.new_data_buffer = []
+        self.feature_version = self.FEATURE_VERSION
+        self.robust_scorer = RobustScorer(self.feature_columns)
+        self._history = self._new_history()
+        self.incremental_updates = 0
+        self._prepare_fast_path()
 
     # =========================
     # DEBUG & INFO
     # =========================
+    def feature_selection_info(self) -> Dict:
+        """Độ cũ của feature selection: thời điểm chọn, số lần retrain dùng lại, drift hiện tại"""
+        with self._state_lock:
+            info = {
+                "selected_at": self.selected_at,
+                "retrains_since_selection": self.retrains_since_selection,
+            }
+            if self.drift_monitor is not None:
+                info.update(self.drift_monitor.info(self.DRIFT_THRESHOLD))
+            return info
+
     def get_model_info(self) -> Dict:
         """Lấy thông tin model"""
         return {
-            'model_loaded': self.xgb_model is not None,
+            'model_loaded': self.is_trained(),
+            'using_fallback': not self.is_trained() and self.fallback_model is not None and self.fallback_model.is_trained(),
+            'scoring_engine': ("compiled" if isinstance(self._scorer[0], CompiledModel) else "xgboost")
+                              if self._scorer else None,
+            'anomaly_engine': self.SCORING_ENGINE,
+            'robust_scorer': self.robust_scorer.info() if self.robust_scorer is not None else None,
             'features_count': len(self.selected_features) if self.selected_features else 0,
-            'history_samples': len(self.history_df) if self.history_df is not None else 0,
+            'history_samples': len(self.history),
+            'history_seen': self.history.seen,
             'buffer_samples': len(self.new_data_buffer),
             'buffer_percentage': f"{len(self.new_data_buffer) * 100 / self.RETRAIN_THRESHOLD:.1f}%",
+            'feature_version': self.feature_version,
+            'retrain_status': self.retrain_status,
+            'retrain_count': self.retrain_count,
+            'last_retrain_mode': self.last_retrain_mode,
+            'incremental_updates': self.incremental_updates,
+            'feature_selection': self.feature_selection_info(),
+            'last_retrain_seconds': round(self.last_retrain_seconds, 3) if self.last_retrain_seconds is not None else None,
+            'last_retrain_at': self.last_retrain_at,
+            'last_retrain_error': self.last_retrain_error,
             'selected_features': self.selected_features
         }
\ No newline at end of file
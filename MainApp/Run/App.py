@@ -34,6 +34,8 @@ sys.path.insert(0, PROJECT_ROOT)
 sys.path.insert(0, os.path.join(PROJECT_ROOT, "Face"))
 sys.path.insert(0, os.path.join(PROJECT_ROOT, "MainApp"))
 
+from Storage import sheet_cache
+
 # Kiểm tra và tạo thư mục
 if not os.path.exists(SAVED_FILE_DIR):
     os.makedirs(SAVED_FILE_DIR, exist_ok=True)
@@ -79,7 +81,7 @@ def get_user_info_from_excel(user_id):
     try:
         excel_path = os.path.join(PROJECT_ROOT, "MG", "employee_ids.xlsx")
         if os.path.exists(excel_path):
-            df = pd.read_excel(excel_path)
+            df = sheet_cache.read_sheet(excel_path)
             # Chuẩn hóa tên cột
             df.columns = [str(col).strip().lower() for col in df.columns]
 
@@ -157,7 +159,7 @@ def get_user_info_from_password(password):
     try:
         excel_path = os.path.join(PROJECT_ROOT, "MG", "employee_ids.xlsx")
         if os.path.exists(excel_path):
-            df = pd.read_excel(excel_path)
+            df = sheet_cache.read_sheet(excel_path)
             # Chuẩn hóa tên cột
             df.columns = [str(col).strip().lower() for col in df.columns]
 
@@ -2,6 +2,7 @@ import sys
 import os
 import cv2
 import time
+import copy
 import multiprocessing
 from datetime import datetime, timedelta
 import traceback
@@ -225,7 +226,7 @@ class UiPathSAPLoginAutomation(QObject):
                 print(f"❌ Excel file not found: {excel_path}")
                 return self.get_default_credentials()
 
-            df = pd.read_excel(excel_path)
+            df = sheet_cache.read_sheet(excel_path)
             print(f"\n📊 Excel loaded: {len(df)} rows")
             print(f"Columns: {list(df.columns)}")
 
@@ -595,17 +596,17 @@ class UiPathSAPLoginAutomation(QObject):
 # =========================
 def mouse_process_entry(stop_event, pause_event, command_queue, alert_queue, delay_minutes, user_name, global_logger):
     """Hàm chạy trong process riêng - Dùng global logger"""
+    started_at = time.perf_counter()  # Đo thời gian từ lúc process bắt đầu tới lúc listener chạy
     try:
         from Mouse.Main_mouse import MouseAnalysisSystem
         print(f"🖱️ Mouse tracking started for user: {user_name}")
 
         if delay_minutes > 0:
-            for _ in range(delay_minutes * 60):
-                if stop_event.is_set():
-                    return
-                time.sleep(1)
+            if stop_event.wait(delay_minutes * 60):
+                return
+            started_at = time.perf_counter()  # Không tính thời gian delay
 
-        system = MouseAnalysisSystem(global_logger)
+        system = MouseAnalysisSystem(global_logger, started_at=started_at)
         system.run_continuous_analysis(
             stop_event,
             pause_event,
@@ -703,23 +704,40 @@ from MainApp.UI.UI_HOME import Ui_MainWindow as Ui_HomeWindow
 # Import systems
 from Face.main_face import FaceSingleCheck
 from Workspace.SafeWorkingBrowser import ProfessionalWorkBrowser
+from Mouse.Module.session_control import ControlEvent
 
 from Chatbot.data_processor import  DataProcessor
+from Storage.event_journal import EventJournal
+from Storage.background_writer import BackgroundWriter
+from Storage.log_channel import LogChannel
+from Storage import work_log_schema
+from Storage import sheet_cache
 
 # ============================================
 # GLOBAL EXCEL LOGGER - TẤT CẢ MODULE DÙNG CHUNG
 # ============================================
+FLUSH_TIMEOUT_SECONDS = 30
+# Process chuột khi dừng: UI thread chỉ chờ ngắn, còn lại MouseStopWorker chờ nó flush log qua kênh
+# (FLUSH_TIMEOUT_SECONDS) + chờ model loader (30s) + chờ retrain (30s)
+MOUSE_JOIN_UI_SECONDS = 3
+MOUSE_STOP_TIMEOUT_SECONDS = FLUSH_TIMEOUT_SECONDS + 60
+
+
 class GlobalExcelLogger:
     """Logger toàn cục cho tất cả module - CHỈ LƯU GIAN LẬN"""
 
+    # Cột + row dùng chung với replay harness (Storage/work_log_schema.py)
+    FRAUD_COLUMNS = work_log_schema.FRAUD_COLUMNS
+    MOUSE_COLUMNS = work_log_schema.MOUSE_COLUMNS
+
     def __init__(self, user_name):
         self.user_name = user_name
         self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
         self.PATHS = setup_user_directories(user_name)
 
-        # Initialize the lists that were missing
-        self.fraud_events = []  # Initialize fraud events list
-        self.mouse_details = []  # Initialize mouse details list
+        # Event đã nằm trong journal/writer, chỉ giữ bộ đếm cho summary (list cũ không bao giờ được xoá)
+        self.fraud_count = 0
+        self.mouse_count = 0
 
         # Đường dẫn file SAP data
         self.sap_data_dir = self.PATHS['monthly']
@@ -731,6 +749,12 @@ class GlobalExcelLogger:
             f"work_logs_{user_name}_{current_date}.xlsx"
         )
 
+        # Event ghi append vào journal, xlsx chỉ dựng lại khi compact (kết thúc phiên / khi cần đọc)
+        self.journal = EventJournal(self.excel_path, columns=work_log_schema.SHEET_COLUMNS)
+        # Mọi I/O (append journal, compact xlsx) chạy trên thread writer riêng - caller không bị chặn
+        self.writer = BackgroundWriter(self.journal, name=f"log-writer-{user_name}")
+        self.child_process = False
+
         print(f"🌐 Global logger initialized for: {user_name}")
         print(f"📊 SAP data directory: {self.sap_data_dir}")
         print(f"📄 Excel file path: {self.excel_path}")
@@ -828,43 +852,22 @@ class GlobalExcelLogger:
 
     def log_alert(self, module, event_type, details="", severity="INFO", is_fraud=False):
         """Ghi log cảnh báo - CHỈ LƯU NẾU LÀ GIAN LẬN (is_fraud=True)"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        event_entry = {
-            "Timestamp": timestamp,
-            "Event_Type": event_type,
-            "Details": details,
-            "User": self.user_name,
-            "Session_ID": self.session_id,
-            "Severity": severity,
-            "IsFraud": 1 if is_fraud else 0,
-            "Date": datetime.now().strftime("%Y-%m-%d"),
-            "Time": datetime.now().strftime("%H:%M:%S"),
-            "Module": module
-        }
-
         if is_fraud:
-            self.fraud_events.append(event_entry)
+            event_entry = work_log_schema.build_entry(self.user_name, self.session_id, module, event_type,
+                                                      details, severity, is_fraud)
+            self.fraud_count += 1
+            self._journal_append(work_log_schema.FRAUD_SHEET, event_entry)
             print(f"🚨 [FRAUD] [{module}] {event_type} - {details}")
         else:
             print(f"ℹ️  [{module}] {event_type} - {details}")
 
     def log_mouse_details(self, event_type, details="", severity="INFO", is_fraud=False, **mouse_data):
         """Ghi chi tiết chuột vào sheet riêng"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        mouse_entry = {
-            "Timestamp": timestamp,
-            "Event_Type": event_type,
-            "Details": details,
-            "User": self.user_name,
-            "Session_ID": self.session_id,
-            "Severity": severity,
-            "IsFraud": 1 if is_fraud else 0,
-            "Date": datetime.now().strftime("%Y-%m-%d"),
-            "Time": datetime.now().strftime("%H:%M:%S"),
-            "Module": "Mouse"
-        }
+        mouse_entry = work_log_schema.build_entry(self.user_name, self.session_id, "Mouse", event_type,
+                                                  details, severity, is_fraud)
         mouse_entry.update(mouse_data)
-        self.mouse_details.append(mouse_entry)  # Fixed: append mouse_entry, not mouse_data
+        self.mouse_count += 1
+        self._journal_append(work_log_schema.MOUSE_SHEET, mouse_entry)
 
         if is_fraud:
             self.log_alert("Mouse", event_type, details, severity, is_fraud)
@@ -883,57 +886,66 @@ class GlobalExcelLogger:
         else:
             print(f"ℹ️  [Browser] {event_type} - {details}")
 
-    def save_to_excel(self):
-        """Lưu vào file Excel với 2 sheet"""
+    def _journal_append(self, sheet, entry):
         try:
-            # Ensure lists exist
-            if not hasattr(self, 'fraud_events'):
-                self.fraud_events = []
-            if not hasattr(self, 'mouse_details'):
-                self.mouse_details = []
-
-            df_fraud = pd.DataFrame(self.fraud_events) if self.fraud_events else pd.DataFrame(columns=[
-                "Timestamp", "Event_Type", "Details", "User", "Session_ID",
-                "Severity", "IsFraud", "Date", "Time", "Module"
-            ])
-
-            df_mouse = pd.DataFrame(self.mouse_details) if self.mouse_details else pd.DataFrame(columns=[
-                "Timestamp", "Event_Type", "Details", "User", "Session_ID",
-                "Severity", "IsFraud", "Date", "Time", "Module",
-                "TotalEvents", "TotalMoves", "TotalDistance", "XAxisDistance",
-                "YAxisDistance", "XFlips", "YFlips", "MovementTimeSpan",
-                "Velocity", "Acceleration", "XVelocity", "YVelocity",
-                "XAcceleration", "YAcceleration", "DurationSeconds", "AnomalyScore"
-            ])
+            self.writer.submit(sheet, entry)
+        except Exception as e:
+            print(f"❌ Error queueing event for journal: {e}")
 
-            if os.path.exists(self.excel_path):
-                try:
-                    old_fraud = pd.read_excel(self.excel_path, sheet_name='Fraud_Events')
-                    old_mouse = pd.read_excel(self.excel_path, sheet_name='Mouse_Details')
-                    df_fraud = pd.concat([old_fraud, df_fraud], ignore_index=True)
-                    df_mouse = pd.concat([old_mouse, df_mouse], ignore_index=True)
-                    df_fraud = df_fraud.drop_duplicates(subset=['Timestamp', 'Event_Type', 'Session_ID'])
-                    df_mouse = df_mouse.drop_duplicates(subset=['Timestamp', 'Event_Type', 'Session_ID'])
-                except Exception as e:
-                    print(f"⚠️ Error reading existing file: {e}")
-
-            with pd.ExcelWriter(self.excel_path, engine='openpyxl') as writer:
-                df_fraud.to_excel(writer, sheet_name='Fraud_Events', index=False)
-                df_mouse.to_excel(writer, sheet_name='Mouse_Details', index=False)
-
-            print(f"💾 Global log saved: {self.excel_path}")
+    def save_to_excel(self, compact=False, timeout=None):
+        """
+        Event đã được đưa cho writer nền ngay lúc log (không chặn caller).
+        compact=True: yêu cầu dựng lại file Excel trên thread writer (nhiều yêu cầu gộp thành 1 lần).
+        timeout: chờ tối đa bao nhiêu giây cho xlsx mới - chỉ dùng khi cần đọc ngay (chatbot) hoặc tắt app.
+        """
+        if not compact:
             return True
+        try:
+            if self.child_process:
+                # Process chuột: chỉ đẩy hết event về process chính, process chính compact khi process con dừng
+                return True if timeout is None else self.writer.flush(timeout)
+
+            if timeout is None:
+                self.writer.request_compact()
+                print(f"💾 Global log compaction queued: {self.excel_path}")
+                return True
+
+            if self.writer.flush(timeout, compact=True):
+                print(f"💾 Global log saved: {self.excel_path} "
+                      f"({self.journal.last_compact_rows} new events)")
+                return True
+            print(f"⚠️ Global log not saved within {timeout}s "
+                  f"(queue depth {self.writer.queue_depth()}), writer continues in background")
+            return False
         except Exception as e:
             print(f"❌ Error saving global log: {e}")
             traceback.print_exc()
             return False
 
+    def for_child_process(self, channel):
+        """Bản logger cho process chuột: không đụng journal/xlsx, gửi event qua kênh về process chính"""
+        child = copy.copy(self)
+        child.fraud_count = 0
+        child.mouse_count = 0
+        child.writer = channel.child_writer(name=f"log-channel-{self.user_name}")
+        child.child_process = True
+        return child
+
+    def flush(self, timeout=FLUSH_TIMEOUT_SECONDS):
+        """Ghi hết event đang chờ + compact xlsx rồi dừng writer (tắt app)"""
+        ok = self.writer.close(timeout, compact=True)
+        stats = self.writer.stats()
+        print(f"💾 Log writer flushed: ok={ok}, written={stats['written']}, "
+              f"compactions={stats['compactions']}/{stats['compact_requests']} requests, "
+              f"max flush {stats['max_flush_ms']} ms")
+        return ok
+
     def save_final_data(self):
         """Lưu dữ liệu cuối cùng - BÂY GIỜ CÓ THÊM SAP"""
         print(f"\n💾 SAVING FINAL DATA (WITH SAP COLLECTION)")
 
-        # 1. Lưu log data vào Excel
-        log_success = self.save_to_excel()
+        # 1. Lưu log data vào Excel (compact journal, chờ writer ghi xong)
+        log_success = self.save_to_excel(compact=True, timeout=FLUSH_TIMEOUT_SECONDS)
 
         # 2. Thu thập dữ liệu SAP (chạy sau để không ảnh hưởng đến log data)
         sap_success = self.collect_sap_data_at_session_end()
@@ -955,9 +967,11 @@ class GlobalExcelLogger:
         return {
             "user": self.user_name,
             "session_id": self.session_id,
-            "total_alerts": len(self.fraud_events),
-            "mouse_entries": len(self.mouse_details),
-            "excel_file": os.path.basename(self.excel_path)
+            "total_alerts": self.fraud_count,
+            "mouse_entries": self.mouse_count,
+            "excel_file": os.path.basename(self.excel_path),
+            "journal": self.journal.info(),
+            "writer": self.writer.stats()
         }
 
     def open_log_file(self):
@@ -974,6 +988,45 @@ class GlobalExcelLogger:
             return False
 
 
+def _close_log_channel(channel, terminated=False):
+    """Dừng kênh log của process chuột (sau khi process đã dừng)"""
+    if channel is None:
+        return
+    try:
+        if not channel.close(timeout=5):
+            print("⚠️ Log channel still draining, continuing in background")
+        print(f"📨 Mouse log channel: {channel.stats()}")
+        if terminated:
+            print(f"⚠️ Mouse process was terminated: {channel.lost_rows()} log events dropped")
+    except Exception as e:
+        print(f"⚠️ Could not close log channel: {e}")
+
+
+class MouseStopWorker(QThread):
+    """Chờ process chuột tự flush log + lưu model ngoài UI thread, chỉ terminate khi process bị treo"""
+    stopped = pyqtSignal(bool)  # True nếu phải terminate
+
+    def __init__(self, process, channel, timeout=MOUSE_STOP_TIMEOUT_SECONDS):
+        super().__init__()
+        self.process = process
+        self.channel = channel
+        self.timeout = timeout
+
+    def run(self):
+        terminated = False
+        self.process.join(timeout=self.timeout)
+        if self.process.is_alive():
+            print(f"⚠️ Mouse process did not stop within {self.timeout}s, terminating")
+            terminated = True
+            try:
+                self.process.terminate()
+                self.process.join(timeout=1)
+            except:
+                pass
+        _close_log_channel(self.channel, terminated)
+        self.stopped.emit(terminated)
+
+
 # ============================================
 class FaceCheckWorker(QThread):
     finished = pyqtSignal(dict)
@@ -1162,7 +1215,7 @@ class EnhancedSafeBrowser(ProfessionalWorkBrowser):
         try:
             excel_path = os.path.join(PROJECT_ROOT, "MG", "employee_ids.xlsx")
             if os.path.exists(excel_path):
-                df = pd.read_excel(excel_path)
+                df = sheet_cache.read_sheet(excel_path)
                 # Chuẩn hóa tên cột
                 df.columns = [str(col).strip().lower() for col in df.columns]
 
@@ -1963,6 +2016,8 @@ class HomeWindow(QMainWindow):
 
         # Biến hệ thống
         self.mouse_process = None
+        self.log_channel = None
+        self.mouse_stop_workers = []  # MouseStopWorker còn chờ process chuột của session trước
         self.stop_event = None
         self.pause_event = None
         self.command_queue = None
@@ -2017,7 +2072,7 @@ class HomeWindow(QMainWindow):
         try:
             excel_path = os.path.join(PROJECT_ROOT, "MG", "employee_ids.xlsx")
             if os.path.exists(excel_path):
-                df = pd.read_excel(excel_path)
+                df = sheet_cache.read_sheet(excel_path)
                 # Chuẩn hóa tên cột
                 df.columns = [str(col).strip().lower() for col in df.columns]
 
@@ -2159,8 +2214,9 @@ class HomeWindow(QMainWindow):
         # Đảm bảo lưu dữ liệu trước
         if hasattr(self, 'global_logger'):
             try:
-                self.global_logger.save_to_excel()
-                print("💾 Work log saved successfully")
+                # Chatbot đọc xlsx ngay sau đó nên chờ writer compact xong (có giới hạn)
+                if self.global_logger.save_to_excel(compact=True, timeout=10):
+                    print("💾 Work log saved successfully")
             except Exception as e:
                 print(f"⚠️ Could not save work log: {e}")
 
@@ -2418,12 +2474,14 @@ class HomeWindow(QMainWindow):
                 is_fraud=False
             )
 
-            # Tạo các event cho mouse tracking
-            self.stop_event = multiprocessing.Event()
-            self.pause_event = multiprocessing.Event()
+            # Tạo các event cho mouse tracking (set/clear đánh thức process chuột ngay)
+            self.stop_event, self.pause_event = ControlEvent.create_pair()
             self.command_queue = multiprocessing.Queue()
             self.alert_queue = multiprocessing.Queue()
 
+            # Kênh log: process chuột gửi event theo batch, process chính là writer duy nhất
+            self.log_channel = LogChannel(self.global_logger.writer).start()
+
             # Khởi chạy mouse process
             self.mouse_process = multiprocessing.Process(
                 target=mouse_process_entry,
@@ -2434,7 +2492,7 @@ class HomeWindow(QMainWindow):
                     self.alert_queue,
                     0,
                     self.user_name,
-                    self.global_logger
+                    self.global_logger.for_child_process(self.log_channel)
                 ),
                 daemon=True
             )
@@ -2536,19 +2594,9 @@ class HomeWindow(QMainWindow):
             is_fraud=False
         )
 
-        # 3. Dừng mouse process (giữ nguyên code cũ của bạn)
-        if self.stop_event:
-            self.stop_event.set()
-        if self.mouse_process:
-            self.mouse_process.join(timeout=3)
-            if self.mouse_process.is_alive():
-                try:
-                    self.mouse_process.terminate()
-                except:
-                    pass
-
-        # 4. Lưu log data Excel (giữ nguyên)
-        self.global_logger.save_to_excel()
+        # 3. Dừng mouse process (chờ nó tự flush log + lưu model, không chặn UI)
+        # 4. Nhận nốt event process chuột đã gửi rồi mới lưu log data Excel (compact journal)
+        self._stop_mouse_process(on_stopped=lambda: self.global_logger.save_to_excel(compact=True))
 
         # 5. CHẠY SAP DATA COLLECTION
         print("🤖 Starting SAP GUI automation...")
@@ -2612,6 +2660,33 @@ class HomeWindow(QMainWindow):
         self.showNormal()
         self.activateWindow()
 
+    def _stop_mouse_process(self, on_stopped=None):
+        """
+        Báo process chuột dừng, chờ ngắn trên UI thread như trước.
+        Process còn đang flush thì MouseStopWorker chờ tiếp (và terminate nếu treo), xong mới gọi on_stopped.
+        """
+        if self.stop_event:
+            self.stop_event.set()
+        process, channel = self.mouse_process, self.log_channel
+        self.log_channel = None
+        if process:
+            process.join(timeout=MOUSE_JOIN_UI_SECONDS)
+        if not process or not process.is_alive():
+            _close_log_channel(channel)
+            if on_stopped:
+                on_stopped()
+            return
+
+        print("⏳ Mouse process still flushing, waiting in background...")
+        worker = MouseStopWorker(process, channel)
+
+        if on_stopped:
+            worker.stopped.connect(lambda terminated: on_stopped())
+        # Giữ tham chiếu tới khi thread kết thúc hẳn (QThread bị huỷ khi còn chạy sẽ crash)
+        worker.finished.connect(lambda: self.mouse_stop_workers.remove(worker))
+        self.mouse_stop_workers.append(worker)
+        worker.start()
+
     def reset_ui_immediately(self):
         """Reset UI ngay lập tức"""
         self.is_working = False
@@ -2683,12 +2758,22 @@ class HomeWindow(QMainWindow):
                 pass
 
         # Đảm bảo mouse process được dọn dẹp
-        if self.mouse_process and self.mouse_process.is_alive():
+        self._stop_mouse_process()
+        self.mouse_process = None
+        if self.mouse_stop_workers:
+            # Process chuột còn đang flush: ẩn cửa sổ, đóng lại khi MouseStopWorker xong (không treo UI)
+            print("⏳ Waiting for mouse process to finish before closing...")
+            self.hide()
+            self.mouse_stop_workers[-1].finished.connect(self.close)
+            event.ignore()
+            return
+
+        # Ghi nốt event đang chờ trong writer nền trước khi thoát
+        if hasattr(self, 'global_logger'):
             try:
-                self.mouse_process.terminate()
-                self.mouse_process.join(timeout=1)
-            except:
-                pass
+                self.global_logger.flush()
+            except Exception as e:
+                print(f"⚠️ Could not flush work log: {e}")
 
         event.accept()
         print("✅ HomeWindow closed cleanly")
@@ -30,6 +30,7 @@ from PyQt6.QtGui import *
 # Import các UI
 from MainApp.UI.UI_MG_EMPLIST import Ui_MainWindow as Ui_EmployeeList
 from MainApp.UI.UI_MG_HOME import Ui_MainWindow as Ui_Home
+from Storage import sheet_cache
 
 try:
     from MG.data_processor import DataProcessor
@@ -180,7 +181,7 @@ class MainController:
             excel_path = os.path.join(root_path, "employee_ids.xlsx")
 
             if os.path.exists(excel_path):
-                df = pd.read_excel(excel_path)
+                df = sheet_cache.read_sheet(excel_path)
 
                 # Chuẩn hóa tên cột
                 df.columns = [str(col).strip().lower() for col in df.columns]
@@ -511,7 +512,7 @@ class EmployeeListWindow(QMainWindow):
                 sap_p = os.path.join(path, "sap_data.xlsx")
                 if os.path.exists(sap_p):
                     try:
-                        df = pd.read_excel(sap_p, sheet_name="Orders")
+                        df = sheet_cache.read_sheet(sap_p, sheet_name="Orders")
                         if not df.empty:
                             total_orders += len(df)
                             if 'Revenue' in df.columns:
@@ -523,7 +524,7 @@ class EmployeeListWindow(QMainWindow):
                 wl_p = os.path.join(path, f"work_logs_{emp_id}_{folder_name}.xlsx")
                 if os.path.exists(wl_p):
                     try:
-                        df_wl = pd.read_excel(wl_p, sheet_name="Fraud_Events")
+                        df_wl = sheet_cache.read_sheet(wl_p, sheet_name="Fraud_Events")
                         if not df_wl.empty:
                             if 'IsFraud' in df_wl.columns:
                                 total_fraud += len(df_wl[df_wl['IsFraud'] == 1])
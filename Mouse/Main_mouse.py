@@ -1,6 +1,8 @@
 import time
 import signal
 import sys
+import uuid
+import threading
 import pandas as pd
 from datetime import datetime
 import os
@@ -8,7 +10,9 @@ import os
 from Mouse.Module.real_time_tracker import RealTimeTracker
 from Mouse.Module.real_time_processor import RealTimeProcessor
 from Mouse.Module.Process_Excel import MouseExcelHandler
-from ML_models.xgboost_anomaly import BehaviorModel
+from Mouse.Module.trajectory_store import TrajectoryStore
+from Mouse.Module.session_control import SessionControl
+from ML_models.model_registry import ModelRegistry
 from Mouse.Models.MouseResult import MouseResult
 
 
@@ -16,13 +20,20 @@ class MouseAnalysisSystem:
     SESSION_DURATION = 60
     ANOMALY_THRESHOLD = 0.75
 
-    def __init__(self, global_logger=None):  # THÊM THAM SỐ global_logger
+    def __init__(self, global_logger=None, started_at=None):  # THÊM THAM SỐ global_logger
+        self.started_at = started_at or time.perf_counter()  # Mốc đo startup (perf_counter lúc process bắt đầu)
         self.tracker = RealTimeTracker()
         self.processor = RealTimeProcessor()
         self.user_name = None
         self.global_logger = global_logger  # LƯU global_logger
         self.excel_handler = None
-        self.ai_model = BehaviorModel()
+        self.trajectory_store = None
+        self.model_registry = ModelRegistry()
+        # Model load ở thread nền, chồng lên cửa sổ thu thập đầu tiên (xem _start_model_loader)
+        self.ai_model = None
+        self._model_ready = threading.Event()
+        self._model_thread = None
+        self.startup_timings = {}
 
         self.all_results = []
         self.fraud_sessions = []
@@ -37,26 +48,76 @@ class MouseAnalysisSystem:
         self.user_name = user_name
         # TRUYỀN global_logger vào MouseExcelHandler
         self.excel_handler = MouseExcelHandler(user_name, self.global_logger)
+        self.trajectory_store = TrajectoryStore(user_name)
         print(f"🖱️ Mouse system setup for user: {user_name}")
 
-        # Khởi tạo model với user_name
-        self._init_model()
+        # Khởi tạo model với user_name (nền - không chặn listener)
+        self._start_model_loader()
+
+    # =========================
+    # MODEL LOADING (NỀN)
+    # =========================
+    def _start_model_loader(self):
+        """Load model ở thread nền, cửa sổ 60s đầu tiên vẫn thu thập bình thường"""
+        self._model_ready.clear()
+        self._model_thread = threading.Thread(target=self._load_model, name="mouse-model-loader", daemon=True)
+        self._model_thread.start()
+
+    def _load_model(self):
+        start = time.perf_counter()
+        try:
+            if self.user_name:
+                self.ai_model = self.model_registry.get(self.user_name)
+            else:
+                self.ai_model = self.model_registry.get_global()
+            self._init_model()
+
+            # Warm-up: load bản biên dịch / booster ngay, lần chấm điểm đầu không phải đọc disk
+            self.ai_model._prepare_fast_path()
+            if not self.ai_model.is_trained() and self.ai_model.fallback_model is not None:
+                self.ai_model.fallback_model._prepare_fast_path()
+        except Exception as e:
+            print(f"❌ Error loading model: {e}")
+            import traceback
+            traceback.print_exc()
+        finally:
+            done = time.perf_counter()
+            self.startup_timings['model_load_s'] = round(done - start, 3)
+            self.startup_timings['model_ready_s'] = round(done - self.started_at, 3)
+            self._model_ready.set()
+            print(f"⏱️ Model ready after {self.startup_timings['model_ready_s']:.2f}s "
+                  f"(load {self.startup_timings['model_load_s']:.2f}s)")
+
+    def is_model_ready(self) -> bool:
+        return self._model_ready.is_set()
+
+    def wait_for_model(self, timeout=None):
+        """Chờ thread load model (chỉ chặn nếu chưa xong), trả về model hoặc None"""
+        if self._model_thread is None:
+            self._start_model_loader()
+        if not self._model_ready.is_set():
+            print("⏳ Waiting for model to finish loading...")
+            start = time.perf_counter()
+            self._model_ready.wait(timeout)
+            waited = time.perf_counter() - start
+            self.startup_timings['model_wait_s'] = round(self.startup_timings.get('model_wait_s', 0) + waited, 3)
+        return self.ai_model
 
     def _init_model(self):
-        """Chỉ load model từ .pkl, KHÔNG train lại nếu đã có model"""
+        """Chỉ load model đã lưu, KHÔNG train lại nếu đã có model"""
         print(f"\n🔍 Initializing AI Model for user: {self.user_name}")
 
-        # Kiểm tra xem model đã được load từ .pkl chưa
-        if self.ai_model.xgb_model is not None:
-            print(f"✅ Model loaded from .pkl with {len(self.ai_model.selected_features)} features")
+        # Kiểm tra xem model đã được load chưa (booster load lazy ở lần predict đầu)
+        if self.ai_model.is_trained():
+            print(f"✅ Model loaded with {len(self.ai_model.selected_features)} features")
             print(f"✅ Features: {self.ai_model.selected_features}")
             return  # ĐÃ CÓ MODEL, KHÔNG CẦN TRAIN LẠI
 
-        # Nếu không có model (file .pkl không tồn tại hoặc hỏng)
-        print("⚠️ No model found in .pkl, loading training data...")
+        # Nếu không có model (file model không tồn tại hoặc hỏng)
+        print("⚠️ No saved model found, loading training data...")
 
-        # Chỉ load Excel để train khi KHÔNG có .pkl
-        df_history = self.excel_handler.load_training_data(self.user_name)
+        # Chỉ load Excel để train khi KHÔNG có model (model chung / chưa setup_user thì không có handler)
+        df_history = self.excel_handler.load_training_data(self.user_name) if self.excel_handler else None
 
         if df_history is not None and len(df_history) >= self.ai_model.MIN_TRAIN_SAMPLES:
             print(f"📊 Training with {len(df_history)} samples from Excel...")
@@ -77,20 +138,33 @@ class MouseAnalysisSystem:
         # Thiết lập user nếu chưa được thiết lập
         if user_name and not self.user_name:
             self.setup_user(user_name)
+        if self._model_thread is None:
+            self._start_model_loader()  # Không có user: model chung
+
+        if self.is_model_ready() and self.ai_model is not None:
+            model_status = 'TRAINED' if self.ai_model.is_trained() else 'NOT TRAINED'
+        else:
+            model_status = 'LOADING (background)'
 
         print("=" * 60)
         print(f"🛡️ MOUSE ANALYSIS SYSTEM STARTED for user: {self.user_name}")
-        print(f"✅ Model status: {'TRAINED' if self.ai_model.xgb_model else 'NOT TRAINED'}")
+        print(f"✅ Model status: {model_status}")
         print(f"✅ Global logger: {'ACTIVE' if self.global_logger else 'INACTIVE'}")
         print("=" * 60)
 
+        # Listener chạy ngay, model load song song với cửa sổ đầu tiên
+        self.tracker.start()
+        self.startup_timings['listening_s'] = round(time.perf_counter() - self.started_at, 3)
+        print(f"⏱️ Listening after {self.startup_timings['listening_s'] * 1000:.0f} ms")
+
+        control = SessionControl(stop_event, pause_event)
+
         try:
             while not stop_event.is_set():
                 # Kiểm tra pause
                 if pause_event.is_set():
                     print("⏸️ Mouse tracking PAUSED (by timer)...")
-                    while pause_event.is_set() and not stop_event.is_set():
-                        time.sleep(0.5)
+                    self._wait_while_paused(control)
                     if stop_event.is_set():
                         break
                     print("▶️ Mouse tracking RESUMED (timer resumed)...")
@@ -134,8 +208,7 @@ class MouseAnalysisSystem:
 
                             # Đợi lệnh từ browser
                             print("⏳ Waiting for user confirmation...")
-                            while pause_event.is_set() and not stop_event.is_set():
-                                time.sleep(0.5)
+                            self._wait_while_paused(control)
 
                         except Exception as e:
                             print(f"⚠️ Error sending alert: {e}")
@@ -150,7 +223,16 @@ class MouseAnalysisSystem:
                         self.fraud_sessions = []
 
         finally:
+            self.tracker.stop()
             self._stop_and_save()
+
+    def _wait_while_paused(self, control):
+        """Tạm ngừng ghi event cho tới khi resume, rồi bắt đầu cửa sổ mới"""
+        self.tracker.set_paused(True)
+        control.wait_while_paused()
+        self.tracker.set_paused(False)
+        self.tracker.restart_window()
+
     # =========================
     # SINGLE SESSION (GIỮ NGUYÊN)
     # =========================
@@ -165,17 +247,36 @@ class MouseAnalysisSystem:
             print(f"⚠️ Not enough mouse events ({len(events)}), skipping session.")
             return None
 
-        metrics = self.processor.calculate_all_metrics(events)
+        session_id = self._new_session_id()
+
+        # Lưu quỹ đạo thô (writer thread riêng, không chặn tracking)
+        if self.trajectory_store:
+            self.trajectory_store.save_async(session_id, events)
+
+        # Cửa sổ đầu tiên: chỉ chờ nếu model vẫn đang load
+        model = self.wait_for_model()
+
+        # Feature động học chỉ tính khi schema của model (hoặc model chung chấm thay) cần tới
+        kinematic = model is not None and model.needs_kinematic_features
+        metrics = self.processor.calculate_all_metrics(events, kinematic=kinematic)
         metrics['raw_count'] = len(events)
 
-        score = self.ai_model.predict(metrics)
+        if model is None:
+            print("⚠️ Model not available, returning default score 0.0")
+            score = 0.0
+        else:
+            score = model.predict(metrics)
 
-        return self._create_result(metrics, score)
+        return self._create_result(metrics, score, session_id)
 
     # =========================
     # RESULT BUILD (GIỮ NGUYÊN)
     # =========================
-    def _create_result(self, metrics, score):
+    def _new_session_id(self):
+        """Id duy nhất giữa các ngày / lần chạy lại process (khoá của TrajectoryStore.load)"""
+        return f"S_{datetime.now().strftime('%H%M%S')}_{self.session_count}_{uuid.uuid4().hex[:8]}"
+
+    def _create_result(self, metrics, score, session_id=None):
         alerts = []
 
         # CHỈ THÊM ALERT KHI CÓ ANOMALY
@@ -187,7 +288,7 @@ class MouseAnalysisSystem:
             })
 
         return MouseResult(
-            session_id=f"S_{datetime.now().strftime('%H%M%S')}_{self.session_count}",
+            session_id=session_id or self._new_session_id(),
             start_time=datetime.now(),
             end_time=datetime.now(),
             total_events=metrics.get('raw_count', 0),
@@ -246,6 +347,17 @@ class MouseAnalysisSystem:
             if self.excel_handler:
                 self.excel_handler.save_final_data()
 
+            # CHỜ LẦN RETRAIN NỀN (NẾU CÓ) ĐỂ MODEL MỚI KỊP LƯU
+            if self._model_thread is not None:
+                self._model_ready.wait(timeout=30)
+            if self.ai_model is not None and not self.ai_model.wait_for_retrain(timeout=30):
+                print("⚠️ Background retraining still running, model will not be saved")
+            self.model_registry.save_all()  # Lưu data mới chưa đủ để retrain
+
+            # GHI NỐT QUỸ ĐẠO THÔ CÒN TRONG HÀNG ĐỢI
+            if self.trajectory_store:
+                self.trajectory_store.close()
+
             print(f"✅ All mouse data saved successfully for user: {self.user_name}")
 
         except Exception as e:
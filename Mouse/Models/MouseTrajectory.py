@@ -0,0 +1,52 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List
+
+import numpy as np
+
+from Mouse.Models.MouseEvents import MouseEvent, EventType
+
+
+@dataclass
+class MouseTrajectory:
+    """Quỹ đạo chuột thô của 1 session dưới dạng mảng cột (timestamp µs, x, y)"""
+    session_id: str
+    t_us: np.ndarray  # int64 - epoch microseconds
+    x: np.ndarray  # int32
+    y: np.ndarray  # int32
+
+    def __len__(self) -> int:
+        return len(self.t_us)
+
+    @property
+    def start_time(self) -> datetime:
+        return datetime.fromtimestamp(self.t_us[0] / 1e6)
+
+    @property
+    def end_time(self) -> datetime:
+        return datetime.fromtimestamp(self.t_us[-1] / 1e6)
+
+    @property
+    def t_seconds(self) -> np.ndarray:
+        """Thời gian tương đối (giây) tính từ event đầu tiên"""
+        return (self.t_us - self.t_us[0]) / 1e6
+
+    @classmethod
+    def from_events(cls, session_id: str, events: List[MouseEvent]) -> "MouseTrajectory":
+        """Chuyển list MouseEvent của tracker sang mảng cột"""
+        n = len(events)
+        t_us = np.empty(n, dtype=np.int64)
+        x = np.empty(n, dtype=np.int32)
+        y = np.empty(n, dtype=np.int32)
+        for i, e in enumerate(events):
+            t_us[i] = round(e.timestamp.timestamp() * 1e6)
+            x[i] = e.x
+            y[i] = e.y
+        return cls(session_id=session_id, t_us=t_us, x=x, y=y)
+
+    def to_events(self) -> List[MouseEvent]:
+        """Chuyển ngược lại thành list MouseEvent (định dạng của RealTimeTracker)"""
+        return [
+            MouseEvent(timestamp=datetime.fromtimestamp(t / 1e6), event_type=EventType.MOVE, x=int(x), y=int(y))
+            for t, x, y in zip(self.t_us.tolist(), self.x.tolist(), self.y.tolist())
+        ]
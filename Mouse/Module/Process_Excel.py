@@ -4,6 +4,7 @@ import glob
 from datetime import datetime
 from typing import Optional, List
 from Mouse.Models.MouseResult import MouseResult
+from Storage import sheet_cache
 
 
 class MouseExcelHandler:
@@ -171,7 +172,7 @@ class MouseExcelHandler:
             for file in excel_files:
                 try:
                     # Đọc sheet Mouse_Details
-                    df = pd.read_excel(file, sheet_name='Mouse_Details')
+                    df = sheet_cache.read_sheet(file, sheet_name='Mouse_Details')
 
                     # Chỉ lấy các cột cần thiết
                     mouse_features = [
@@ -0,0 +1,138 @@
+"""
+Kinematic Feature Extractor
+Tính bộ feature động học mở rộng từ mảng (t, x, y) trong 1 lần vectorized
+
+- Phân phối speed / acceleration / jerk theo từng segment (mean, std, percentiles)
+- Curvature, histogram góc đổi hướng
+- Số lần dừng (pause), độ thẳng (straightness) của từng nét di chuyển
+
+Schema có version: khi thêm/đổi feature thì tăng SCHEMA_VERSION và giữ nguyên
+danh sách cũ trong FEATURE_SCHEMAS để model cũ vẫn dùng được.
+"""
+
+from typing import Dict, List
+
+import numpy as np
+
+PAUSE_THRESHOLD = 0.3  # giây - khoảng trống giữa 2 event coi là dừng
+MIN_DT = 1e-3  # chặn dưới dt để tránh chia 0 khi timestamp trùng
+PERCENTILES = (25, 50, 75, 95)
+ANGLE_BINS = 8  # histogram |Δθ| trên [0, π]
+
+
+def _dist_names(prefix: str) -> List[str]:
+    return [f"{prefix}Mean", f"{prefix}Std"] + [f"{prefix}P{p}" for p in PERCENTILES]
+
+
+KINEMATIC_FEATURES_V1 = (
+    _dist_names("Speed")
+    + _dist_names("Accel")
+    + _dist_names("Jerk")
+    + ["CurvatureMean", "CurvatureStd", "CurvatureP50"]
+    + [f"AngleHist{i}" for i in range(ANGLE_BINS)]
+    + ["PauseCount", "PauseRatio", "StrokeCount", "StraightnessMean", "Straightness"]
+)
+
+FEATURE_SCHEMAS = {
+    1: KINEMATIC_FEATURES_V1,
+}
+SCHEMA_VERSION = 1
+
+
+def _distribution(values: np.ndarray) -> List[float]:
+    """mean, std, percentiles - trả 0 khi không có dữ liệu"""
+    if values.size == 0:
+        return [0.0] * (2 + len(PERCENTILES))
+    return [float(values.mean()), float(values.std())] + np.percentile(values, PERCENTILES).tolist()
+
+
+class KinematicFeatureExtractor:
+    """Trích xuất feature động học từ quỹ đạo chuột"""
+
+    def __init__(self, schema_version: int = SCHEMA_VERSION):
+        if schema_version not in FEATURE_SCHEMAS:
+            raise ValueError(f"Unknown kinematic feature schema: {schema_version}")
+        self.schema_version = schema_version
+        self.feature_names = list(FEATURE_SCHEMAS[schema_version])
+
+    def extract_from_events(self, events) -> Dict[str, float]:
+        """Nhận list MouseEvent từ RealTimeTracker"""
+        n = len(events)
+        t = np.fromiter((e.timestamp.timestamp() for e in events), dtype=np.float64, count=n)
+        x = np.fromiter((e.x for e in events), dtype=np.float64, count=n)
+        y = np.fromiter((e.y for e in events), dtype=np.float64, count=n)
+        return self.extract(t, x, y)
+
+    def extract_from_trajectory(self, traj) -> Dict[str, float]:
+        """Nhận MouseTrajectory từ TrajectoryStore"""
+        return self.extract(traj.t_seconds, traj.x.astype(np.float64), traj.y.astype(np.float64))
+
+    def extract(self, t: np.ndarray, x: np.ndarray, y: np.ndarray) -> Dict[str, float]:
+        """t tính bằng giây, x/y tính bằng pixel"""
+        return dict(zip(self.feature_names, self.extract_vector(t, x, y).tolist()))
+
+    def extract_vector(self, t: np.ndarray, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Trả về vector float64 theo thứ tự feature_names"""
+        if len(t) < 3:
+            return np.zeros(len(self.feature_names), dtype=np.float64)
+
+        # --- 1. SEGMENTS ---
+        dt_raw = np.diff(t)
+        dx = np.diff(x)
+        dy = np.diff(y)
+        ds = np.hypot(dx, dy)
+
+        pauses = dt_raw > PAUSE_THRESHOLD
+        dt = np.maximum(dt_raw, MIN_DT)
+
+        # Chỉ tính động học trên segment không phải pause
+        active = ~pauses
+        speed = ds / dt
+
+        # --- 2. ACCELERATION / JERK (giữa 2 segment liên tiếp cùng active) ---
+        pair = active[1:] & active[:-1]
+        dt_mid = 0.5 * (dt[1:] + dt[:-1])
+        accel = np.diff(speed) / dt_mid
+        jerk = np.diff(accel) / dt_mid[1:]
+        jerk_ok = pair[1:] & pair[:-1]
+
+        # --- 3. CURVATURE & ANGLE CHANGE (chỉ trên segment có di chuyển) ---
+        moving = ds > 0
+        theta = np.arctan2(dy[moving], dx[moving])
+        dtheta = np.abs((np.diff(theta) + np.pi) % (2 * np.pi) - np.pi)
+        ds_moving = ds[moving]
+        curvature = dtheta / np.maximum(ds_moving[1:], 1.0)
+        if dtheta.size:
+            hist = np.histogram(dtheta, bins=ANGLE_BINS, range=(0.0, np.pi))[0] / dtheta.size
+        else:
+            hist = np.zeros(ANGLE_BINS)
+
+        # --- 4. STROKES & STRAIGHTNESS (tách nét tại các pause) ---
+        stroke_id = np.concatenate([[0], np.cumsum(pauses)])
+        n_strokes = int(stroke_id[-1]) + 1
+        starts = np.flatnonzero(np.concatenate([[True], pauses]))
+        ends = np.concatenate([starts[1:] - 1, [len(t) - 1]])
+        chord = np.hypot(x[ends] - x[starts], y[ends] - y[starts])
+        path = np.bincount(stroke_id[1:][active], weights=ds[active], minlength=n_strokes)
+        valid = path > 0
+        straightness_mean = float((chord[valid] / path[valid]).mean()) if valid.any() else 0.0
+        total_path = float(ds.sum())
+        straightness = float(np.hypot(x[-1] - x[0], y[-1] - y[0]) / total_path) if total_path > 0 else 0.0
+
+        # --- 5. ASSEMBLE ---
+        span = t[-1] - t[0]
+        values = (
+            _distribution(speed[active])
+            + _distribution(np.abs(accel[pair]))
+            + _distribution(np.abs(jerk[jerk_ok]))
+            + [float(curvature.mean()) if curvature.size else 0.0,
+               float(curvature.std()) if curvature.size else 0.0,
+               float(np.median(curvature)) if curvature.size else 0.0]
+            + hist.tolist()
+            + [float(pauses.sum()),
+               float(dt_raw[pauses].sum() / span) if span > 0 else 0.0,
+               float(n_strokes),
+               straightness_mean,
+               straightness]
+        )
+        return np.asarray(values, dtype=np.float64)
@@ -2,12 +2,17 @@ import math
 import numpy as np
 from typing import List, Tuple
 from Mouse.Models.MouseEvents import MouseEvent
+from Mouse.Module.kinematic_features import KinematicFeatureExtractor
 
 
 class RealTimeProcessor:
     """Xử lý và tính toán metrics real-time THEO RESEARCH PAPER"""
 
-    def calculate_all_metrics(self, events: List[MouseEvent]) -> dict:
+    def __init__(self):
+        self.kinematic = KinematicFeatureExtractor()
+
+    def calculate_all_metrics(self, events: List[MouseEvent], kinematic: bool = True) -> dict:
+        """kinematic=False: bỏ qua feature động học (model schema 1 không dùng tới)"""
         if len(events) < 2:
             return {}
 
@@ -29,6 +34,9 @@ class RealTimeProcessor:
         # 5. Acceleration (SỬA theo paper)
         acceleration_metrics = self._calculate_acceleration_paper(events)  # Công thức (21)-(23)
 
+        # 6. Feature động học mở rộng (speed/accel/jerk distributions, curvature, pauses...)
+        kinematic_metrics = self.kinematic.extract_from_events(events) if kinematic else {}
+
         return {
             'total_events': len(events),
             'total_moves': len(events),
@@ -40,7 +48,8 @@ class RealTimeProcessor:
             'x_flips_ui': x_flips,
             'y_flips_ui': y_flips,
             **velocity_metrics,
-            **acceleration_metrics
+            **acceleration_metrics,
+            **kinematic_metrics
         }
 
     def _calculate_distance(self, events: List[MouseEvent]) -> float:
@@ -1,60 +1,126 @@
-from datetime import datetime, timedelta
-from pynput.mouse import Listener
+from datetime import datetime
 import threading
 import time
-from typing import List
+from typing import List, Optional
 from Mouse.Models.MouseEvents import MouseEvent, EventType
+from Mouse.Module.session_control import SessionControl
 
 
 class RealTimeTracker:
-    """EM004 thập sự kiện chuột real-time với hỗ trợ pause"""
+    """
+    EM004 thập sự kiện chuột real-time với hỗ trợ pause
+
+    Dùng 1 pynput Listener duy nhất cho cả process: listener ghi liên tục vào buffer
+    của cửa sổ hiện tại, hết cửa sổ thì đổi buffer (swap dưới lock) nên không mất
+    event ở khoảng giữa 2 session. Pause chỉ là 1 cờ bool kiểm tra trong callback.
+    """
 
     def __init__(self):
         self.events: List[MouseEvent] = []
         self.listener = None
         self.is_tracking = False
+        self.is_paused = False
+        self._lock = threading.Lock()
+        self._window_start = None
 
-    def collect_events(self, duration_seconds: int, stop_event=None, pause_event=None) -> List[MouseEvent]:
-        self.events = []
-        self.is_tracking = True
+    # =========================
+    # BUFFER
+    # =========================
+    def record_move(self, x: int, y: int, timestamp: Optional[datetime] = None):
+        """Ghi 1 event di chuyển vào buffer (listener hoặc replay harness gọi)"""
+        event = MouseEvent(timestamp=timestamp or datetime.now(), event_type=EventType.MOVE, x=x, y=y)
+        with self._lock:
+            self.events.append(event)
 
-        print(f"🔍 Tracking mouse movement for {duration_seconds}s...")
+    def take_events(self) -> List[MouseEvent]:
+        """Lấy toàn bộ event trong buffer và bắt đầu buffer mới"""
+        with self._lock:
+            events, self.events = self.events, []
+        return events
+
+    def set_paused(self, paused: bool):
+        """Bật/tắt ghi event - listener vẫn chạy, event lúc pause bị bỏ qua"""
+        self.is_paused = paused
+
+    def restart_window(self):
+        """
+        Bắt đầu cửa sổ mới từ bây giờ (sau khi resume), bỏ event ghi trước pause -
+        gộp vào cửa sổ sau resume thì time span kéo dài cả đoạn pause, velocity / acceleration lệch
+        """
+        with self._lock:
+            self.events = []
+            self._window_start = time.monotonic()
+
+    # =========================
+    # LISTENER
+    # =========================
+    def start(self):
+        """Khởi động listener (1 lần cho cả process)"""
+        if self.listener is not None and self.listener.is_alive():
+            return
+
+        from pynput.mouse import Listener  # import lazy - replay/benchmark không cần X server
 
         def on_move(x, y):
-            if self.is_tracking and (pause_event is None or not pause_event.is_set()):
-                self.events.append(MouseEvent.create_move_event(x, y))
+            if not self.is_paused:
+                self.record_move(x, y)
             return self.is_tracking
 
+        self.is_tracking = True
+        self.take_events()
+        self._window_start = time.monotonic()
         self.listener = Listener(on_move=on_move)
-        listener_thread = threading.Thread(target=self.listener.start)
-        listener_thread.daemon = True
-        listener_thread.start()
+        self.listener.daemon = True
+        self.listener.start()
+        print("🖱️ Mouse listener started")
 
-        start_time = datetime.now()
-        end_time = start_time + timedelta(seconds=duration_seconds)
+    def stop(self):
+        """Dừng listener khi kết thúc process"""
+        self.is_tracking = False
+        if self.listener:
+            self.listener.stop()
+            self.listener = None
+            print("🛑 Mouse listener stopped")
+
+    def collect_events(self, duration_seconds: int, stop_event=None, pause_event=None) -> List[MouseEvent]:
+        """Chờ hết cửa sổ duration_seconds rồi trả về event của cửa sổ đó"""
+        self.start()
+
+        print(f"🔍 Tracking mouse movement for {duration_seconds}s...")
+
+        control = SessionControl(stop_event, pause_event)
+        # Cửa sổ nối tiếp nhau: tính từ lần swap buffer trước, không tính từ lúc gọi
+        deadline = self._window_start + duration_seconds
 
         try:
-            while datetime.now() < end_time and self.is_tracking:
-                time.sleep(0.5)
+            while self.is_tracking:
+                # Ngủ tới deadline, thức dậy ngay khi stop / pause
+                if control.wait_until(deadline):
+                    break
 
                 # Kiểm tra stop event
-                if stop_event and stop_event.is_set():
-                    self.is_tracking = False
+                if control.is_stopped():
                     break
 
-                # Kiểm tra pause event - nếu đang pause thì đợi
-                while pause_event and pause_event.is_set() and self.is_tracking:
-                    if stop_event and stop_event.is_set():
-                        self.is_tracking = False
-                        break
-                    time.sleep(0.5)
+                # Đang pause thì chờ resume (hoặc stop / hết giờ)
+                self.set_paused(True)
+                resumed = control.wait_while_paused(deadline)
+                self.set_paused(control.is_paused())
+                if control.is_stopped():
+                    break
+                if resumed:
+                    # Resume giữa cửa sổ: cửa sổ mới chỉ gồm event sau resume
+                    self.restart_window()
+                    deadline = self._window_start + duration_seconds
+                    continue
+                if time.monotonic() >= deadline:
+                    break
 
         except KeyboardInterrupt:
             pass
-        finally:
-            self.is_tracking = False
-            if self.listener:
-                self.listener.stop()
 
-        print(f"✅ Completed: {len(self.events)} moves")
-        return self.events
\ No newline at end of file
+        events = self.take_events()
+        self._window_start = time.monotonic()
+
+        print(f"✅ Completed: {len(events)} moves")
+        return events
@@ -0,0 +1,354 @@
+"""
+Mouse Replay Harness
+Benchmark throughput của toàn bộ pipeline chuột mà không cần người di chuột 60s
+
+Trace (ghi sẵn từ TrajectoryStore hoặc sinh bởi SyntheticTraceGenerator) được đẩy qua:
+    tracker buffer -> RealTimeProcessor -> BehaviorModel.predict
+    -> MouseExcelHandler.log_session_data -> EventJournal + BackgroundWriter (thư mục tạm)
+nhanh nhất có thể (không listener, không sleep).
+
+Báo cáo: sessions/s, latency từng stage (mean/p50/p95/max), allocation (tracemalloc),
+I/O của writer nền (batch, latency ghi journal, compact cuối). --no-io: log vào list trong RAM.
+
+Chạy:
+    python -m Mouse.Module.replay_harness --sessions 300
+    python -m Mouse.Module.replay_harness --source store --user EM001 --alloc --json report.json
+    python -m Mouse.Module.replay_harness --sessions 300 --no-io
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from Mouse.Main_mouse import MouseAnalysisSystem
+from Mouse.Module.real_time_tracker import RealTimeTracker
+from Mouse.Module.trajectory_store import TrajectoryStore, SAVED_FILE_DIR
+from Mouse.Module.synthetic_traces import SyntheticTraceGenerator
+from Storage.event_journal import EventJournal
+from Storage.background_writer import BackgroundWriter
+from Storage import work_log_schema
+from ML_models.xgboost_anomaly import BehaviorModel
+from ML_models.model_registry import ModelRegistry
+
+STAGES = ["tracker", "processor", "predict", "log"]
+
+
+# =========================
+# TRACE SOURCES
+# =========================
+def synthetic_traces(n_sessions: int, duration: float = 60.0, rate_hz: float = 125.0,
+                     bot_fraction: float = 0.0, seed: int = 42) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Trace người / bot từ SyntheticTraceGenerator: (t giây, x, y)"""
+    generator = SyntheticTraceGenerator(rate_hz=rate_hz, duration=duration, seed=seed)
+    for batch in generator.stream(n_sessions, batch_size=100, bot_fraction=bot_fraction):
+        yield from batch.iter_sessions()
+
+
+def store_traces(user_name: str, base_dir: str, n_sessions: int) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Trace đã ghi bởi TrajectoryStore (lặp lại nếu không đủ số session)"""
+    store = TrajectoryStore(user_name, base_dir=base_dir)
+    trajectories = list(store.iter_sessions())
+    if not trajectories:
+        raise SystemExit(f"❌ No recorded trajectories for {user_name} in {base_dir}")
+    for i in range(n_sessions):
+        traj = trajectories[i % len(trajectories)]
+        yield traj.t_seconds, traj.x, traj.y
+
+
+# =========================
+# PIPELINE PIECES
+# =========================
+class ReplayTracker(RealTimeTracker):
+    """Tracker không listener: collect_events đổ trace kế tiếp vào buffer"""
+
+    def __init__(self, traces, stats):
+        super().__init__()
+        self.traces = iter(traces)
+        self.stats = stats
+
+    def feed(self, t, x, y):
+        """Đẩy 1 trace qua buffer giống listener rồi lấy ra"""
+        base = datetime.now()
+        for ti, xi, yi in zip(t.tolist(), x.tolist(), y.tolist()):
+            self.record_move(xi, yi, base + timedelta(seconds=ti))
+        return self.take_events()
+
+    def collect_events(self, duration_seconds: int, stop_event=None, pause_event=None):
+        t, x, y = next(self.traces)
+        with self.stats.measure("tracker"):
+            return self.feed(t, x, y)
+
+
+class JournalLogger:
+    """Thay GlobalExcelLogger (main_emp cần PyQt6): cùng work_log_schema, cùng đường ghi EventJournal + BackgroundWriter"""
+
+    def __init__(self, user_name, work_dir):
+        self.user_name = user_name
+        self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.excel_path = os.path.join(work_dir, f"work_logs_{user_name}_{datetime.now():%Y_%m}.xlsx")
+        self.journal = EventJournal(self.excel_path, columns=work_log_schema.SHEET_COLUMNS)
+        self.writer = BackgroundWriter(self.journal, name=f"replay-writer-{user_name}")
+
+    def log_alert(self, module, event_type, details="", severity="INFO", is_fraud=False):
+        if is_fraud:
+            entry = work_log_schema.build_entry(self.user_name, self.session_id, module, event_type,
+                                                details, severity, is_fraud)
+            self.writer.submit(work_log_schema.FRAUD_SHEET, entry)
+
+    def log_mouse_details(self, event_type, details="", severity="INFO", is_fraud=False, **mouse_data):
+        entry = work_log_schema.build_entry(self.user_name, self.session_id, "Mouse", event_type,
+                                            details, severity, is_fraud)
+        entry.update(mouse_data)
+        self.writer.submit(work_log_schema.MOUSE_SHEET, entry)
+        if is_fraud:
+            self.log_alert("Mouse", event_type, details, severity, is_fraud)
+
+    def save_to_excel(self, compact=False, timeout=None):
+        if not compact:
+            return True
+        if timeout is None:
+            self.writer.request_compact()
+            return True
+        return self.writer.flush(timeout, compact=True)
+
+    def save_final_data(self):
+        return self.save_to_excel(compact=True, timeout=60)
+
+    def close(self) -> Dict:
+        """Flush + compact cuối như khi tắt app; trả về thống kê I/O"""
+        start = time.perf_counter()
+        ok = self.writer.close(timeout=120, compact=True)
+        stats = self.writer.stats()
+        return {
+            "final_flush_s": round(time.perf_counter() - start, 3),
+            "ok": ok,
+            "written": stats["written"],
+            "batches": stats["batches"],
+            "spilled": stats["spilled"],
+            "avg_flush_ms": stats["avg_flush_ms"],
+            "max_flush_ms": stats["max_flush_ms"],
+            "last_compact_ms": stats["last_compact_ms"],
+            "xlsx_kb": round(os.path.getsize(self.excel_path) / 1024, 1) if os.path.exists(self.excel_path) else 0,
+        }
+
+
+class MemoryLogger:
+    """--no-io: giữ event trong bộ nhớ, không ghi file (chỉ đo phần tính toán)"""
+
+    def __init__(self, user_name):
+        self.user_name = user_name
+        self.fraud_events = []
+        self.mouse_details = []
+
+    def log_alert(self, module, event_type, details="", severity="INFO", is_fraud=False):
+        if is_fraud:
+            self.fraud_events.append((module, event_type, details, severity))
+
+    def log_mouse_details(self, event_type, details="", severity="INFO", is_fraud=False, **mouse_data):
+        self.mouse_details.append(mouse_data)
+        if is_fraud:
+            self.log_alert("Mouse", event_type, details, severity, is_fraud)
+
+    def save_to_excel(self, compact=False, timeout=None):
+        return True
+
+    def save_final_data(self):
+        return True
+
+    def close(self) -> Dict:
+        return {}
+
+
+class StageStats:
+    """Gom latency và allocation của từng stage"""
+
+    def __init__(self, trace_alloc=False):
+        self.trace_alloc = trace_alloc
+        self.latency = {stage: [] for stage in STAGES}
+        self.alloc_peak = {stage: [] for stage in STAGES}
+        self.alloc_net = {stage: [] for stage in STAGES}
+
+    @contextlib.contextmanager
+    def measure(self, stage):
+        if self.trace_alloc:
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.latency[stage].append(time.perf_counter() - start)
+            if self.trace_alloc:
+                current, peak = tracemalloc.get_traced_memory()
+                self.alloc_peak[stage].append(peak - before)
+                self.alloc_net[stage].append(current - before)
+
+    def wrap(self, obj, method_name, stage):
+        """Bọc method của instance để đo stage mà không sửa code pipeline"""
+        original = getattr(obj, method_name)
+
+        def timed(*args, **kwargs):
+            with self.measure(stage):
+                return original(*args, **kwargs)
+
+        setattr(obj, method_name, timed)
+
+    def summary(self) -> Dict:
+        out = {}
+        for stage in STAGES:
+            values = np.array(self.latency[stage]) * 1e3
+            if values.size == 0:
+                continue
+            out[stage] = {
+                "calls": int(values.size),
+                "mean_ms": round(float(values.mean()), 3),
+                "p50_ms": round(float(np.percentile(values, 50)), 3),
+                "p95_ms": round(float(np.percentile(values, 95)), 3),
+                "max_ms": round(float(values.max()), 3),
+            }
+            if self.trace_alloc and self.alloc_peak[stage]:
+                out[stage]["alloc_peak_kb"] = round(float(np.mean(self.alloc_peak[stage])) / 1024, 1)
+                out[stage]["alloc_net_kb"] = round(float(np.mean(self.alloc_net[stage])) / 1024, 1)
+        return out
+
+
+# =========================
+# HARNESS
+# =========================
+def _warmup_model(model: BehaviorModel, system: MouseAnalysisSystem, traces: List) -> bool:
+    """Train model tạm từ metrics của các trace warmup"""
+    rows = [
+        model._metrics_to_dataframe(system.processor.calculate_all_metrics(system.tracker.feed(t, x, y)))
+        for t, x, y in traces
+    ]
+    return model.train(pd.concat(rows, ignore_index=True))
+
+
+def run_replay(traces, n_sessions: int, user_name: str = "REPLAY", warmup: int = 60,
+               trace_alloc: bool = False, verbose: bool = False, with_io: bool = True) -> Dict:
+    with tempfile.TemporaryDirectory(prefix="mouse_replay_") as work_dir:
+        return _run_replay(traces, n_sessions, user_name, warmup, trace_alloc, verbose, with_io, work_dir)
+
+
+def _run_replay(traces, n_sessions, user_name, warmup, trace_alloc, verbose, with_io, work_dir) -> Dict:
+    stats = StageStats(trace_alloc=trace_alloc)
+    traces = iter(traces)
+    warmup_traces = [next(traces) for _ in range(warmup)]
+
+    out = sys.stdout if verbose else io.StringIO()
+    with contextlib.redirect_stdout(out):
+        logger = JournalLogger(user_name, work_dir) if with_io else MemoryLogger(user_name)
+        system = MouseAnalysisSystem(global_logger=logger)
+        system.tracker = ReplayTracker(traces, stats)
+        system.model_registry = ModelRegistry(base_dir=os.path.join(work_dir, "models"),
+                                              global_model_path=os.path.join(work_dir, "global_model.pkl"))
+
+        system.setup_user(user_name)
+        system.wait_for_model()
+        system.trajectory_store = TrajectoryStore(user_name, base_dir=work_dir)
+        _warmup_model(system.ai_model, system, warmup_traces)
+
+        stats.wrap(system.processor, "calculate_all_metrics", "processor")
+        stats.wrap(system.ai_model, "predict", "predict")
+        stats.wrap(system.excel_handler, "log_session_data", "log")
+
+        if trace_alloc:
+            tracemalloc.start()
+
+        total_events = 0
+        start = time.perf_counter()
+        for _ in range(n_sessions):
+            system.session_count += 1
+            result = system._run_single_session(None, None)
+            if result:
+                total_events += result.total_events
+                system.excel_handler.log_session_data(result)
+        elapsed = time.perf_counter() - start
+
+        if trace_alloc:
+            tracemalloc.stop()
+        system.trajectory_store.close()
+        log_io = logger.close()
+
+    return {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "sessions": n_sessions,
+        "events": total_events,
+        "elapsed_s": round(elapsed, 3),
+        "sessions_per_s": round(n_sessions / elapsed, 2) if elapsed > 0 else 0.0,
+        "events_per_s": round(total_events / elapsed, 1) if elapsed > 0 else 0.0,
+        "trace_alloc": trace_alloc,
+        "with_io": with_io,
+        "stages": stats.summary(),
+        "log_io": log_io,
+        "model": {k: v for k, v in system.ai_model.get_model_info().items() if k != 'selected_features'},
+    }
+
+
+def print_report(report: Dict):
+    print("=" * 60)
+    print(f"🖱️ MOUSE REPLAY BENCHMARK - {report['sessions']} sessions, {report['events']} events")
+    print(f"⏱️ {report['elapsed_s']}s  |  {report['sessions_per_s']} sessions/s  |  {report['events_per_s']} events/s")
+    print("-" * 60)
+    for stage, s in report["stages"].items():
+        line = f"{stage:<10} mean {s['mean_ms']:>9.3f} ms  p50 {s['p50_ms']:>9.3f}  p95 {s['p95_ms']:>9.3f}  max {s['max_ms']:>9.3f}"
+        if "alloc_peak_kb" in s:
+            line += f"  | peak {s['alloc_peak_kb']:.1f} KB  net {s['alloc_net_kb']:.1f} KB"
+        print(line)
+    if report.get("log_io"):
+        io_stats = report["log_io"]
+        print("-" * 60)
+        print(f"💾 writer: {io_stats['written']} rows in {io_stats['batches']} batches "
+              f"(avg {io_stats['avg_flush_ms']} ms, max {io_stats['max_flush_ms']} ms) | "
+              f"final flush+compact {io_stats['final_flush_s']}s | xlsx {io_stats['xlsx_kb']} KB")
+    elif not report.get("with_io", True):
+        print("ℹ️ --no-io: log stage = in-memory list, no journal/compaction")
+    print("=" * 60)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay mouse traces through the analysis pipeline")
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--source", choices=["synthetic", "store"], default="synthetic")
+    parser.add_argument("--user", default="EM001", help="User có trajectory đã ghi (source=store)")
+    parser.add_argument("--base-dir", default=SAVED_FILE_DIR)
+    parser.add_argument("--duration", type=float, default=60.0, help="Độ dài trace synthetic (giây)")
+    parser.add_argument("--rate-hz", type=float, default=125.0, help="Polling rate trace synthetic")
+    parser.add_argument("--bot-fraction", type=float, default=0.0, help="Tỉ lệ trace bot (synthetic)")
+    parser.add_argument("--warmup", type=int, default=60, help="Số trace dùng train model tạm")
+    parser.add_argument("--alloc", action="store_true", help="Đo allocation bằng tracemalloc (chậm hơn)")
+    parser.add_argument("--json", help="Ghi report ra file JSON")
+    parser.add_argument("--verbose", action="store_true", help="Giữ log của pipeline")
+    parser.add_argument("--no-io", action="store_true", help="Log vào RAM thay vì journal + writer nền")
+    args = parser.parse_args(argv)
+
+    total = args.sessions + args.warmup
+    if args.source == "store":
+        traces = store_traces(args.user, args.base_dir, total)
+    else:
+        traces = synthetic_traces(total, duration=args.duration, rate_hz=args.rate_hz,
+                                  bot_fraction=args.bot_fraction)
+
+    report = run_replay(traces, args.sessions, warmup=args.warmup, trace_alloc=args.alloc, verbose=args.verbose,
+                        with_io=not args.no_io)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report saved: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Session Control
+Chờ stop / pause / resume bằng blocking wait thay vì vòng lặp time.sleep(0.5)
+
+- ControlEvent: bọc multiprocessing.Event, mỗi lần set/clear thì notify_all trên
+  1 Condition dùng chung -> bên chờ được đánh thức ngay, kể cả khi chờ "pause được clear"
+- SessionControl: gộp stop_event + pause_event thành các hàm chờ với deadline monotonic
+
+Process cha tạo stop/pause bằng ControlEvent.create_pair() và truyền như Event thường
+(API set / clear / is_set / wait giữ nguyên nên các chỗ gọi cũ không phải sửa).
+"""
+
+import time
+import multiprocessing
+from typing import Optional, Tuple
+
+FALLBACK_POLL = 0.5  # chỉ dùng khi nhận Event thường (không có condition chung)
+
+
+class ControlEvent:
+    """Event có notify trên condition dùng chung giữa các process"""
+
+    def __init__(self, condition=None, ctx=multiprocessing):
+        self.condition = condition if condition is not None else ctx.Condition()
+        self._event = ctx.Event()
+
+    @classmethod
+    def create_pair(cls, ctx=multiprocessing) -> Tuple["ControlEvent", "ControlEvent"]:
+        """Tạo (stop_event, pause_event) dùng chung 1 condition"""
+        condition = ctx.Condition()
+        return cls(condition, ctx), cls(condition, ctx)
+
+    def set(self):
+        with self.condition:
+            self._event.set()
+            self.condition.notify_all()
+
+    def clear(self):
+        with self.condition:
+            self._event.clear()
+            self.condition.notify_all()
+
+    def is_set(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._event.wait(timeout)
+
+
+class SessionControl:
+    """Các hàm chờ trạng thái stop / pause dùng chung cho tracker và vòng phân tích"""
+
+    def __init__(self, stop_event=None, pause_event=None):
+        self.stop_event = stop_event
+        self.pause_event = pause_event
+
+        condition = getattr(stop_event, 'condition', None)
+        if pause_event is not None and getattr(pause_event, 'condition', None) is not condition:
+            condition = None
+        self.condition = condition
+
+    def is_stopped(self) -> bool:
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    def is_paused(self) -> bool:
+        return self.pause_event is not None and self.pause_event.is_set()
+
+    def wait_until(self, deadline: float) -> bool:
+        """
+        Chờ đến deadline (time.monotonic) hoặc tới khi bị stop / pause.
+        Trả về True nếu hết giờ bình thường.
+        """
+        predicate = lambda: self.is_stopped() or self.is_paused()
+        return not self._wait(predicate, deadline)
+
+    def wait_while_paused(self, deadline: Optional[float] = None) -> bool:
+        """Chờ hết pause (resume) hoặc stop. Trả về True nếu được resume."""
+        predicate = lambda: self.is_stopped() or not self.is_paused()
+        self._wait(predicate, deadline)
+        return not self.is_stopped() and not self.is_paused()
+
+    def _wait(self, predicate, deadline: Optional[float]) -> bool:
+        if self.condition is not None:
+            with self.condition:
+                while not predicate():
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self.condition.wait(remaining)
+                return True
+
+        # Event thường: chờ trên stop_event (stop phản ứng ngay), pause kiểm tra theo nhịp
+        while not predicate():
+            remaining = FALLBACK_POLL if deadline is None else min(deadline - time.monotonic(), FALLBACK_POLL)
+            if remaining <= 0:
+                return False
+            if self.stop_event is not None:
+                self.stop_event.wait(remaining)
+            else:
+                time.sleep(remaining)
+        return True
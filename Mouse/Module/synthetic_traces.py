@@ -0,0 +1,246 @@
+"""
+Synthetic Mouse Trace Generator
+Sinh quỹ đạo chuột giả lập (người / bot) cho load test và đánh giá AUC
+
+- Người: chuỗi cú di chuyển minimum-jerk giữa các target, thời gian theo Fitts' law,
+  đường cong nhẹ + rung tay, dừng (pause) ngẫu nhiên giữa các cú, polling có jitter
+- Bot: linear (thẳng, vận tốc đều giữa target), constant_velocity (trượt đều dội biên),
+  teleport (nhảy vị trí), jiggler (lắc qua lại vài pixel theo chu kỳ)
+
+Sinh vectorized cho cả batch session cùng lúc. Giống RealTimeTracker, chỉ giữ sample
+khi vị trí thay đổi nên mỗi session có độ dài khác nhau -> lưu dạng ragged (flat + offsets).
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from Mouse.Models.MouseEvents import MouseEvent, EventType
+
+HUMAN = "human"
+BOT_KINDS = ("linear", "constant_velocity", "teleport", "jiggler")
+
+
+@dataclass
+class SyntheticBatch:
+    """Batch session dạng ragged: session i = [offsets[i], offsets[i + 1])"""
+    t: np.ndarray  # float64 - giây tính từ đầu session
+    x: np.ndarray  # int32
+    y: np.ndarray  # int32
+    offsets: np.ndarray  # int64, len = n_sessions + 1
+    labels: np.ndarray  # int8: 0 = người, 1 = bot
+    kinds: np.ndarray  # str: human / linear / ...
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def session(self, i: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        lo, hi = self.offsets[i], self.offsets[i + 1]
+        return self.t[lo:hi], self.x[lo:hi], self.y[lo:hi]
+
+    def iter_sessions(self) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        for i in range(len(self)):
+            yield self.session(i)
+
+    def to_events(self, i: int, start: Optional[datetime] = None) -> List[MouseEvent]:
+        """Session i theo đúng định dạng event của RealTimeTracker"""
+        start = start or datetime.now()
+        t, x, y = self.session(i)
+        return [
+            MouseEvent(timestamp=start + timedelta(seconds=ti), event_type=EventType.MOVE, x=xi, y=yi)
+            for ti, xi, yi in zip(t.tolist(), x.tolist(), y.tolist())
+        ]
+
+    @classmethod
+    def concat(cls, batches: List["SyntheticBatch"]) -> "SyntheticBatch":
+        sizes = np.cumsum([0] + [len(b.t) for b in batches[:-1]])
+        return cls(
+            t=np.concatenate([b.t for b in batches]),
+            x=np.concatenate([b.x for b in batches]),
+            y=np.concatenate([b.y for b in batches]),
+            offsets=np.concatenate([[0]] + [b.offsets[1:] + s for b, s in zip(batches, sizes)]),
+            labels=np.concatenate([b.labels for b in batches]),
+            kinds=np.concatenate([b.kinds for b in batches]),
+        )
+
+
+class SyntheticTraceGenerator:
+    """Sinh trace người / bot vectorized theo batch"""
+
+    def __init__(self, rate_hz: float = 125.0, duration: float = 60.0,
+                 screen: Tuple[int, int] = (1920, 1080), seed: Optional[int] = None):
+        self.rate_hz = rate_hz
+        self.duration = duration
+        self.screen = np.array(screen, dtype=np.float64)
+        self.rng = np.random.default_rng(seed)
+        self.n_points = max(int(duration * rate_hz), 2)
+
+    # =========================
+    # PUBLIC API
+    # =========================
+    def generate(self, n_sessions: int, bot_fraction: float = 0.5) -> SyntheticBatch:
+        """Trộn người và bot (các loại bot chia đều), thứ tự ngẫu nhiên"""
+        n_bot = int(round(n_sessions * bot_fraction))
+        parts = [self.generate_human(n_sessions - n_bot)] if n_sessions - n_bot > 0 else []
+        if n_bot > 0:
+            parts.append(self.generate_bot(n_bot))
+        batch = SyntheticBatch.concat(parts)
+        return self._shuffle(batch)
+
+    def stream(self, n_sessions: int, batch_size: int = 1000,
+               bot_fraction: float = 0.5) -> Iterator[SyntheticBatch]:
+        """Sinh theo từng batch để tạo hàng triệu session mà không giữ hết trong RAM"""
+        remaining = n_sessions
+        while remaining > 0:
+            size = min(batch_size, remaining)
+            yield self.generate(size, bot_fraction)
+            remaining -= size
+
+    def generate_human(self, n: int) -> SyntheticBatch:
+        t = self._time_grid(n, jitter=0.2)
+        speed = self.rng.lognormal(0.0, 0.25, size=(n, 1))  # tốc độ riêng từng người
+
+        def movement_time(dist, k):
+            width = self.rng.uniform(10, 60, size=(n, k))
+            return (0.1 + 0.15 * np.log2(dist / width + 1)) / speed  # Fitts' law
+
+        def pause_time(k):
+            short = self.rng.exponential(0.4, size=(n, k))
+            long = self.rng.exponential(3.0, size=(n, k)) * (self.rng.random((n, k)) < 0.1)
+            return short + long
+
+        x, y = self._segment_motion(t, movement_time, pause_time, profile="minimum_jerk",
+                                    curvature=0.12, tremor=0.7)
+        return self._pack(t, x, y, label=0, kind=HUMAN)
+
+    def generate_bot(self, n: int, kind: Optional[str] = None) -> SyntheticBatch:
+        """kind=None -> chia đều các loại bot"""
+        if kind is None:
+            counts = np.bincount(self.rng.integers(0, len(BOT_KINDS), n), minlength=len(BOT_KINDS))
+            parts = [self.generate_bot(c, k) for k, c in zip(BOT_KINDS, counts) if c > 0]
+            return SyntheticBatch.concat(parts)
+
+        if kind not in BOT_KINDS:
+            raise ValueError(f"Unknown bot kind: {kind}")
+
+        t = self._time_grid(n, jitter=0.0)
+        if kind == "linear":
+            px_per_s = self.rng.uniform(500, 3000, size=(n, 1))
+            fixed_pause = self.rng.uniform(0.0, 1.0, size=(n, 1))
+            x, y = self._segment_motion(
+                t,
+                lambda dist, k: dist / px_per_s,
+                lambda k: np.broadcast_to(fixed_pause, (n, k)),
+                profile="linear", curvature=0.0, tremor=0.0)
+        elif kind == "constant_velocity":
+            angle = self.rng.uniform(0, 2 * np.pi, size=(n, 1))
+            v = self.rng.uniform(100, 1500, size=(n, 1))
+            start = self.rng.random((n, 2)) * self.screen
+            x = self._bounce(start[:, :1] + v * np.cos(angle) * t, self.screen[0] - 1)
+            y = self._bounce(start[:, 1:] + v * np.sin(angle) * t, self.screen[1] - 1)
+        elif kind == "teleport":
+            interval = self.rng.uniform(0.5, 5.0, size=(n, 1))
+            jump = np.floor(t / interval).astype(np.int64)
+            n_jumps = int(jump.max()) + 1
+            spots = self.rng.random((n, n_jumps, 2)) * self.screen
+            rows = np.arange(n)[:, None]
+            x, y = spots[rows, jump, 0], spots[rows, jump, 1]
+        else:  # jiggler
+            period = self.rng.uniform(0.5, 10.0, size=(n, 1))
+            amplitude = self.rng.integers(1, 6, size=(n, 1))
+            home = self.rng.random((n, 2)) * self.screen
+            toggle = (np.floor(t / period) % 2) * amplitude
+            x, y = home[:, :1] + toggle, home[:, 1:] + toggle
+
+        return self._pack(t, x, y, label=1, kind=kind)
+
+    # =========================
+    # INTERNAL
+    # =========================
+    def _time_grid(self, n: int, jitter: float) -> np.ndarray:
+        """Lưới thời gian polling (n, n_points); jitter tính theo tỉ lệ chu kỳ"""
+        period = 1.0 / self.rate_hz
+        t = np.broadcast_to(np.arange(self.n_points) * period, (n, self.n_points)).copy()
+        if jitter > 0:
+            t += self.rng.uniform(-jitter, jitter, size=t.shape) * period
+            t[:, 0] = 0.0
+        return t
+
+    def _segment_motion(self, t, movement_time, pause_time, profile, curvature, tremor):
+        """
+        Chuỗi cú di chuyển target -> target, mỗi cú = di chuyển (movement_time) + dừng (pause_time).
+        Tìm cú tương ứng với từng sample bằng 1 lần searchsorted trên mảng đã flatten.
+        """
+        n = t.shape[0]
+        k = int(self.duration / 0.15) + 2  # đủ số cú để phủ hết session
+
+        targets = self.rng.random((n, k + 1, 2)) * self.screen
+        delta = targets[:, 1:] - targets[:, :-1]
+        dist = np.maximum(np.hypot(delta[..., 0], delta[..., 1]), 1.0)
+
+        mt = np.maximum(movement_time(dist, k), 1e-3)
+        seg_start = np.concatenate([np.zeros((n, 1)), np.cumsum(mt + pause_time(k), axis=1)[:, :-1]], axis=1)
+
+        # searchsorted batch: cộng offset từng dòng để các dòng không chồng nhau
+        span = seg_start[:, -1:].max() + self.duration + 1.0
+        row_offset = np.arange(n)[:, None] * span
+        flat_idx = np.searchsorted((seg_start + row_offset).ravel(), (t + row_offset).ravel(), side="right") - 1
+        seg = (flat_idx.reshape(t.shape) - np.arange(n)[:, None] * k).clip(0, k - 1)
+
+        rows = np.arange(n)[:, None]
+        tau = np.clip((t - seg_start[rows, seg]) / mt[rows, seg], 0.0, 1.0)
+        if profile == "minimum_jerk":
+            s = tau ** 3 * (10 - 15 * tau + 6 * tau ** 2)
+        else:
+            s = tau
+
+        p0 = targets[rows, seg]
+        d = delta[rows, seg]
+        pos = p0 + d * s[..., None]
+
+        if curvature > 0:
+            bend = self.rng.normal(0, curvature, size=(n, k))[rows, seg] * np.sin(np.pi * tau)
+            pos += np.stack([-d[..., 1], d[..., 0]], axis=-1) * bend[..., None]
+        if tremor > 0:
+            moving = (tau < 1.0)[..., None]
+            pos += self.rng.normal(0, tremor, size=pos.shape) * moving
+
+        return pos[..., 0], pos[..., 1]
+
+    @staticmethod
+    def _bounce(pos, limit):
+        """Phản xạ tại biên màn hình (sóng tam giác)"""
+        period = 2 * limit
+        p = np.mod(pos, period)
+        return np.where(p > limit, period - p, p)
+
+    def _pack(self, t, x, y, label: int, kind: str) -> SyntheticBatch:
+        """Làm tròn pixel, bỏ sample không đổi vị trí (giống listener on_move), flatten"""
+        n = t.shape[0]
+        xi = np.clip(np.rint(x), 0, self.screen[0] - 1).astype(np.int32)
+        yi = np.clip(np.rint(y), 0, self.screen[1] - 1).astype(np.int32)
+
+        keep = np.ones(xi.shape, dtype=bool)
+        keep[:, 1:] = (np.diff(xi, axis=1) != 0) | (np.diff(yi, axis=1) != 0)
+
+        counts = keep.sum(axis=1)
+        offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+
+        return SyntheticBatch(
+            t=t[keep], x=xi[keep], y=yi[keep], offsets=offsets,
+            labels=np.full(n, label, dtype=np.int8),
+            kinds=np.full(n, kind, dtype=object),
+        )
+
+    def _shuffle(self, batch: SyntheticBatch) -> SyntheticBatch:
+        order = self.rng.permutation(len(batch))
+        lengths = np.diff(batch.offsets)[order]
+        starts = batch.offsets[:-1][order]
+        idx = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths) + np.arange(lengths.sum())
+        return SyntheticBatch(
+            t=batch.t[idx], x=batch.x[idx], y=batch.y[idx],
+            offsets=np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64),
+            labels=batch.labels[order], kinds=batch.kinds[order],
+        )
@@ -0,0 +1,60 @@
+"""
+Test RealTimeTracker: pause / resume không gộp event trước pause vào cửa sổ sau resume
+
+Chạy:
+    python -m pytest -q Mouse/Module/test_real_time_tracker.py
+"""
+
+import threading
+import time
+
+from Mouse.Module.real_time_tracker import RealTimeTracker
+from Mouse.Module.session_control import ControlEvent
+
+
+def _tracker(monkeypatch):
+    """Tracker không cần pynput: event ghi qua record_move như replay harness"""
+    tracker = RealTimeTracker()
+    monkeypatch.setattr(tracker, "start", lambda: None)
+    tracker.is_tracking = True
+    tracker._window_start = time.monotonic()
+    return tracker
+
+
+def test_pause_mid_window_keeps_only_events_after_resume(monkeypatch):
+    tracker = _tracker(monkeypatch)
+    stop_event, pause_event = ControlEvent.create_pair()
+
+    def user():
+        for i in range(5):
+            tracker.record_move(i, i)
+        time.sleep(0.05)
+        pause_event.set()
+        time.sleep(0.2)  # Listener bỏ qua event lúc pause
+        pause_event.clear()
+        time.sleep(0.05)
+        for i in range(3):
+            tracker.record_move(100 + i, 100 + i)
+
+    thread = threading.Thread(target=user)
+    thread.start()
+    start = time.monotonic()
+    events = tracker.collect_events(0.5, stop_event=stop_event, pause_event=pause_event)
+    thread.join()
+
+    assert [(e.x, e.y) for e in events] == [(100, 100), (101, 101), (102, 102)]
+    # Cửa sổ tính lại từ lúc resume, không kết thúc theo deadline cũ
+    assert time.monotonic() - start >= 0.5 + 0.2
+
+
+def test_restart_window_drops_events_before_pause(monkeypatch):
+    tracker = _tracker(monkeypatch)
+    tracker.record_move(1, 1)
+    tracker.set_paused(True)
+    tracker.set_paused(False)
+    before = tracker._window_start
+    tracker.restart_window()
+    tracker.record_move(2, 2)
+
+    assert tracker._window_start > before
+    assert [(e.x, e.y) for e in tracker.take_events()] == [(2, 2)]
@@ -0,0 +1,217 @@
+"""
+Raw Mouse Trajectory Store
+Lưu quỹ đạo chuột thô của từng session (npz nén, delta-encoding)
+
+Layout:
+    Saved_file/<user>/<yyyy_mm>/mouse_trajectories/
+        index.jsonl                     # 1 dòng / session: session_id -> file (session_id phải duy nhất trong tháng)
+        <yyyymmdd>_<session_id>.npz     # t0, dt, x0, dx, y0, dy
+
+- Ghi bằng writer thread riêng: vòng tracking chỉ tốn 1 lần queue.put
+- Reader đọc tuần tự từng session để batch feature extraction
+"""
+
+import os
+import json
+import queue
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+from Mouse.Models.MouseTrajectory import MouseTrajectory
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SAVED_FILE_DIR = os.path.join(PROJECT_ROOT, "Saved_file")
+
+
+def _smallest_int_dtype(values: np.ndarray):
+    """Chọn dtype nhỏ nhất chứa được toàn bộ delta"""
+    if values.size == 0:
+        return np.int16
+    lo, hi = int(values.min()), int(values.max())
+    for dtype in (np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return dtype
+    return np.int64
+
+
+def encode_trajectory(traj: MouseTrajectory) -> Dict[str, np.ndarray]:
+    """Delta-encode timestamp và toạ độ"""
+    dt = np.diff(traj.t_us)
+    dx = np.diff(traj.x.astype(np.int64))
+    dy = np.diff(traj.y.astype(np.int64))
+    dt_dtype = np.uint32 if dt.size == 0 or (dt.min() >= 0 and dt.max() <= np.iinfo(np.uint32).max) else np.int64
+    return {
+        't0': np.array([traj.t_us[0]], dtype=np.int64),
+        'dt': dt.astype(dt_dtype),
+        'x0': np.array([traj.x[0]], dtype=np.int32),
+        'dx': dx.astype(_smallest_int_dtype(dx)),
+        'y0': np.array([traj.y[0]], dtype=np.int32),
+        'dy': dy.astype(_smallest_int_dtype(dy)),
+    }
+
+
+def decode_trajectory(session_id: str, arrays) -> MouseTrajectory:
+    """Giải mã mảng delta thành MouseTrajectory"""
+    t_us = np.concatenate([arrays['t0'], arrays['t0'][0] + np.cumsum(arrays['dt'], dtype=np.int64)])
+    x = np.concatenate([arrays['x0'], arrays['x0'][0] + np.cumsum(arrays['dx'], dtype=np.int64)]).astype(np.int32)
+    y = np.concatenate([arrays['y0'], arrays['y0'][0] + np.cumsum(arrays['dy'], dtype=np.int64)]).astype(np.int32)
+    return MouseTrajectory(session_id=session_id, t_us=t_us, x=x, y=y)
+
+
+class TrajectoryStore:
+    """Lưu / đọc quỹ đạo chuột thô theo user và tháng"""
+
+    DIR_NAME = "mouse_trajectories"
+    INDEX_FILE = "index.jsonl"
+    QUEUE_SIZE = 64
+
+    def __init__(self, user_name: str, base_dir: str = SAVED_FILE_DIR):
+        self.user_name = user_name
+        self.base_dir = base_dir
+        self._queue = queue.Queue(maxsize=self.QUEUE_SIZE)
+        self._writer = None
+        self._lock = threading.Lock()
+        self.saved_count = 0
+        self.dropped_count = 0
+
+    # =========================
+    # PATHS
+    # =========================
+    def month_dir(self, year_month: str) -> str:
+        return os.path.join(self.base_dir, self.user_name, year_month, self.DIR_NAME)
+
+    def list_months(self) -> List[str]:
+        user_dir = os.path.join(self.base_dir, self.user_name)
+        if not os.path.isdir(user_dir):
+            return []
+        return sorted(
+            item for item in os.listdir(user_dir)
+            if os.path.isfile(os.path.join(user_dir, item, self.DIR_NAME, self.INDEX_FILE))
+        )
+
+    # =========================
+    # WRITE
+    # =========================
+    def save_async(self, session_id: str, events) -> bool:
+        """
+        Đưa session vào hàng đợi ghi - không block vòng tracking.
+        Nếu hàng đợi đầy (disk chậm) thì bỏ session thay vì chặn tracking.
+        """
+        if not events:
+            return False
+
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait((session_id, events))
+            return True
+        except queue.Full:
+            self.dropped_count += 1
+            print(f"⚠️ Trajectory queue full, dropped session {session_id}")
+            return False
+
+    def save(self, session_id: str, events) -> Optional[str]:
+        """Ghi đồng bộ 1 session (events là list MouseEvent hoặc MouseTrajectory)"""
+        traj = events if isinstance(events, MouseTrajectory) else MouseTrajectory.from_events(session_id, events)
+        if len(traj) == 0:
+            return None
+
+        start = traj.start_time
+        out_dir = self.month_dir(start.strftime("%Y_%m"))
+        os.makedirs(out_dir, exist_ok=True)
+
+        file_name = f"{start.strftime('%Y%m%d')}_{session_id}.npz"
+        file_path = os.path.join(out_dir, file_name)
+        temp_path = file_path + ".tmp"
+
+        with open(temp_path, "wb") as f:
+            np.savez_compressed(f, **encode_trajectory(traj))
+        os.replace(temp_path, file_path)
+
+        entry = {
+            "session_id": session_id,
+            "file": file_name,
+            "n_events": len(traj),
+            "start": start.strftime("%Y-%m-%d %H:%M:%S"),
+            "end": traj.end_time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        with self._lock:
+            with open(os.path.join(out_dir, self.INDEX_FILE), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+            self.saved_count += 1
+
+        return file_path
+
+    def _ensure_writer(self):
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._writer_loop, name="TrajectoryWriter", daemon=True)
+            self._writer.start()
+
+    def _writer_loop(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                session_id, events = item
+                self.save(session_id, events)
+            except Exception as e:
+                print(f"❌ Error saving trajectory: {e}")
+            finally:
+                self._queue.task_done()
+
+    def close(self, timeout: float = 10.0):
+        """Ghi nốt các session còn trong hàng đợi rồi dừng writer"""
+        if self._writer is None or not self._writer.is_alive():
+            return
+        self._queue.put(None)
+        self._writer.join(timeout)
+        print(f"✅ Trajectory store closed ({self.saved_count} saved, {self.dropped_count} dropped)")
+
+    # =========================
+    # READ
+    # =========================
+    def read_index(self, year_month: str) -> List[Dict]:
+        index_path = os.path.join(self.month_dir(year_month), self.INDEX_FILE)
+        if not os.path.exists(index_path):
+            return []
+
+        entries = []
+        with open(index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue  # dòng ghi dở khi crash
+        return entries
+
+    def load(self, session_id: str, year_month: Optional[str] = None) -> Optional[MouseTrajectory]:
+        """Đọc 1 session theo session_id"""
+        months = [year_month] if year_month else reversed(self.list_months())
+        for month in months:
+            for entry in reversed(self.read_index(month)):
+                if entry["session_id"] == session_id:
+                    return self._load_file(month, entry)
+        return None
+
+    def iter_sessions(self, months: Optional[List[str]] = None) -> Iterator[MouseTrajectory]:
+        """Đọc tuần tự từng session - không load toàn bộ vào bộ nhớ"""
+        for month in (months or self.list_months()):
+            for entry in self.read_index(month):
+                traj = self._load_file(month, entry)
+                if traj is not None:
+                    yield traj
+
+    def _load_file(self, year_month: str, entry: Dict) -> Optional[MouseTrajectory]:
+        file_path = os.path.join(self.month_dir(year_month), entry["file"])
+        try:
+            with np.load(file_path) as arrays:
+                return decode_trajectory(entry["session_id"], arrays)
+        except (OSError, KeyError, ValueError) as e:
+            print(f"⚠️ Error reading trajectory {file_path}: {e}")
+            return None
@@ -0,0 +1,301 @@
+"""
+Background Writer
+Thread ghi nền cho EventJournal: thread gọi log (UI Qt, vòng lặp chuột) không bao giờ chờ I/O
+
+- submit(sheet, row): đưa event vào queue giới hạn (put_nowait), trả về ngay
+  Queue đầy (writer đang compact lâu) -> event vào hàng spill trong RAM, không mất, không chặn caller;
+  khi spill còn hàng mọi event sau cũng vào spill -> journal giữ đúng thứ tự submit
+- request_compact(): chỉ bật cờ; nhiều yêu cầu trước khi writer kịp chạy gộp thành 1 lần compact
+- Writer: gom hết event đang chờ -> 1 lần append_many (1 lần mở file) -> compact nếu có yêu cầu
+- flush(timeout, compact): chờ tới khi mọi event gửi trước đó đã ghi (+ compact) - dùng khi tắt app
+  hoặc trước khi mở reader cần xlsx mới (chatbot)
+- stats(): độ sâu queue, số batch, số lần compact / số yêu cầu đã gộp, latency flush
+
+Thread chỉ khởi động ở lần submit đầu tiên, nên bản pickle sang process khác tự có writer riêng.
+Thread ngủ trên queue.get() (không poll); kiểm tra thread + put cùng nằm dưới _start_lock, nên
+writer không thể thoát giữa lúc caller thấy thread còn sống và lúc caller put.
+journal chỉ cần append_many() + compact(): process chuột dùng ChannelSink (Storage.log_channel) thay EventJournal.
+
+Chạy (benchmark):
+    python -m Storage.background_writer --events 5000
+"""
+
+import os
+import time
+import queue
+import argparse
+import tempfile
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from Storage.event_journal import EventJournal
+
+DEFAULT_MAX_PENDING = 10000
+RETRY_SECONDS = 1.0
+
+
+class _Barrier:
+    """Mốc flush: writer set() sau khi đã ghi mọi thứ đứng trước nó trong queue"""
+
+    def __init__(self, compact: bool):
+        self.compact = compact
+        self.done = threading.Event()
+        self.ok = True
+
+
+class BackgroundWriter:
+    """Writer nền cho 1 EventJournal"""
+
+    def __init__(self, journal: "EventJournal", name: str = "log-writer",
+                 max_pending: int = DEFAULT_MAX_PENDING):
+        self.journal = journal
+        self.name = name
+        self.max_pending = max_pending
+        self._init_runtime()
+
+    def _init_runtime(self):
+        self._queue = queue.Queue(maxsize=self.max_pending)
+        self._spill = deque()
+        self._compact_requested = threading.Event()
+        self._start_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+        # Thống kê
+        self.submitted = 0
+        self.spilled = 0
+        self.written = 0
+        self.batches = 0
+        self.compact_requests = 0
+        self.compactions = 0
+        self.errors = 0
+        self.last_error = None
+        self.last_flush_seconds = None
+        self.max_flush_seconds = 0.0
+        self.total_flush_seconds = 0.0
+        self.last_compact_seconds = None
+
+    # Queue / thread / Event không pickle được (logger được truyền sang process chuột)
+    def __getstate__(self):
+        return {"journal": self.journal, "name": self.name, "max_pending": self.max_pending}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_runtime()
+
+    # =========================
+    # CALLER SIDE (không chặn)
+    # =========================
+    def submit(self, sheet: str, row: Dict):
+        """Đưa 1 event cho writer, trả về ngay"""
+        self.submitted += 1
+        if self._enqueue((sheet, row)):
+            self.spilled += 1
+
+    def submit_many(self, records: List[Tuple[str, Dict]]):
+        """Đưa cả batch (sheet, row) - dùng cho kênh log từ process khác"""
+        for sheet, row in records:
+            self.submit(sheet, row)
+
+    def request_compact(self):
+        """Yêu cầu dựng lại xlsx; các yêu cầu dồn lại chỉ chạy 1 lần"""
+        self.compact_requests += 1
+        self._compact_requested.set()
+        self._enqueue(None)  # Đánh thức writer
+
+    def flush(self, timeout: Optional[float] = None, compact: bool = False) -> bool:
+        """Chờ writer ghi xong mọi event đã submit (+ compact). False nếu quá timeout hoặc lỗi."""
+        with self._start_lock:
+            if self._thread is None and not compact:
+                return True  # Writer chỉ thoát khi queue + spill đã rỗng
+        barrier = _Barrier(compact)
+        self._enqueue(barrier)  # Queue đầy -> vào spill, vẫn đứng sau mọi event đã submit
+        return barrier.done.wait(timeout) and barrier.ok
+
+    def close(self, timeout: Optional[float] = None, compact: bool = True) -> bool:
+        """Flush lần cuối rồi dừng thread"""
+        ok = self.flush(timeout, compact=compact)
+        with self._start_lock:
+            self._closed = True
+            if self._thread is not None:
+                try:
+                    self._queue.put_nowait(None)  # Đánh thức writer để nó thoát
+                except queue.Full:
+                    pass  # Writer đang bận, thấy _closed sau batch hiện tại
+        return ok
+
+    # =========================
+    # WRITER THREAD
+    # =========================
+    def _enqueue(self, item) -> bool:
+        """Put không chặn (khởi động writer nếu cần); True nếu item phải vào spill"""
+        with self._start_lock:
+            if self._thread is None:
+                self._closed = False
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            if not self._spill:
+                try:
+                    self._queue.put_nowait(item)
+                    return False
+                except queue.Full:
+                    pass
+            self._spill.append(item)
+            return True
+
+    def _drain(self, first) -> Tuple[List, List[_Barrier]]:
+        items = [first]
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        # Spill sau queue: khi spill còn hàng, caller không put vào queue nữa
+        with self._start_lock:
+            items.extend(self._spill)
+            self._spill.clear()
+
+        records, barriers = [], []
+        for item in items:
+            if isinstance(item, _Barrier):
+                barriers.append(item)
+            elif item is not None:
+                records.append(item)
+        return records, barriers
+
+    def _run(self):
+        retry: List = []
+        while True:
+            # Chỉ chờ có hạn khi còn batch / compact phải thử lại; bình thường ngủ tới khi có item
+            waiting_retry = bool(retry) or self._compact_requested.is_set()
+            try:
+                first = self._queue.get(timeout=RETRY_SECONDS if waiting_retry else None)
+            except queue.Empty:
+                first = None
+            records, barriers = self._drain(first)
+            records = retry + records
+            retry = []
+
+            if records or barriers or self._compact_requested.is_set():
+                retry = self._write(records, barriers)
+
+            if self._closed and not retry and not self._compact_requested.is_set():
+                with self._start_lock:
+                    if self._queue.empty() and not self._spill:
+                        self._thread = None  # submit sau close() khởi động lại writer
+                        return
+
+    def _write(self, records: List, barriers: List[_Barrier]) -> List:
+        """1 lần append_many (+ compact); trả về batch cần ghi lại nếu lỗi"""
+        retry: List = []
+        start = time.perf_counter()
+        ok = True
+        try:
+            self.journal.append_many(records)
+            self.written += len(records)
+            self.batches += 1 if records else 0
+        except Exception as e:
+            # Giữ batch lại, vòng sau ghi tiếp (ổ đĩa đầy / file bị khoá tạm thời)
+            retry = records
+            ok = False
+            self._record_error(e, "writing event journal")
+
+        if ok and (self._compact_requested.is_set() or any(b.compact for b in barriers)):
+            self._compact_requested.clear()
+            compact_start = time.perf_counter()
+            try:
+                self.journal.compact()
+                self.compactions += 1
+                self.last_compact_seconds = time.perf_counter() - compact_start
+            except Exception as e:
+                ok = False
+                self._compact_requested.set()  # Thử lại ở vòng sau
+                self._record_error(e, "compacting work log")
+
+        elapsed = time.perf_counter() - start
+        self.last_flush_seconds = elapsed
+        self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+        self.total_flush_seconds += elapsed
+
+        for barrier in barriers:
+            barrier.ok = ok
+            barrier.done.set()
+
+        if not ok:
+            time.sleep(RETRY_SECONDS)
+        return retry
+
+    def _record_error(self, error: Exception, action: str):
+        self.errors += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+        print(f"❌ Background writer error {action}: {error}")
+
+    # =========================
+    # STATS
+    # =========================
+    def queue_depth(self) -> int:
+        return self._queue.qsize() + len(self._spill)
+
+    def stats(self) -> Dict:
+        flushes = self.batches + self.compactions
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "queue_depth": self.queue_depth(),
+            "max_pending": self.max_pending,
+            "submitted": self.submitted,
+            "spilled": self.spilled,
+            "written": self.written,
+            "batches": self.batches,
+            "compact_requests": self.compact_requests,
+            "compactions": self.compactions,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "last_flush_ms": (round(self.last_flush_seconds * 1000, 2)
+                              if self.last_flush_seconds is not None else None),
+            "max_flush_ms": round(self.max_flush_seconds * 1000, 2),
+            "avg_flush_ms": round(self.total_flush_seconds * 1000 / flushes, 2) if flushes else None,
+            "last_compact_ms": (round(self.last_compact_seconds * 1000, 2)
+                                if self.last_compact_seconds is not None else None),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark caller latency of the background log writer")
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--compact-every", type=int, default=500, help="Yêu cầu compact mỗi N event")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        journal = EventJournal(os.path.join(folder, "work_logs_BENCH.xlsx"),
+                               columns={"Mouse_Details": ["Timestamp", "Event_Type", "Session_ID", "Value"]})
+        writer = BackgroundWriter(journal, name="bench-writer")
+
+        worst = 0.0
+        start = time.perf_counter()
+        for i in range(args.events):
+            t0 = time.perf_counter()
+            writer.submit("Mouse_Details", {"Timestamp": f"2026-01-01 00:00:{i:06d}",
+                                            "Event_Type": "BENCH", "Session_ID": "S1", "Value": i})
+            if args.compact_every and i % args.compact_every == 0:
+                writer.request_compact()
+            worst = max(worst, time.perf_counter() - t0)
+        submit_seconds = time.perf_counter() - start
+
+        flush_start = time.perf_counter()
+        ok = writer.close(timeout=120)
+        flush_seconds = time.perf_counter() - flush_start
+        rows = len(journal.read_sheet("Mouse_Details"))
+
+        print("=" * 60)
+        print(f"📊 {args.events} events | caller total {submit_seconds * 1000:.1f} ms "
+              f"| per call {submit_seconds / args.events * 1e6:.1f} µs | worst {worst * 1000:.2f} ms")
+        print(f"💾 final flush {flush_seconds * 1000:.1f} ms | ok={ok} | rows in xlsx {rows}")
+        print("-" * 60)
+        for key, value in writer.stats().items():
+            print(f"   {key:<18} {value}")
+        print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Event Journal
+Journal append-only (JSONL) cho work log, thay cho việc đọc + ghi lại cả file xlsx mỗi lần lưu
+
+Layout (cạnh file xlsx của tháng):
+    Saved_file/<user>/<yyyy_mm>/work_logs_<user>_<yyyy_mm>.xlsx          # bản cho reader (dashboard, chatbot)
+    Saved_file/<user>/<yyyy_mm>/work_logs_<user>_<yyyy_mm>.journal.jsonl # event chưa compact
+
+- append(): 1 dòng JSON {"sheet": ..., "row": {...}} / event, O(1), mở - ghi - đóng mỗi lần
+  (không giữ handle tới file cũ sau khi compact os.replace journal); append_many() ghi cả batch 1 lần
+- compact(): xlsx cũ (giữ mọi sheet, kể cả sheet journal không quản lý) + event trong journal,
+  bỏ trùng theo DEDUP_KEYS, ghi xlsx tạm rồi os.replace, sau đó cắt phần journal đã compact
+- Index bỏ trùng tăng dần: lần compact đầu của process đọc xlsx 1 lần, giữ các sheet + set key trong RAM;
+  các lần sau (xlsx chưa bị ai khác ghi - so mtime_ns + size) chỉ kiểm tra event mới với set, O(số event mới),
+  không đọc lại xlsx và không drop_duplicates cả tháng. Phần đã ghi = phần journal đã cắt (high-water mark)
+- Dòng cuối bị cắt dở (crash giữa lúc ghi) bị bỏ qua, không làm hỏng các dòng khác
+- Crash giữa lúc ghi xlsx và cắt journal: lần compact sau gộp lại, bỏ trùng nên không nhân đôi
+
+Chạy:
+    python -m Storage.event_journal --xlsx Saved_file/EM001/2026_10/work_logs_EM001_2026_10.xlsx
+"""
+
+import os
+import json
+import time
+import argparse
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+JOURNAL_SUFFIX = ".journal.jsonl"
+DEDUP_KEYS = ["Timestamp", "Event_Type", "Session_ID"]
+
+
+def journal_path_for(xlsx_path: str) -> str:
+    return os.path.splitext(xlsx_path)[0] + JOURNAL_SUFFIX
+
+
+class EventJournal:
+    """Journal JSONL của 1 file xlsx, compact thành các sheet tương ứng"""
+
+    def __init__(self, xlsx_path: str, columns: Optional[Dict[str, Sequence[str]]] = None,
+                 dedup_keys: Sequence[str] = DEDUP_KEYS):
+        self.xlsx_path = xlsx_path
+        self.path = journal_path_for(xlsx_path)
+        self.columns = {sheet: list(cols) for sheet, cols in (columns or {}).items()}
+        self.dedup_keys = list(dedup_keys)
+        self._lock = threading.Lock()
+
+        # Index bỏ trùng: sheet đã compact + key đã có, hợp lệ khi xlsx còn đúng chữ ký lúc ta ghi
+        self._sheets: Optional[Dict[str, pd.DataFrame]] = None
+        self._keys: Dict[str, set] = {}
+        self._base_signature = None
+
+        # Thống kê
+        self.appended = 0
+        self.compactions = 0
+        self.last_compact_seconds = None
+        self.last_compact_rows = 0
+        self.duplicates_skipped = 0
+        self.index_rebuilds = 0
+
+    # Lock không pickle được (logger được truyền sang process chuột); index dựng lại ở process nhận
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_lock", None)
+        state.update(_sheets=None, _keys={}, _base_signature=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    # =========================
+    # APPEND
+    # =========================
+    def append(self, sheet: str, row: Dict):
+        """Ghi 1 event vào journal (1 lần write, không đọc lại file)"""
+        line = json.dumps({"sheet": sheet, "row": row}, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self.appended += 1
+
+    def append_many(self, records: Sequence[Tuple[str, Dict]]):
+        """Ghi 1 batch (sheet, row) trong 1 lần mở file - dùng cho writer nền"""
+        if not records:
+            return
+        data = "".join(json.dumps({"sheet": sheet, "row": row}, ensure_ascii=False, default=str) + "\n"
+                       for sheet, row in records)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(data)
+            self.appended += len(records)
+
+    # =========================
+    # READ
+    # =========================
+    def _read(self) -> Tuple[Dict[str, List[Dict]], int]:
+        """Event theo sheet + số byte đã đọc (chỉ tính các dòng hoàn chỉnh)"""
+        rows: Dict[str, List[Dict]] = {}
+        if not os.path.exists(self.path):
+            return rows, 0
+
+        with open(self.path, "rb") as f:
+            data = f.read()
+        consumed = data.rfind(b"\n") + 1  # Dòng cuối chưa có '\n' = đang ghi dở, để lần sau
+        for raw in data[:consumed].splitlines():
+            if not raw.strip():
+                continue
+            try:
+                record = json.loads(raw)
+                rows.setdefault(record["sheet"], []).append(record["row"])
+            except (ValueError, KeyError) as e:
+                print(f"⚠️ Skipping corrupt journal line: {e}")
+        return rows, consumed
+
+    def pending(self) -> Dict[str, int]:
+        """Số event chưa compact theo sheet"""
+        with self._lock:
+            rows, _ = self._read()
+        return {sheet: len(items) for sheet, items in rows.items()}
+
+    def read_sheet(self, sheet: str) -> pd.DataFrame:
+        """Sheet đầy đủ = xlsx đã compact + event trong journal (không ghi file)"""
+        with self._lock:
+            rows, _ = self._read()
+        existing = self._read_workbook().get(sheet)
+        return self._merge(sheet, existing, rows.get(sheet, []))
+
+    # =========================
+    # COMPACT
+    # =========================
+    def compact(self) -> bool:
+        """Dựng lại xlsx từ bản cũ + journal rồi cắt journal. Trả về False nếu lỗi."""
+        with self._lock:
+            start = time.perf_counter()
+            rows, consumed = self._read()
+            if consumed == 0 and os.path.exists(self.xlsx_path):
+                return True  # Không có gì mới
+
+            try:
+                sheets = self._load_base()
+                added = 0
+                for sheet in list(self.columns) + [s for s in rows if s not in self.columns]:
+                    fresh = self._new_rows(sheet, rows.get(sheet, []))
+                    sheets[sheet] = self._append(sheet, sheets.get(sheet), fresh)
+                    added += len(fresh)
+
+                self._write_workbook(sheets)
+                self._base_signature = self._signature()
+            except Exception:
+                self._sheets = None  # Index có thể đã nhận key chưa ghi được -> dựng lại lần sau
+                raise
+            self._truncate(consumed)
+
+            self.compactions += 1
+            self.last_compact_rows = added
+            self.last_compact_seconds = time.perf_counter() - start
+            return True
+
+    # =========================
+    # DEDUP INDEX
+    # =========================
+    def _signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.xlsx_path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def _load_base(self) -> Dict[str, pd.DataFrame]:
+        """Các sheet đã compact - chỉ đọc lại xlsx khi chưa có index hoặc file bị ghi từ nơi khác"""
+        signature = self._signature()
+        if self._sheets is None or signature != self._base_signature:
+            self._sheets = self._read_workbook()
+            self._keys = {sheet: self._key_set(df) for sheet, df in self._sheets.items()}
+            self._base_signature = signature
+            self.index_rebuilds += 1
+        return self._sheets
+
+    @staticmethod
+    def _normalize(value) -> str:
+        if value is None or (isinstance(value, float) and value != value):
+            return ""
+        return str(value)
+
+    def _row_key(self, row: Dict) -> Optional[Tuple[str, ...]]:
+        if not any(k in row for k in self.dedup_keys):
+            return None  # Sheet không có cột key: không bỏ trùng
+        return tuple(self._normalize(row.get(k)) for k in self.dedup_keys)
+
+    def _key_set(self, df: pd.DataFrame) -> set:
+        if df is None or df.empty or not any(k in df.columns for k in self.dedup_keys):
+            return set()
+        columns = [df[k].map(self._normalize) if k in df.columns else [""] * len(df)
+                   for k in self.dedup_keys]
+        return set(zip(*columns))
+
+    def _new_rows(self, sheet: str, new_rows: List[Dict]) -> List[Dict]:
+        """Lọc event đã có (trong xlsx hoặc trùng trong chính journal), cập nhật index - O(len(new_rows))"""
+        keys = self._keys.setdefault(sheet, set())
+        fresh = []
+        for row in new_rows:
+            key = self._row_key(row)
+            if key is not None:
+                if key in keys:
+                    self.duplicates_skipped += 1
+                    continue
+                keys.add(key)
+            fresh.append(row)
+        return fresh
+
+    def _append(self, sheet: str, existing: Optional[pd.DataFrame], fresh: List[Dict]) -> pd.DataFrame:
+        frames = [df for df in (existing, pd.DataFrame(fresh) if fresh else None)
+                  if df is not None and not df.empty]
+        if not frames:
+            return pd.DataFrame(columns=self.columns.get(sheet, []))
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        return self._ordered(sheet, df)
+
+    def _ordered(self, sheet: str, df: pd.DataFrame) -> pd.DataFrame:
+        # Giữ thứ tự cột chuẩn, cột lạ (nếu có) để cuối
+        ordered = [c for c in self.columns.get(sheet, []) if c in df.columns]
+        return df[ordered + [c for c in df.columns if c not in ordered]]
+
+    def _merge(self, sheet: str, existing: Optional[pd.DataFrame], new_rows: List[Dict]) -> pd.DataFrame:
+        frames = [df for df in (existing, pd.DataFrame(new_rows) if new_rows else None)
+                  if df is not None and not df.empty]
+        if not frames:
+            return pd.DataFrame(columns=self.columns.get(sheet, []))
+
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        keys = [k for k in self.dedup_keys if k in df.columns]
+        if new_rows and keys:
+            df = df.drop_duplicates(subset=keys)
+        return self._ordered(sheet, df)
+
+    def _read_workbook(self) -> Dict[str, pd.DataFrame]:
+        if not os.path.exists(self.xlsx_path):
+            return {}
+        try:
+            return pd.read_excel(self.xlsx_path, sheet_name=None)
+        except Exception as e:
+            print(f"⚠️ Error reading existing file: {e}")
+            return {}
+
+    def _write_workbook(self, sheets: Dict[str, pd.DataFrame]):
+        # Ghi file tạm cùng thư mục rồi replace: reader không bao giờ thấy xlsx ghi dở
+        tmp_path = os.path.splitext(self.xlsx_path)[0] + ".tmp.xlsx"
+        with pd.ExcelWriter(tmp_path, engine="openpyxl") as writer:
+            for sheet, df in sheets.items():
+                df.to_excel(writer, sheet_name=sheet, index=False)
+        os.replace(tmp_path, self.xlsx_path)
+
+    def _truncate(self, consumed: int):
+        """Bỏ phần đầu journal đã compact, giữ các dòng ghi thêm trong lúc compact"""
+        if consumed == 0:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(consumed)
+            rest = f.read()
+        if not rest:
+            os.remove(self.path)
+            return
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(rest)
+        os.replace(tmp_path, self.path)
+
+    def info(self) -> Dict:
+        return {
+            "journal": self.path,
+            "journal_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            "pending": self.pending(),
+            "appended": self.appended,
+            "compactions": self.compactions,
+            "last_compact_rows": self.last_compact_rows,
+            "duplicates_skipped": self.duplicates_skipped,
+            "index_rebuilds": self.index_rebuilds,
+            "indexed_keys": {sheet: len(keys) for sheet, keys in self._keys.items()},
+            "last_compact_seconds": (round(self.last_compact_seconds, 3)
+                                     if self.last_compact_seconds is not None else None),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact work log journal into xlsx")
+    parser.add_argument("--xlsx", required=True, help="work_logs_<user>_<yyyy_mm>.xlsx")
+    parser.add_argument("--dry-run", action="store_true", help="Chỉ hiển thị số event chưa compact")
+    args = parser.parse_args()
+
+    journal = EventJournal(args.xlsx)
+    print(f"📄 {journal.path}")
+    print(f"📊 Pending: {journal.pending() or 'none'}")
+    if not args.dry_run:
+        if journal.compact():
+            print(f"✅ Compacted {journal.last_compact_rows} events into {args.xlsx}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Log Channel
+Kênh log giữa process chuột và process chính: process con chỉ gửi event, process chính là writer duy nhất
+
+Trước đây process chuột nhận bản pickle của GlobalExcelLogger và tự append/compact cùng file
+journal/xlsx với process chính (chậm, 2 process cùng ghi 1 file). Giờ:
+
+    process chuột                                process chính
+    GlobalExcelLogger (bản cho process con)      GlobalExcelLogger
+      -> ChannelWriter(ChannelSink)                -> BackgroundWriter(EventJournal)  # writer duy nhất
+           gom batch -> multiprocessing.Queue  ──>  LogChannel (thread nhận) -> writer.submit_many()
+           compact() -> MSG_COMPACT + chờ ack  <──  writer.flush(compact=True) -> ack_queue
+
+- Batch: list (sheet, row) pickle 1 lần / batch (key của dict được memo trong pickle nên gọn)
+- Caller trong process con không bị chặn (BackgroundWriter), gửi batch không chặn (feeder thread của Queue)
+- compact() ở process con chỉ trả về khi process chính đã ghi + compact xong (hoặc hết ACK_TIMEOUT)
+- close(): gửi MSG_STOP sau mọi batch còn trong queue, thread nhận dừng khi gặp nó -> không mất event khi
+  process con thoát bình thường (thread nhận chặn trên queue.get(), không poll)
+- ChannelWriter đếm event process con đã submit vào bộ đếm chung: nếu phải terminate process con,
+  lost_rows() cho biết bao nhiêu event chưa tới được process chính
+
+Chạy (benchmark, process con thật):
+    python -m Storage.log_channel --events 20000
+"""
+
+import os
+import time
+import queue
+import argparse
+import tempfile
+import threading
+import itertools
+import multiprocessing
+from typing import Dict, List, Optional, Tuple
+
+from Storage.event_journal import EventJournal
+from Storage.background_writer import BackgroundWriter
+
+MSG_ROWS = "R"
+MSG_COMPACT = "C"
+MSG_STOP = "S"
+
+ACK_TIMEOUT_SECONDS = 30
+
+
+class ChannelSink:
+    """Thay EventJournal trong BackgroundWriter của process con: gửi batch về process chính"""
+
+    def __init__(self, channel_queue, ack_queue, ack_timeout: float = ACK_TIMEOUT_SECONDS, submitted=None):
+        self.queue = channel_queue
+        self.ack_queue = ack_queue
+        self.ack_timeout = ack_timeout
+        self.submitted = submitted  # multiprocessing.RawValue chung với LogChannel, chỉ process con ghi
+        self._tokens = itertools.count(1)
+        self.sent_batches = 0
+        self.sent_rows = 0
+        self.last_compact_rows = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_tokens", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._tokens = itertools.count(1)
+
+    def append_many(self, records: List[Tuple[str, Dict]]):
+        if not records:
+            return
+        self.queue.put((MSG_ROWS, records))
+        self.sent_batches += 1
+        self.sent_rows += len(records)
+
+    def compact(self) -> bool:
+        """Nhờ process chính compact, chờ ack (mọi batch gửi trước đó đã được ghi)"""
+        token = (os.getpid(), next(self._tokens))
+        self.queue.put((MSG_COMPACT, token))
+        deadline = time.monotonic() + self.ack_timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"No compaction ack from main process after {self.ack_timeout}s")
+            try:
+                acked, ok = self.ack_queue.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            if acked == token:
+                if not ok:
+                    raise RuntimeError("Main process failed to compact work log")
+                return True
+            # Ack cũ (lần chờ trước đã timeout) -> bỏ qua
+
+    def info(self) -> Dict:
+        return {"sent_batches": self.sent_batches, "sent_rows": self.sent_rows}
+
+
+class ChannelWriter(BackgroundWriter):
+    """BackgroundWriter của process con: đếm event đã submit vào bộ đếm chung của kênh
+
+    Bộ đếm là RawValue + lock thread trong process con: không có lock liên process, nên process con
+    bị terminate giữa chừng không làm process chính kẹt khi đọc bộ đếm.
+    """
+
+    def _init_runtime(self):
+        super()._init_runtime()
+        self._count_lock = threading.Lock()
+
+    def submit(self, sheet: str, row: Dict):
+        counter = self.journal.submitted
+        if counter is not None:
+            with self._count_lock:
+                counter.value += 1
+        super().submit(sheet, row)
+
+
+class LogChannel:
+    """Đầu nhận trong process chính: đẩy batch từ process con vào writer của process chính"""
+
+    def __init__(self, writer: BackgroundWriter, ack_timeout: float = ACK_TIMEOUT_SECONDS):
+        self.writer = writer
+        self.ack_timeout = ack_timeout
+        self.queue = multiprocessing.Queue()
+        self.ack_queue = multiprocessing.Queue()
+        self.child_submitted = multiprocessing.RawValue("q", 0)
+        self._thread = None
+
+        # Thống kê
+        self.received_batches = 0
+        self.received_rows = 0
+        self.max_batch = 0
+        self.compactions = 0
+        self.errors = 0
+
+    def sink(self) -> ChannelSink:
+        """Sink cho BackgroundWriter của process con (truyền qua args của Process)"""
+        return ChannelSink(self.queue, self.ack_queue, self.ack_timeout, self.child_submitted)
+
+    def child_writer(self, name: str = "log-channel") -> ChannelWriter:
+        """Writer cho logger của process con (gửi event qua kênh, có đếm)"""
+        return ChannelWriter(self.sink(), name=name)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="log-channel", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            try:
+                kind, payload = self.queue.get()
+            except Exception as e:
+                # Process con bị terminate giữa lúc ghi vào pipe (EOF / message bị cắt)
+                self.errors += 1
+                print(f"⚠️ Log channel closed unexpectedly: {e}")
+                break
+
+            if kind == MSG_STOP:
+                break
+            try:
+                if kind == MSG_ROWS:
+                    self.writer.submit_many(payload)
+                    self.received_batches += 1
+                    self.received_rows += len(payload)
+                    self.max_batch = max(self.max_batch, len(payload))
+                elif kind == MSG_COMPACT:
+                    ok = self.writer.flush(self.ack_timeout, compact=True)
+                    self.compactions += 1
+                    self.ack_queue.put((payload, ok))
+            except Exception as e:
+                self.errors += 1
+                print(f"❌ Log channel error: {e}")
+
+    def close(self, timeout: Optional[float] = 5.0) -> bool:
+        """Nhận nốt batch còn trong queue rồi dừng (gọi sau khi process con đã thoát)"""
+        if self._thread is None:
+            return True
+        self.queue.put((MSG_STOP, None))  # Đứng sau mọi batch process con đã gửi
+        self._thread.join(timeout)
+        stopped = not self._thread.is_alive()
+        if stopped:
+            self._thread = None
+        else:
+            self.queue.cancel_join_thread()  # Pipe hỏng, MSG_STOP không tới: đừng để process chính kẹt lúc thoát
+        self.ack_queue.cancel_join_thread()  # Process con đã thoát, không ai đọc ack nữa
+        return stopped
+
+    def lost_rows(self) -> int:
+        """Event process con đã submit nhưng process chính chưa nhận (sau close())"""
+        return max(0, self.child_submitted.value - self.received_rows)
+
+    def stats(self) -> Dict:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "received_batches": self.received_batches,
+            "received_rows": self.received_rows,
+            "avg_batch": round(self.received_rows / self.received_batches, 1) if self.received_batches else None,
+            "max_batch": self.max_batch,
+            "compactions": self.compactions,
+            "child_submitted": self.child_submitted.value,
+            "errors": self.errors,
+        }
+
+
+# =========================
+# BENCHMARK
+# =========================
+def _bench_producer(sink: ChannelSink, events: int, rate: int, producer_id: int, compact: bool):
+    """Process con: log qua BackgroundWriter(ChannelSink) giống process chuột"""
+    writer = ChannelWriter(sink, name=f"bench-producer-{producer_id}")
+    interval = 1.0 / rate if rate else 0.0
+    start = time.perf_counter()
+    for i in range(events):
+        writer.submit("Mouse_Details", {
+            "Timestamp": f"{producer_id}-{i:08d}", "Event_Type": "BENCH", "Session_ID": f"P{producer_id}",
+            "Details": "", "TotalEvents": i, "Velocity": i * 0.5, "AnomalyScore": 0.1,
+        })
+        if interval:
+            sleep_for = start + (i + 1) * interval - time.perf_counter()
+            if sleep_for > 0:
+                time.sleep(sleep_for)
+    writer.close(timeout=ACK_TIMEOUT_SECONDS, compact=compact)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the mouse-process -> main-process log channel")
+    parser.add_argument("--events", type=int, default=20000, help="Số event mỗi process con")
+    parser.add_argument("--producers", type=int, default=1)
+    parser.add_argument("--rate", type=int, default=0, help="Event/giây mỗi process con (0 = nhanh nhất)")
+    parser.add_argument("--compact", action="store_true", help="Process con yêu cầu compact khi thoát (chờ ack)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        journal = EventJournal(os.path.join(folder, "work_logs_BENCH.xlsx"),
+                               columns={"Mouse_Details": ["Timestamp", "Event_Type", "Session_ID"]})
+        writer = BackgroundWriter(journal, name="bench-main-writer")
+        channel = LogChannel(writer).start()
+
+        start = time.perf_counter()
+        producers = [multiprocessing.Process(target=_bench_producer,
+                                             args=(channel.sink(), args.events, args.rate, i, args.compact))
+                     for i in range(args.producers)]
+        for p in producers:
+            p.start()
+        for p in producers:
+            p.join()
+        channel.close()
+        writer.flush(timeout=120)
+        elapsed = time.perf_counter() - start  # Tới lúc mọi event đã nằm trong journal
+
+        compact_start = time.perf_counter()
+        writer.flush(timeout=120, compact=True)
+        compact_seconds = time.perf_counter() - compact_start
+
+        total = args.events * args.producers
+        xlsx_rows = len(journal.read_sheet("Mouse_Details"))
+        persisted = writer.stats()["written"]
+
+        print("=" * 60)
+        print(f"📊 {args.producers} producer(s) x {args.events} events journaled in {elapsed:.2f}s "
+              f"-> {total / elapsed:,.0f} events/s end-to-end")
+        print(f"💾 sent {total} | persisted {persisted} | rows after compaction {xlsx_rows} "
+              f"| lost {total - xlsx_rows} (channel: {channel.lost_rows()}) | final compaction {compact_seconds:.2f}s")
+        print("-" * 60)
+        for key, value in channel.stats().items():
+            print(f"   channel.{key:<18} {value}")
+        for key in ("batches", "compactions", "max_flush_ms", "avg_flush_ms"):
+            print(f"   writer.{key:<19} {writer.stats()[key]}")
+        print("=" * 60)
+        writer.close(timeout=60, compact=False)
+
+
+if __name__ == "__main__":
+    main()
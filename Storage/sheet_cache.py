@@ -0,0 +1,215 @@
+"""
+Sheet Cache
+Parquet sidecar cho mọi lần đọc xlsx: parse bằng openpyxl 1 lần, các lần sau đọc Parquet
+
+Layout (cạnh file xlsx):
+    <dir>/work_logs_EM001_2026_10.xlsx
+    <dir>/.sheet_cache/work_logs_EM001_2026_10.xlsx.json       # index: mtime_ns, size, sheets, cached
+    <dir>/.sheet_cache/work_logs_EM001_2026_10.xlsx.0.parquet  # sheet thứ 0
+    <dir>/.sheet_cache/work_logs_EM001_2026_10.xlsx.1.parquet  # sheet thứ 1 ...
+
+- Hit: mtime_ns + size của xlsx khớp index -> đọc Parquet (pyarrow), không mở xlsx
+- Miss: parse cả workbook 1 lần (openpyxl đọc cả file dù chỉ cần 1 sheet), ghi Parquet cho mọi sheet
+  (file tạm + os.replace, index ghi sau cùng) rồi trả về sheet cần đọc
+- Sheet không ghi được Parquet (cột kiểu trộn, tên cột không phải str) vẫn đọc xlsx như cũ
+- Không có pyarrow / thư mục chỉ đọc / tham số đọc đặc biệt (header, usecols...) -> pd.read_excel trực tiếp
+
+Chạy:
+    python -m Storage.sheet_cache Saved_file/EM001/2026_10/sap_data.xlsx
+"""
+
+import os
+import json
+import time
+import argparse
+import threading
+from typing import Dict, List, Optional, Union
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401 - engine Parquet của pandas
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+CACHE_DIR_NAME = ".sheet_cache"
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "bypass": 0, "parse_seconds": 0.0, "parquet_seconds": 0.0}
+
+
+def _sidecar(path: str) -> str:
+    """Đường dẫn gốc của sidecar (chưa có đuôi .json / .<i>.parquet)"""
+    folder, name = os.path.split(os.path.abspath(path))
+    return os.path.join(folder, CACHE_DIR_NAME, name)
+
+
+def _source_key(path: str) -> Dict:
+    stat = os.stat(path)
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def _load_index(path: str) -> Optional[Dict]:
+    """Index còn hợp lệ (xlsx chưa đổi) hoặc None"""
+    try:
+        with open(_sidecar(path) + ".json", "r", encoding="utf-8") as f:
+            index = json.load(f)
+        key = _source_key(path)
+        if index.get("mtime_ns") == key["mtime_ns"] and index.get("size") == key["size"]:
+            return index
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _write_cache(path: str, key: Dict, sheets: Dict[str, pd.DataFrame]):
+    base = _sidecar(path)
+    os.makedirs(os.path.dirname(base), exist_ok=True)
+    cached = {}
+    for i, (sheet, df) in enumerate(sheets.items()):
+        target = f"{base}.{i}.parquet"
+        tmp = target + ".tmp"
+        try:
+            df.to_parquet(tmp, index=False)
+            os.replace(tmp, target)
+            cached[sheet] = os.path.basename(target)
+        except Exception:
+            # Cột kiểu trộn (int + str...) không ghi được Parquet: sheet này luôn đọc xlsx
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    index = dict(key, sheets=list(sheets), cached=cached, created_at=time.strftime("%Y-%m-%d %H:%M:%S"))
+    tmp = base + ".json.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp, base + ".json")
+
+
+def _parse_workbook(path: str) -> Dict[str, pd.DataFrame]:
+    """Miss: parse cả workbook, ghi sidecar (lỗi ghi không ảnh hưởng kết quả đọc)"""
+    key = _source_key(path)
+    start = time.perf_counter()
+    sheets = pd.read_excel(path, sheet_name=None)
+    with _lock:
+        _stats["misses"] += 1
+        _stats["parse_seconds"] += time.perf_counter() - start
+    try:
+        _write_cache(path, key, sheets)
+    except OSError as e:
+        print(f"⚠️ Cannot write sheet cache for {path}: {e}")
+    return sheets
+
+
+def _read_cached(path: str, index: Dict, sheet: str) -> pd.DataFrame:
+    start = time.perf_counter()
+    df = pd.read_parquet(os.path.join(os.path.dirname(_sidecar(path)), index["cached"][sheet]))
+    with _lock:
+        _stats["hits"] += 1
+        _stats["parquet_seconds"] += time.perf_counter() - start
+    return df
+
+
+def _resolve(names: List[str], sheet_name: Union[str, int]) -> str:
+    if isinstance(sheet_name, int):
+        return names[sheet_name]
+    if sheet_name not in names:
+        raise ValueError(f"Worksheet named '{sheet_name}' not found")
+    return sheet_name
+
+
+# =========================
+# PUBLIC API
+# =========================
+def read_sheet(path, sheet_name: Union[str, int] = 0, **kwargs) -> pd.DataFrame:
+    """Thay cho pd.read_excel(path, sheet_name=...) - cùng kết quả, đọc Parquet khi xlsx chưa đổi"""
+    path = str(path)
+    if kwargs or not PARQUET_AVAILABLE:
+        with _lock:
+            _stats["bypass"] += 1
+        return pd.read_excel(path, sheet_name=sheet_name, **kwargs)
+
+    index = _load_index(path)
+    if index is not None:
+        sheet = _resolve(index["sheets"], sheet_name)
+        if sheet in index["cached"]:
+            try:
+                return _read_cached(path, index, sheet)
+            except Exception as e:
+                print(f"⚠️ Sheet cache unreadable for {path} [{sheet}], re-parsing: {e}")
+        else:
+            return pd.read_excel(path, sheet_name=sheet)
+
+    sheets = _parse_workbook(path)
+    return sheets[_resolve(list(sheets), sheet_name)]
+
+
+def read_sheets(path) -> Dict[str, pd.DataFrame]:
+    """Thay cho pd.read_excel(path, sheet_name=None) - mọi sheet theo thứ tự trong file"""
+    path = str(path)
+    if not PARQUET_AVAILABLE:
+        return pd.read_excel(path, sheet_name=None)
+    index = _load_index(path)
+    if index is None:
+        return _parse_workbook(path)
+    return {sheet: read_sheet(path, sheet) for sheet in index["sheets"]}
+
+
+def sheet_names(path) -> List[str]:
+    """Thay cho pd.ExcelFile(path).sheet_names"""
+    path = str(path)
+    if PARQUET_AVAILABLE:
+        index = _load_index(path)
+        if index is not None:
+            return list(index["sheets"])
+        return list(_parse_workbook(path))
+    with pd.ExcelFile(path) as excel:
+        return list(excel.sheet_names)
+
+
+def invalidate(path):
+    """Xoá sidecar của 1 file (lần đọc sau parse lại xlsx)"""
+    base = _sidecar(str(path))
+    folder = os.path.dirname(base)
+    if not os.path.isdir(folder):
+        return
+    prefix = os.path.basename(base) + "."
+    for name in os.listdir(folder):
+        if name.startswith(prefix):
+            os.remove(os.path.join(folder, name))
+
+
+def cache_info() -> Dict:
+    with _lock:
+        info = dict(_stats)
+    info["parquet_available"] = PARQUET_AVAILABLE
+    info["parse_seconds"] = round(info["parse_seconds"], 3)
+    info["parquet_seconds"] = round(info["parquet_seconds"], 3)
+    return info
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm / inspect Parquet sidecars for xlsx files")
+    parser.add_argument("paths", nargs="+", help="File xlsx")
+    parser.add_argument("--invalidate", action="store_true", help="Xoá sidecar trước khi đọc")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    for path in args.paths:
+        if args.invalidate:
+            invalidate(path)
+        start = time.perf_counter()
+        sheets = read_sheets(path)
+        first = time.perf_counter() - start
+        start = time.perf_counter()
+        read_sheets(path)
+        second = time.perf_counter() - start
+        print(f"📄 {path}")
+        print(f"   {len(sheets)} sheets | first read {first * 1000:.1f} ms | cached read {second * 1000:.1f} ms")
+    print("-" * 60)
+    print(f"📊 {cache_info()}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
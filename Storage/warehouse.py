@@ -0,0 +1,696 @@
+"""
+Work Log Warehouse
+SQLite cục bộ chứa toàn bộ sheet của work_logs_*.xlsx và sap_data.xlsx, thay cho việc parse lại xlsx mỗi lần đọc
+
+Layout:
+    Saved_file/warehouse.sqlite3
+        source_files   file nguồn đã ingest (path, employee, year, month, kind, mtime, size)
+        sheet_tables   (kind, sheet) -> bảng dữ liệu
+        sheet_columns  cột của từng bảng + kiểu gốc (int / float / bool / datetime / time / text)
+        file_sheets    sheet + danh sách cột của từng file (đọc lại đúng cột như xlsx, kể cả sheet rỗng)
+        wl__<sheet>    dữ liệu work log (vd. wl__fraud_events, wl__browser_sessions), phân vùng theo ngày (_day)
+        sap__<sheet>   dữ liệu SAP (vd. sap__orders, sap__reality)
+        daily_rollup   1 dòng / (file, ngày): số fraud event, số phiên chuột, tổng + số AnomalyScore,
+                       giây làm việc + số phiên browser, Session_Start đầu / cuối
+        daily_fraud    1 dòng / (file, ngày, Module, Severity): số fraud event (+ số IsFraud = 1)
+
+- Mỗi bảng dữ liệu = cột meta (_file_id, _row, _employee, _year, _month, _day) + cột gốc của sheet
+  (giữ nguyên tên, kiểu SQLite theo dtype), cột mới xuất hiện thì ALTER TABLE ADD COLUMN
+- _day (YYYY-MM-DD) lấy từ cột Date / Timestamp / Session_Start của work log, NULL nếu không có ngày
+- Index: (_employee, _year, _month), (_employee, _day) cho work log, _file_id,
+  và "Sales Doc." / "Timestamp" khi sheet có cột đó
+- Rollup tính lúc ingest, cùng transaction với dữ liệu: view tháng / năm (dashboard, chatbot) chỉ đọc
+  vài chục dòng rollup, chỉ drill-down (read(day=...)) mới đụng dữ liệu gốc
+- Sheet work log được nhận theo tên chuẩn hoá như data processor (vd. "fraud events" -> Fraud_Events);
+  file work log có dữ liệu nhưng không góp dòng rollup nào thì sync() in cảnh báo
+- SCHEMA_VERSION đổi -> dựng lại toàn bộ warehouse từ xlsx (warehouse chỉ là dữ liệu dẫn xuất)
+- sync(): so mtime + size với source_files, chỉ ingest lại file đã đổi (xoá row cũ theo _file_id
+  rồi insert trong 1 transaction), file đã bị xoá trên disk thì xoá khỏi warehouse
+- read(): 1 query có index cho (employee, kind, sheet, year[, month]), trả DataFrame kèm Month / Year
+
+Chạy:
+    python -m Storage.warehouse --sync
+    python -m Storage.warehouse --sync --employees EM001 EM002 --base-dir Saved_file
+    python -m Storage.warehouse --rollup EM001 --year 2026
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import argparse
+import datetime as dt
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAVED_FILE_DIR = os.path.join(PROJECT_ROOT, "Saved_file")
+DB_FILE_NAME = "warehouse.sqlite3"
+
+SCHEMA_VERSION = 3  # 3: rollup nhận sheet theo tên chuẩn hoá
+
+KINDS = {"work_log": "wl", "sap_data": "sap"}
+META_COLUMNS = ["_file_id", "_row", "_employee", "_year", "_month", "_day"]
+DAY_COLUMNS = ["Date", "Timestamp", "Session_Start"]  # Cột đầu tiên có trong sheet quyết định _day
+INDEXED_COLUMNS = ["Sales Doc.", "Timestamp"]
+MONTH_DIR_RE = re.compile(r"^(\d{4})_(\d{2})$")
+
+SQL_TYPES = {"int": "INTEGER", "bool": "INTEGER", "float": "REAL",
+             "datetime": "TEXT", "time": "TEXT", "text": "TEXT"}
+
+
+def _quote(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _column_kind(series: pd.Series) -> str:
+    if pd.api.types.is_bool_dtype(series):
+        return "bool"
+    if pd.api.types.is_integer_dtype(series):
+        return "int"
+    if pd.api.types.is_float_dtype(series):
+        return "float"
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "datetime"
+    values = series.dropna()
+    if len(values) and all(isinstance(v, dt.time) for v in values):
+        return "time"
+    if len(values) and all(isinstance(v, (dt.datetime, pd.Timestamp)) for v in values):
+        return "datetime"
+    return "text"
+
+
+def _row_days(df: pd.DataFrame) -> List[Optional[str]]:
+    """Ngày (YYYY-MM-DD) của từng dòng work log, None nếu không xác định được"""
+    for col in DAY_COLUMNS:
+        if col in df.columns:
+            days = pd.to_datetime(df[col].astype(str).str.strip().str[:10], format="%Y-%m-%d", errors="coerce")
+            return [None if pd.isna(d) else d.strftime("%Y-%m-%d") for d in days]
+    return [None] * len(df)
+
+
+def _rollup_sheet(sheet: str) -> Optional[str]:
+    """Tên sheet work log -> tên chuẩn (chuẩn hoá như MG DataProcessor._work_log_key, thêm Mouse_Details)"""
+    normalized = sheet.lower().replace(' ', '_')
+    if 'mouse' in normalized:
+        return "Mouse_Details"
+    if not any(target in normalized for target in ('fraud_events', 'browser_sessions', 'browser_time', 'session')):
+        return None
+    return ("Fraud_Events" if 'fraud' in normalized else
+            "Browser_Sessions" if 'session' in normalized else
+            "Browser_Time")
+
+
+def _session_seconds(df: pd.DataFrame) -> Optional[pd.Series]:
+    """Giây làm việc của từng phiên browser (Total_Seconds, Duration_Seconds hoặc Hours như dashboard)"""
+    if "Total_Seconds" in df.columns:
+        return pd.to_numeric(df["Total_Seconds"], errors="coerce")
+    if "Duration_Seconds" in df.columns:
+        return pd.to_numeric(df["Duration_Seconds"], errors="coerce")
+    if "Hours" in df.columns:
+        return pd.to_numeric(df["Hours"], errors="coerce") * 3600
+    return None
+
+
+def _to_sql_value(value):
+    if value is None or (isinstance(value, float) and value != value) or value is pd.NaT:
+        return None
+    if isinstance(value, (pd.Timestamp, dt.datetime)):
+        return value.isoformat(sep=" ")
+    if isinstance(value, (dt.date, dt.time)):
+        return value.isoformat()
+    if hasattr(value, "item"):  # numpy scalar
+        return value.item()
+    return value
+
+
+class WorkLogWarehouse:
+    """Ingest xlsx theo mtime + query theo employee / năm / tháng"""
+
+    def __init__(self, base_dir: str = SAVED_FILE_DIR, db_path: Optional[str] = None):
+        self.base_dir = str(base_dir)
+        self.db_path = db_path or os.path.join(self.base_dir, DB_FILE_NAME)
+        self._lock = threading.RLock()
+        self._conn = None
+        self._columns: Dict[str, Dict[str, str]] = {}  # table -> {column: kind}
+
+    # =========================
+    # CONNECTION / SCHEMA
+    # =========================
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._migrate(conn)
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS source_files (
+                    file_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    path TEXT UNIQUE NOT NULL,
+                    employee TEXT NOT NULL,
+                    year INTEGER NOT NULL,
+                    month INTEGER NOT NULL,
+                    kind TEXT NOT NULL,
+                    mtime REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    ingested_at TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS ix_source_files_period ON source_files (employee, year, month);
+                CREATE TABLE IF NOT EXISTS sheet_tables (
+                    kind TEXT NOT NULL,
+                    sheet TEXT NOT NULL,
+                    table_name TEXT UNIQUE NOT NULL,
+                    PRIMARY KEY (kind, sheet)
+                );
+                CREATE TABLE IF NOT EXISTS sheet_columns (
+                    table_name TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    name TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    PRIMARY KEY (table_name, name)
+                );
+                CREATE TABLE IF NOT EXISTS file_sheets (
+                    file_id INTEGER NOT NULL,
+                    table_name TEXT NOT NULL,
+                    columns TEXT NOT NULL,
+                    PRIMARY KEY (file_id, table_name)
+                );
+                CREATE TABLE IF NOT EXISTS daily_rollup (
+                    file_id INTEGER NOT NULL,
+                    employee TEXT NOT NULL,
+                    year INTEGER NOT NULL,
+                    month INTEGER NOT NULL,
+                    day TEXT,
+                    fraud_events INTEGER NOT NULL DEFAULT 0,
+                    fraud_flagged INTEGER NOT NULL DEFAULT 0,
+                    mouse_sessions INTEGER NOT NULL DEFAULT 0,
+                    anomaly_sum REAL NOT NULL DEFAULT 0,
+                    anomaly_count INTEGER NOT NULL DEFAULT 0,
+                    browser_sessions INTEGER NOT NULL DEFAULT 0,
+                    session_seconds REAL NOT NULL DEFAULT 0,
+                    first_session_start TEXT,
+                    last_session_start TEXT
+                );
+                CREATE INDEX IF NOT EXISTS ix_daily_rollup_period ON daily_rollup (employee, year, month, day);
+                CREATE INDEX IF NOT EXISTS ix_daily_rollup_file ON daily_rollup (file_id);
+                CREATE TABLE IF NOT EXISTS daily_fraud (
+                    file_id INTEGER NOT NULL,
+                    employee TEXT NOT NULL,
+                    year INTEGER NOT NULL,
+                    month INTEGER NOT NULL,
+                    day TEXT,
+                    module TEXT NOT NULL,
+                    severity TEXT NOT NULL,
+                    events INTEGER NOT NULL,
+                    flagged INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS ix_daily_fraud_period ON daily_fraud (employee, year, month, day);
+                CREATE INDEX IF NOT EXISTS ix_daily_fraud_file ON daily_fraud (file_id);
+            """)
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection):
+        """Schema cũ -> xoá hết, sync sau sẽ ingest lại từ xlsx"""
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        row = conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        if row and int(row[0]) == SCHEMA_VERSION:
+            return
+        tables = [name for (name,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT IN ('meta', 'sqlite_sequence')")]
+        if tables:
+            print(f"🔁 Warehouse schema v{row[0] if row else 1} -> v{SCHEMA_VERSION}, rebuilding from xlsx")
+        with conn:
+            for name in tables:
+                conn.execute(f"DROP TABLE {_quote(name)}")
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)",
+                         (str(SCHEMA_VERSION),))
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._columns.clear()
+
+    def _table_for(self, kind: str, sheet: str, create: bool = False) -> Optional[str]:
+        row = self.conn.execute("SELECT table_name FROM sheet_tables WHERE kind = ? AND sheet = ?",
+                                (kind, sheet)).fetchone()
+        if row or not create:
+            return row[0] if row else None
+
+        base = f"{KINDS[kind]}__" + (re.sub(r"\W+", "_", sheet.strip().lower()).strip("_") or "sheet")
+        table, n = base, 1
+        while self.conn.execute("SELECT 1 FROM sheet_tables WHERE table_name = ?", (table,)).fetchone():
+            n += 1
+            table = f"{base}_{n}"
+
+        self.conn.execute(f"""
+            CREATE TABLE {_quote(table)} (
+                _file_id INTEGER NOT NULL, _row INTEGER NOT NULL,
+                _employee TEXT NOT NULL, _year INTEGER NOT NULL, _month INTEGER NOT NULL, _day TEXT
+            )""")
+        self.conn.execute(f"CREATE INDEX {_quote('ix_' + table + '_period')} "
+                          f"ON {_quote(table)} (_employee, _year, _month)")
+        if kind == "work_log":
+            self.conn.execute(f"CREATE INDEX {_quote('ix_' + table + '_day')} "
+                              f"ON {_quote(table)} (_employee, _day)")
+        self.conn.execute(f"CREATE INDEX {_quote('ix_' + table + '_file')} ON {_quote(table)} (_file_id)")
+        self.conn.execute("INSERT INTO sheet_tables (kind, sheet, table_name) VALUES (?, ?, ?)",
+                          (kind, sheet, table))
+        return table
+
+    def _table_columns(self, table: str) -> Dict[str, str]:
+        if table not in self._columns:
+            rows = self.conn.execute("SELECT name, kind FROM sheet_columns WHERE table_name = ? ORDER BY position",
+                                     (table,)).fetchall()
+            self._columns[table] = dict(rows)
+        return self._columns[table]
+
+    def _ensure_columns(self, table: str, df: pd.DataFrame) -> List[str]:
+        """Thêm cột mới (ALTER TABLE), trả về các cột của df sẽ được insert"""
+        columns = self._table_columns(table)
+        lowered = {name.lower() for name in list(columns) + META_COLUMNS}
+        usable = []
+        for col in df.columns:
+            name = str(col)
+            kind = _column_kind(df[col])
+            if name in columns:
+                if columns[name] != kind and columns[name] != "text":
+                    # Kiểu khác giữa các file: không ép kiểu lúc đọc
+                    columns[name] = "text"
+                    self.conn.execute("UPDATE sheet_columns SET kind = 'text' WHERE table_name = ? AND name = ?",
+                                      (table, name))
+                usable.append(name)
+                continue
+            if name.lower() in lowered:
+                print(f"⚠️ Column '{name}' clashes with an existing column in {table}, skipped")
+                continue
+
+            self.conn.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(name)} {SQL_TYPES[kind]}")
+            self.conn.execute("INSERT INTO sheet_columns (table_name, position, name, kind) VALUES (?, ?, ?, ?)",
+                              (table, len(columns), name, kind))
+            if name in INDEXED_COLUMNS:
+                index = "ix_" + table + "_" + re.sub(r"\W+", "_", name.lower()).strip("_")
+                self.conn.execute(f"CREATE INDEX {_quote(index)} ON {_quote(table)} ({_quote(name)})")
+            columns[name] = kind
+            lowered.add(name.lower())
+            usable.append(name)
+        return usable
+
+    # =========================
+    # DISCOVERY / SYNC
+    # =========================
+    def discover(self, employees: Optional[Sequence[str]] = None) -> List[Tuple[str, str, int, int, str]]:
+        """(path, employee, year, month, kind) của mọi file nguồn dưới base_dir"""
+        if not os.path.isdir(self.base_dir):
+            return []
+        found = []
+        for employee in employees or sorted(os.listdir(self.base_dir)):
+            emp_dir = os.path.join(self.base_dir, employee)
+            if not os.path.isdir(emp_dir):
+                continue
+            for month_dir in sorted(os.listdir(emp_dir)):
+                match = MONTH_DIR_RE.match(month_dir)
+                if not match:
+                    continue
+                year, month = int(match.group(1)), int(match.group(2))
+                candidates = {
+                    "work_log": os.path.join(emp_dir, month_dir, f"work_logs_{employee}_{month_dir}.xlsx"),
+                    "sap_data": os.path.join(emp_dir, month_dir, "sap_data.xlsx"),
+                }
+                for kind, path in candidates.items():
+                    if os.path.isfile(path):
+                        found.append((os.path.abspath(path), employee, year, month, kind))
+        return found
+
+    def sync(self, employees: Optional[Sequence[str]] = None) -> Dict:
+        """Ingest file mới / đã đổi (mtime, size), xoá file không còn trên disk"""
+        start = time.perf_counter()
+        stats = {"scanned": 0, "ingested": 0, "unchanged": 0, "removed": 0, "failed": 0, "rows": 0}
+        with self._lock:
+            known = {
+                path: (file_id, mtime, size)
+                for file_id, path, mtime, size, employee in self.conn.execute(
+                    "SELECT file_id, path, mtime, size, employee FROM source_files")
+                if not employees or employee in employees
+            }
+            for path, employee, year, month, kind in self.discover(employees):
+                stats["scanned"] += 1
+                stat = os.stat(path)
+                previous = known.pop(path, None)
+                if previous and previous[1] == stat.st_mtime and previous[2] == stat.st_size:
+                    stats["unchanged"] += 1
+                    continue
+                try:
+                    stats["rows"] += self._ingest(path, employee, year, month, kind, stat)
+                    stats["ingested"] += 1
+                except Exception as e:
+                    self._columns.clear()  # ALTER TABLE trong transaction lỗi đã bị rollback
+                    stats["failed"] += 1
+                    print(f"⚠️ Warehouse ingest failed for {path}: {e}")
+
+            for path, (file_id, _, _) in known.items():
+                with self.conn:
+                    self._delete_file_rows(file_id)
+                    self.conn.execute("DELETE FROM source_files WHERE file_id = ?", (file_id,))
+                stats["removed"] += 1
+
+        stats["seconds"] = round(time.perf_counter() - start, 3)
+        return stats
+
+    def _ingest(self, path: str, employee: str, year: int, month: int, kind: str, stat) -> int:
+        sheets = pd.read_excel(path, sheet_name=None)  # Parse trước, ngoài transaction
+        rows = 0
+        with self.conn:
+            self.conn.execute("""
+                INSERT INTO source_files (path, employee, year, month, kind, mtime, size, ingested_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET mtime = excluded.mtime, size = excluded.size,
+                                                ingested_at = excluded.ingested_at
+            """, (path, employee, year, month, kind, stat.st_mtime, stat.st_size,
+                  time.strftime("%Y-%m-%d %H:%M:%S")))
+            file_id = self.conn.execute("SELECT file_id FROM source_files WHERE path = ?", (path,)).fetchone()[0]
+            self._delete_file_rows(file_id)
+
+            for sheet, df in sheets.items():
+                table = self._table_for(kind, sheet, create=True)
+                columns = self._ensure_columns(table, df)
+                names = META_COLUMNS + columns
+                sql = (f"INSERT INTO {_quote(table)} ({', '.join(_quote(c) for c in names)}) "
+                       f"VALUES ({', '.join('?' * len(names))})")
+                self.conn.execute("INSERT INTO file_sheets (file_id, table_name, columns) VALUES (?, ?, ?)",
+                                  (file_id, table, json.dumps(columns)))
+                values = df[columns].astype(object).to_numpy() if columns else [[] for _ in range(len(df))]
+                days = _row_days(df) if kind == "work_log" else [None] * len(df)
+                self.conn.executemany(sql, (
+                    [file_id, i, employee, year, month, day] + [_to_sql_value(v) for v in row]
+                    for i, (day, row) in enumerate(zip(days, values))
+                ))
+                rows += len(df)
+
+            if kind == "work_log" and rows and not self._write_rollup(file_id, employee, year, month, sheets):
+                print(f"⚠️ Work log {path} has no Fraud_Events / Mouse_Details / Browser_Sessions rows "
+                      f"for the rollup (sheets: {list(sheets)})")
+        return rows
+
+    def _write_rollup(self, file_id: int, employee: str, year: int, month: int,
+                      sheets: Dict[str, pd.DataFrame]) -> int:
+        """daily_rollup + daily_fraud của 1 file work log (trong transaction của _ingest), trả về số ngày"""
+        daily: Dict[Optional[str], Dict] = {}
+
+        # Tên sheet thực tế khác nhau giữa các phiên bản app -> gom theo tên chuẩn
+        by_name: Dict[str, List[pd.DataFrame]] = {}
+        for sheet, df in sheets.items():
+            name = _rollup_sheet(sheet)
+            if name is not None and not df.empty:
+                by_name.setdefault(name, []).append(df)
+        frames = {name: dfs[0] if len(dfs) == 1 else pd.concat(dfs, ignore_index=True)
+                  for name, dfs in by_name.items()}
+
+        def bucket(day):
+            return daily.setdefault(day, {
+                "fraud_events": 0, "fraud_flagged": 0, "mouse_sessions": 0, "anomaly_sum": 0.0,
+                "anomaly_count": 0, "browser_sessions": 0, "session_seconds": 0.0,
+                "first_session_start": None, "last_session_start": None,
+            })
+
+        fraud = frames.get("Fraud_Events")
+        if fraud is not None and not fraud.empty:
+            frame = pd.DataFrame({
+                "day": _row_days(fraud),
+                "module": fraud["Module"].fillna("").astype(str) if "Module" in fraud.columns else "",
+                "severity": fraud["Severity"].fillna("").astype(str) if "Severity" in fraud.columns else "",
+                "flagged": (pd.to_numeric(fraud["IsFraud"], errors="coerce") == 1).astype(int)
+                if "IsFraud" in fraud.columns else 0,
+            })
+            grouped = frame.groupby(["day", "module", "severity"], dropna=False)["flagged"].agg(["size", "sum"])
+            for (day, module, severity), (events, flagged) in grouped.iterrows():
+                day = None if pd.isna(day) else day
+                self.conn.execute("""
+                    INSERT INTO daily_fraud (file_id, employee, year, month, day, module, severity, events, flagged)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                                  (file_id, employee, year, month, day, module, severity, int(events), int(flagged)))
+                b = bucket(day)
+                b["fraud_events"] += int(events)
+                b["fraud_flagged"] += int(flagged)
+
+        mouse = frames.get("Mouse_Details")
+        if mouse is not None and not mouse.empty:
+            scores = (pd.to_numeric(mouse["AnomalyScore"], errors="coerce") if "AnomalyScore" in mouse.columns
+                      else pd.Series(float("nan"), index=mouse.index))
+            for day, score in zip(_row_days(mouse), scores):
+                b = bucket(day)
+                b["mouse_sessions"] += 1
+                if not pd.isna(score):
+                    b["anomaly_sum"] += float(score)
+                    b["anomaly_count"] += 1
+
+        browser = frames.get("Browser_Sessions")
+        if browser is not None and not browser.empty:
+            seconds = _session_seconds(browser)
+            starts = (pd.to_datetime(browser["Session_Start"], errors="coerce") if "Session_Start" in browser.columns
+                      else pd.Series(pd.NaT, index=browser.index))
+            for i, day in enumerate(_row_days(browser)):
+                b = bucket(day)
+                b["browser_sessions"] += 1
+                if seconds is not None and not pd.isna(seconds.iloc[i]):
+                    b["session_seconds"] += float(seconds.iloc[i])
+                start = starts.iloc[i]
+                if not pd.isna(start):
+                    start = start.isoformat(sep=" ")
+                    if b["first_session_start"] is None or start < b["first_session_start"]:
+                        b["first_session_start"] = start
+                    if b["last_session_start"] is None or start > b["last_session_start"]:
+                        b["last_session_start"] = start
+
+        columns = ["fraud_events", "fraud_flagged", "mouse_sessions", "anomaly_sum", "anomaly_count",
+                   "browser_sessions", "session_seconds", "first_session_start", "last_session_start"]
+        self.conn.executemany(
+            f"INSERT INTO daily_rollup (file_id, employee, year, month, day, {', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * (5 + len(columns)))})",
+            ([file_id, employee, year, month, day] + [values[c] for c in columns] for day, values in daily.items()))
+        return len(daily)
+
+    def _delete_file_rows(self, file_id: int):
+        for (table,) in self.conn.execute("SELECT table_name FROM sheet_tables").fetchall():
+            self.conn.execute(f"DELETE FROM {_quote(table)} WHERE _file_id = ?", (file_id,))
+        for table in ("file_sheets", "daily_rollup", "daily_fraud"):
+            self.conn.execute(f"DELETE FROM {table} WHERE file_id = ?", (file_id,))
+
+    # =========================
+    # QUERY
+    # =========================
+    def _period_sheets(self, employee: str, kind: str, year: Optional[int],
+                       month: Optional[int]) -> "Dict[str, Tuple[str, List[str]]]":
+        """sheet -> (bảng, cột gộp theo thứ tự file) của các file trong kỳ"""
+        where, params = self._period_filter(employee, year, month, prefix="f.")
+        result: Dict[str, Tuple[str, List[str]]] = {}
+        for sheet, table, columns in self.conn.execute(f"""
+                SELECT t.sheet, t.table_name, s.columns
+                FROM source_files f
+                JOIN file_sheets s ON s.file_id = f.file_id
+                JOIN sheet_tables t ON t.table_name = s.table_name
+                WHERE f.kind = ? AND {where}
+                ORDER BY f.year, f.month, f.file_id, t.rowid""", [kind] + params):
+            merged = result.setdefault(sheet, (table, []))[1]
+            merged.extend(c for c in json.loads(columns) if c not in merged)
+        return result
+
+    def sheet_names(self, employee: str, kind: str, year: Optional[int] = None,
+                    month: Optional[int] = None) -> List[str]:
+        """Các sheet của file trong kỳ (kể cả sheet rỗng)"""
+        with self._lock:
+            return list(self._period_sheets(employee, kind, year, month))
+
+    def read(self, employee: str, kind: str, sheet: str, year: Optional[int] = None,
+             month: Optional[int] = None, day=None) -> pd.DataFrame:
+        """
+        DataFrame của 1 sheet trong kỳ (kèm cột Month, Year), cùng cột và thứ tự như trong xlsx.
+        day (date / 'YYYY-MM-DD', chỉ work log): drill-down 1 ngày, chỉ đọc phân vùng _day đó.
+        """
+        if day is not None:
+            day = pd.Timestamp(day).strftime("%Y-%m-%d")
+            year, month = int(day[:4]), int(day[5:7])
+        with self._lock:
+            found = self._period_sheets(employee, kind, year, month).get(sheet)
+            if found is None:
+                return pd.DataFrame()
+            table, data_cols = found
+            kinds = self._table_columns(table)
+            where, params = self._period_filter(employee, year, month, prefix="_")
+            if day is not None:
+                where += " AND _day = ?"
+                params.append(day)
+            select = ", ".join(_quote(c) for c in ["_month", "_year"] + data_cols)
+            df = pd.read_sql_query(
+                f"SELECT {select} FROM {_quote(table)} WHERE {where} ORDER BY _year, _month, _file_id, _row",
+                self.conn, params=params)
+
+        out = df[data_cols].copy()
+        for col in data_cols:
+            kind_ = kinds.get(col, "text")
+            if kind_ == "datetime":
+                out[col] = pd.to_datetime(out[col], errors="coerce")
+            elif kind_ == "time":
+                out[col] = pd.to_datetime(out[col], format="%H:%M:%S", errors="coerce").dt.time
+            elif kind_ == "bool":
+                out[col] = out[col].astype("boolean")
+        out["Month"] = df["_month"].astype(int)
+        out["Year"] = df["_year"].astype(int)
+        return out
+
+    def read_sheets(self, employee: str, kind: str, year: Optional[int] = None,
+                    month: Optional[int] = None) -> Dict[str, pd.DataFrame]:
+        return {sheet: self.read(employee, kind, sheet, year, month)
+                for sheet in self.sheet_names(employee, kind, year, month)}
+
+    # =========================
+    # ROLLUP
+    # =========================
+    def daily_rollup(self, employee: str, year: Optional[int] = None,
+                     month: Optional[int] = None) -> pd.DataFrame:
+        """1 dòng / ngày (day NULL = dòng không có ngày), kèm mean_anomaly_score và session_hours"""
+        where, params = self._period_filter(employee, year, month, prefix="")
+        with self._lock:
+            df = pd.read_sql_query(f"""
+                SELECT year, month, day,
+                       SUM(fraud_events) AS fraud_events, SUM(fraud_flagged) AS fraud_flagged,
+                       SUM(mouse_sessions) AS mouse_sessions,
+                       SUM(anomaly_sum) AS anomaly_sum, SUM(anomaly_count) AS anomaly_count,
+                       SUM(browser_sessions) AS browser_sessions, SUM(session_seconds) AS session_seconds,
+                       MIN(first_session_start) AS first_session_start,
+                       MAX(last_session_start) AS last_session_start
+                FROM daily_rollup WHERE {where}
+                GROUP BY year, month, day ORDER BY year, month, day""", self.conn, params=params)
+        return self._finish_rollup(df)
+
+    def monthly_rollup(self, employee: str, year: Optional[int] = None,
+                       month: Optional[int] = None) -> pd.DataFrame:
+        """1 dòng / tháng - view tháng / năm của dashboard và chatbot"""
+        where, params = self._period_filter(employee, year, month, prefix="")
+        with self._lock:
+            df = pd.read_sql_query(f"""
+                SELECT year, month,
+                       SUM(fraud_events) AS fraud_events, SUM(fraud_flagged) AS fraud_flagged,
+                       SUM(mouse_sessions) AS mouse_sessions,
+                       SUM(anomaly_sum) AS anomaly_sum, SUM(anomaly_count) AS anomaly_count,
+                       SUM(browser_sessions) AS browser_sessions, SUM(session_seconds) AS session_seconds,
+                       MIN(first_session_start) AS first_session_start,
+                       MAX(last_session_start) AS last_session_start,
+                       COUNT(DISTINCT CASE WHEN browser_sessions > 0 THEN day END) AS active_days
+                FROM daily_rollup WHERE {where}
+                GROUP BY year, month ORDER BY year, month""", self.conn, params=params)
+        return self._finish_rollup(df)
+
+    @staticmethod
+    def _finish_rollup(df: pd.DataFrame) -> pd.DataFrame:
+        df["mean_anomaly_score"] = (df["anomaly_sum"] / df["anomaly_count"]).where(df["anomaly_count"] > 0)
+        df["session_hours"] = df["session_seconds"] / 3600
+        return df
+
+    def fraud_breakdown(self, employee: str, year: Optional[int] = None, month: Optional[int] = None,
+                        by: Sequence[str] = ("module", "severity")) -> pd.DataFrame:
+        """Số fraud event theo Module / Severity (thêm "month" hoặc "day" vào by để chia theo kỳ)"""
+        allowed = {"year", "month", "day", "module", "severity"}
+        by = [col for col in by if col in allowed]
+        where, params = self._period_filter(employee, year, month, prefix="")
+        group = ", ".join(by)
+        with self._lock:
+            return pd.read_sql_query(f"""
+                SELECT {group + ', ' if group else ''}SUM(events) AS events, SUM(flagged) AS flagged
+                FROM daily_fraud WHERE {where}
+                {'GROUP BY ' + group + ' ORDER BY ' + group if group else ''}""", self.conn, params=params)
+
+    @staticmethod
+    def _period_filter(employee: str, year: Optional[int], month: Optional[int],
+                       prefix: str = "_") -> Tuple[str, list]:
+        """WHERE theo employee / year / month (prefix "_" cho bảng dữ liệu, "f." cho source_files, "" cho rollup)"""
+        where, params = [f"{prefix}employee = ?"], [employee]
+        if year is not None:
+            where.append(f"{prefix}year = ?")
+            params.append(int(year))
+        if month is not None:
+            where.append(f"{prefix}month = ?")
+            params.append(int(month))
+        return " AND ".join(where), params
+
+    def info(self) -> Dict:
+        with self._lock:
+            tables = {
+                f"{kind}.{sheet}": self.conn.execute(f"SELECT COUNT(*) FROM {_quote(table)}").fetchone()[0]
+                for kind, sheet, table in self.conn.execute("SELECT kind, sheet, table_name FROM sheet_tables")
+            }
+            files = self.conn.execute("SELECT COUNT(*) FROM source_files").fetchone()[0]
+            rollups = {table: self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                       for table in ("daily_rollup", "daily_fraud")}
+        return {
+            "db_path": self.db_path,
+            "db_bytes": os.path.getsize(self.db_path) if os.path.exists(self.db_path) else 0,
+            "source_files": files,
+            "tables": tables,
+            "rollups": rollups,
+        }
+
+
+_WAREHOUSES: Dict[str, WorkLogWarehouse] = {}
+_WAREHOUSES_LOCK = threading.Lock()
+
+
+def get_warehouse(base_dir: str = SAVED_FILE_DIR) -> WorkLogWarehouse:
+    """1 warehouse (1 connection) cho mỗi thư mục dữ liệu trong process"""
+    key = os.path.abspath(str(base_dir))
+    with _WAREHOUSES_LOCK:
+        if key not in _WAREHOUSES:
+            _WAREHOUSES[key] = WorkLogWarehouse(key)
+        return _WAREHOUSES[key]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest Saved_file xlsx into the SQLite warehouse")
+    parser.add_argument("--base-dir", default=SAVED_FILE_DIR)
+    parser.add_argument("--db", default=None, help="Mặc định <base-dir>/warehouse.sqlite3")
+    parser.add_argument("--employees", nargs="*", default=None)
+    parser.add_argument("--sync", action="store_true", help="Ingest file mới / đã đổi trước khi in thông tin")
+    parser.add_argument("--rollup", metavar="EMPLOYEE", help="In rollup theo tháng của 1 nhân viên")
+    parser.add_argument("--year", type=int, default=None)
+    args = parser.parse_args()
+
+    warehouse = WorkLogWarehouse(args.base_dir, args.db)
+    if args.sync:
+        stats = warehouse.sync(args.employees)
+        print(f"🔁 Sync: {stats['ingested']} ingested ({stats['rows']} rows), {stats['unchanged']} unchanged, "
+              f"{stats['removed']} removed, {stats['failed']} failed in {stats['seconds']}s")
+
+    info = warehouse.info()
+    print("=" * 60)
+    print(f"📦 {info['db_path']}  ({info['db_bytes'] / 1024:.0f} KB, {info['source_files']} files)")
+    print("-" * 60)
+    for name, count in sorted(info["tables"].items()) + sorted(info["rollups"].items()):
+        print(f"{name:<40} {count:>10} rows")
+    print("=" * 60)
+
+    if args.rollup:
+        monthly = warehouse.monthly_rollup(args.rollup, args.year)
+        print(f"📊 Monthly rollup: {args.rollup} {args.year or ''}")
+        print("-" * 60)
+        print(f"{'Period':<10}{'Fraud':>8}{'Mouse':>8}{'Anomaly':>10}{'Hours':>9}{'Days':>6}")
+        for _, row in monthly.iterrows():
+            score = "-" if pd.isna(row["mean_anomaly_score"]) else f"{row['mean_anomaly_score']:.3f}"
+            print(f"{int(row['year'])}-{int(row['month']):02d}   {int(row['fraud_events']):>8}"
+                  f"{int(row['mouse_sessions']):>8}{score:>10}{row['session_hours']:>9.1f}{int(row['active_days']):>6}")
+        print("-" * 60)
+        breakdown = warehouse.fraud_breakdown(args.rollup, args.year)
+        for _, row in breakdown.iterrows():
+            print(f"   {row['module']:<12}{row['severity']:<12}{int(row['events']):>6} events")
+        print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Work Log Schema
+Cột của các sheet work log + cách dựng 1 row event, dùng chung cho GlobalExcelLogger (main_emp)
+và JournalLogger (replay harness) - không import PyQt6 nên benchmark đo đúng row shape như production
+
+- FRAUD_COLUMNS / MOUSE_COLUMNS: thứ tự cột khi compact journal -> xlsx
+- SHEET_COLUMNS: {sheet: cột} truyền cho EventJournal
+- build_entry(): các cột chung của mọi event (Timestamp ... Module), Mouse_Details thêm metrics vào sau
+"""
+
+from datetime import datetime
+from typing import Dict, Optional
+
+FRAUD_SHEET = "Fraud_Events"
+MOUSE_SHEET = "Mouse_Details"
+
+FRAUD_COLUMNS = [
+    "Timestamp", "Event_Type", "Details", "User", "Session_ID",
+    "Severity", "IsFraud", "Date", "Time", "Module"
+]
+MOUSE_COLUMNS = FRAUD_COLUMNS + [
+    "TotalEvents", "TotalMoves", "TotalDistance", "XAxisDistance",
+    "YAxisDistance", "XFlips", "YFlips", "MovementTimeSpan",
+    "Velocity", "Acceleration", "XVelocity", "YVelocity",
+    "XAcceleration", "YAcceleration", "DurationSeconds", "AnomalyScore"
+]
+
+SHEET_COLUMNS = {
+    FRAUD_SHEET: FRAUD_COLUMNS,
+    MOUSE_SHEET: MOUSE_COLUMNS,
+}
+
+
+def build_entry(user_name: str, session_id: str, module: str, event_type: str, details: str = "",
+                severity: str = "INFO", is_fraud: bool = False, now: Optional[datetime] = None) -> Dict:
+    """Row chung của 1 event work log"""
+    now = now or datetime.now()
+    return {
+        "Timestamp": now.strftime("%Y-%m-%d %H:%M:%S"),
+        "Event_Type": event_type,
+        "Details": details,
+        "User": user_name,
+        "Session_ID": session_id,
+        "Severity": severity,
+        "IsFraud": 1 if is_fraud else 0,
+        "Date": now.strftime("%Y-%m-%d"),
+        "Time": now.strftime("%H:%M:%S"),
+        "Module": module
+    }